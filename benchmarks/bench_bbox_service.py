@@ -0,0 +1,134 @@
+"""Compare sizing accessories with a new BBoxCache per query and two ChangeProperty
+commands per prim, as _get_prim_size/_set_prim_size did, with BBoxService.
+
+Needs the Isaac Sim python:
+Usage: <isaac-sim>/python.sh benchmarks/bench_bbox_service.py --prims 10 100 1000
+"""
+
+import argparse
+import time
+
+from isaacsim import SimulationApp
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--prims", type=int, nargs="+", default=[10, 100, 1000])
+parser.add_argument("--meshes", type=int, default=20, help="cubes per accessory")
+args = parser.parse_args()
+
+simulation_app = SimulationApp({"headless": True})
+
+import omni.kit.commands  # noqa: E402
+import omni.kit.undo  # noqa: E402
+import omni.usd  # noqa: E402
+from common import report, use_extension_modules  # noqa: E402
+from pxr import Gf, Sdf, Usd, UsdGeom  # noqa: E402
+
+use_extension_modules()
+
+from tmrobot.digital_robot.services.bbox_service import BBoxService  # noqa: E402
+
+TARGET_SIZE = (0.2, 0.1, 0.05)
+
+
+def create_accessories(stage, count: int):
+    paths = []
+    for i in range(count):
+        path = f"/World/Accessory_{i}"
+        xform = UsdGeom.Xform.Define(stage, path)
+        xform.AddTranslateOp().Set(Gf.Vec3d(i, 0, 0))
+        xform.AddScaleOp().Set(Gf.Vec3d(1, 1, 1))
+        for j in range(args.meshes):
+            cube = UsdGeom.Cube.Define(stage, f"{path}/Cube_{j}")
+            cube.AddTranslateOp().Set(Gf.Vec3d(0, 0, j * 0.01))
+        paths.append(path)
+    return paths
+
+
+def world_size(stage, prim_path: str) -> Gf.Vec3d:
+    bbox_cache = UsdGeom.BBoxCache(
+        Usd.TimeCode.Default(), includedPurposes=[UsdGeom.Tokens.default_]
+    )
+    bbox_cache.Clear()
+    prim = stage.GetPrimAtPath(Sdf.Path(prim_path))
+    return bbox_cache.ComputeWorldBound(prim).ComputeAlignedRange().GetSize()
+
+
+def set_size_commands(stage, prim_path: str) -> None:
+    omni.kit.commands.execute(
+        "ChangeProperty",
+        prop_path=Sdf.Path(f"{prim_path}.xformOp:scale"),
+        value=Gf.Vec3d(1, 1, 1),
+        prev=None,
+    )
+    size = world_size(stage, prim_path)
+    omni.kit.commands.execute(
+        "ChangeProperty",
+        prop_path=Sdf.Path(f"{prim_path}.xformOp:scale"),
+        value=Gf.Vec3d(*(TARGET_SIZE[axis] / size[axis] for axis in range(3))),
+        prev=None,
+    )
+    world_size(stage, prim_path)
+
+
+def timed(function) -> float:
+    start = time.perf_counter()
+    function()
+    return (time.perf_counter() - start) * 1e3
+
+
+def main():
+    for count in args.prims:
+        omni.usd.get_context().new_stage()
+        stage = omni.usd.get_context().get_stage()
+        paths = create_accessories(stage, count)
+
+        rows = [
+            (
+                "new BBoxCache, size of all",
+                timed(lambda: [world_size(stage, p) for p in paths]),
+                "ms",
+            ),
+            (
+                "ChangeProperty, resize all",
+                timed(lambda: [set_size_commands(stage, p) for p in paths]),
+                "ms",
+            ),
+        ]
+        omni.kit.undo.clear_stack()
+
+        bbox = BBoxService(stage)
+        bbox.watch()
+        rows += [
+            ("BBoxService, size of all", timed(lambda: bbox.get_sizes(paths)), "ms"),
+            (
+                "BBoxService, size of all again",
+                timed(lambda: bbox.get_sizes(paths)),
+                "ms",
+            ),
+            (
+                "BBoxService, resize all",
+                timed(lambda: bbox.set_sizes({p: TARGET_SIZE for p in paths})),
+                "ms",
+            ),
+            (
+                "BBoxService, size of all after resize",
+                timed(lambda: bbox.get_sizes(paths)),
+                "ms",
+            ),
+        ]
+        bbox.unwatch()
+
+        size = bbox.get_size(paths[-1])
+        rows.append(
+            (
+                "size error after resize",
+                max(abs(size[axis] - TARGET_SIZE[axis]) for axis in range(3)) * 1e3,
+                "mm",
+            )
+        )
+        report(f"{count} accessories of {args.meshes} cubes", rows)
+
+
+if __name__ == "__main__":
+    main()
+    simulation_app.close()
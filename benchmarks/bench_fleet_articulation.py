@@ -0,0 +1,90 @@
+"""Compare one apply_action per robot with the batched FleetArticulation write,
+from 1 to 32 robots.
+
+Needs the Isaac Sim python and a TM robot USD, e.g. exported from the main scene:
+Usage: <isaac-sim>/python.sh benchmarks/bench_fleet_articulation.py --usd <tm12s.usd>
+"""
+
+import argparse
+
+from isaacsim import SimulationApp
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--usd", required=True, help="USD of one robot articulation")
+parser.add_argument("--joints", type=int, default=6)
+parser.add_argument("--steps", type=int, default=200)
+args = parser.parse_args()
+
+simulation_app = SimulationApp({"headless": True})
+
+import numpy as np  # noqa: E402
+from common import measure, report, use_extension_modules  # noqa: E402
+from isaacsim.core.api.world.world import World  # noqa: E402
+from isaacsim.core.prims import SingleArticulation  # noqa: E402
+from isaacsim.core.utils.stage import add_reference_to_stage  # noqa: E402
+from isaacsim.core.utils.types import ArticulationAction  # noqa: E402
+
+use_extension_modules()
+
+from tmrobot.digital_robot.services.fleet_articulation import (  # noqa: E402
+    FleetArticulation,
+)
+
+ROBOT_COUNTS = (1, 2, 4, 8, 16, 32)
+
+
+def bench(world: World, count: int):
+    robots = {}
+    for i in range(count):
+        name = f"Robot{i + 1:02d}"
+        prim_path = f"/World/Bench/{name}"
+        add_reference_to_stage(args.usd, prim_path)
+        robots[name] = world.scene.add(
+            SingleArticulation(prim_path, name=name, position=np.array([i * 1.5, 0, 0]))
+        )
+
+    fleet = FleetArticulation(robots, num_joints=args.joints)
+    for view in fleet.views:
+        world.scene.add(view)
+    world.reset()
+    assert fleet.is_initialized(), "the fleet view didn't resolve the robot joints"
+
+    targets = np.random.uniform(-1, 1, (count, args.joints))
+
+    def per_robot():
+        for row, robot in enumerate(robots.values()):
+            robot.apply_action(ArticulationAction(joint_positions=targets[row]))
+
+    def batched():
+        for row, name in enumerate(robots):
+            fleet.set_target(name, targets[row])
+        fleet.apply()
+
+    rows = []
+    for title, function in (
+        ("apply_action per robot", per_robot),
+        ("batched", batched),
+    ):
+        rows.append(
+            (f"{count:>2} robots, {title}", measure(function, 3, args.steps), "us/step")
+        )
+
+    world.stop()
+    world.scene.clear(registry_only=True)
+    world.stage.RemovePrim("/World/Bench")
+    return rows
+
+
+def main():
+    world = World(stage_units_in_meters=1.0)
+
+    rows = []
+    for count in ROBOT_COUNTS:
+        rows += bench(world, count)
+
+    report("Joint target writes per physics step", rows)
+
+
+if __name__ == "__main__":
+    main()
+    simulation_app.close()
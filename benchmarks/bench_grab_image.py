@@ -0,0 +1,114 @@
+"""Measure how long a camera grab blocks the event loop, encoded inline or in the pool.
+
+A ticker coroutine stands in for the Kit loop: it should wake every millisecond, the
+longest gap between two wakes is the longest stall of rendering and physics. Inline is
+what the compiled getGrabImageData does on the loop, the PNG saved and the JPEG of
+DigitalCamera.get_jpg. Pooled is CachedVirtualCameraServer: only SnapshotCamera.snapshot
+runs on the loop, SnapshotCamera.encode runs in GrabImagePool.
+
+Needs Pillow.
+
+Usage: python benchmarks/bench_grab_image.py
+"""
+
+import asyncio
+import tempfile
+import time
+
+import numpy as np
+from common import report, use_extension_modules
+
+use_extension_modules()
+
+from tmrobot.digital_robot.services.grab_image_pool import GrabImagePool  # noqa: E402
+from tmrobot.digital_robot.services.grab_image_pool import SnapshotCamera  # noqa: E402
+
+# Sizes of the DigitalCamera Resolution options
+RESOLUTIONS = {"1MP": (1280, 960), "5MP": (2592, 1944), "12MP": (4024, 3036)}
+GRABS = 8
+
+
+class RenderedCamera:
+    """DigitalCamera stand-in, get_rgb copies the annotator frame into bytes like it."""
+
+    def __init__(self, width: int, height: int):
+        x = np.linspace(0, 255, width, dtype=np.float32)
+        y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+        self.frame = np.empty((height, width, 3), dtype=np.uint8)
+        self.frame[..., 0] = x
+        self.frame[..., 1] = y
+        self.frame[..., 2] = (x + y) / 2
+        self.frame += np.random.randint(0, 8, self.frame.shape, dtype=np.uint8)
+        self.size = (width, height)
+
+    def get_rgb(self) -> bytes:
+        return bytes(self.frame)
+
+    def get_image_size(self):
+        return self.size
+
+
+async def ticker(gaps: list, stop: asyncio.Event) -> None:
+    last = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(0.001)
+        now = time.perf_counter()
+        gaps.append(now - last)
+        last = now
+
+
+async def grab_inline(camera: SnapshotCamera, loop_times: list) -> None:
+    started = time.perf_counter()
+    camera.encode(*camera.snapshot())
+    loop_times.append(time.perf_counter() - started)
+
+
+async def grab_pooled(
+    camera: SnapshotCamera, pool: GrabImagePool, loop_times: list
+) -> None:
+    started = time.perf_counter()
+    rgb, size = camera.snapshot()
+    loop_times.append(time.perf_counter() - started)
+    await pool.run(camera.encode, rgb, size)
+
+
+async def run(grab, *args):
+    gaps = []
+    loop_times = []
+    stop = asyncio.Event()
+    tick = asyncio.ensure_future(ticker(gaps, stop))
+    await asyncio.sleep(0.01)
+
+    started = time.perf_counter()
+    for _ in range(GRABS):
+        await grab(*args, loop_times)
+        await asyncio.sleep(0.002)
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await tick
+    return np.array(loop_times) * 1000, np.array(gaps) * 1000, elapsed / GRABS * 1000
+
+
+def main():
+    pool = GrabImagePool()
+    with tempfile.TemporaryDirectory() as png_dir:
+        for name, (width, height) in RESOLUTIONS.items():
+            camera = SnapshotCamera(RenderedCamera(width, height), png_dir)
+            rows = []
+            for title, grab, args in (
+                ("inline", grab_inline, (camera,)),
+                ("pooled", grab_pooled, (camera, pool)),
+            ):
+                loop_times, gaps, per_grab = asyncio.run(run(grab, *args))
+                rows += [
+                    (f"{title} loop time per grab", loop_times.mean(), "ms"),
+                    (f"{title} longest loop stall", gaps.max(), "ms"),
+                    (f"{title} grab latency", per_grab, "ms"),
+                ]
+            report(f"{name} {width}x{height}, {GRABS} grabs", rows)
+    pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Compare the ChangeProperty gripper toggle of the prismatic joint gripper example with
+PrismaticGripperController and CachedXformPose: time per toggle, and memory and undo
+stack size over many open/close cycles (a cycle every 2 s is 1800 cycles per hour).
+
+Needs the Isaac Sim python:
+Usage: <isaac-sim>/python.sh benchmarks/bench_gripper_controller.py --cycles 20000
+"""
+
+import argparse
+import os
+import resource
+
+from isaacsim import SimulationApp
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--cycles", type=int, default=20000, help="open/close cycles")
+parser.add_argument("--samples", type=int, default=5, help="memory samples per path")
+args = parser.parse_args()
+
+simulation_app = SimulationApp({"headless": True})
+
+import omni.kit.commands  # noqa: E402
+import omni.kit.undo  # noqa: E402
+import omni.usd  # noqa: E402
+from common import measure, report, use_extension_modules  # noqa: E402
+from pxr import Gf, Sdf, UsdGeom, UsdPhysics  # noqa: E402
+
+use_extension_modules()
+
+from tmrobot.digital_robot.services.gripper_controller import (  # noqa: E402
+    CachedXformPose,
+    PrismaticGripperController,
+)
+
+GRIPPER_PATH = "/World/Gripper"
+JOINTS = [f"{GRIPPER_PATH}/Slider_1", f"{GRIPPER_PATH}/Slider_2"]
+WORKPIECE_PATH = "/World/work_piece"
+TARGET = "drive:linear:physics:targetPosition"
+WORKPIECE_POSITION = Gf.Vec3d(0, 0.25, 0.51551)
+WORKPIECE_ORIENT = Gf.Quatd(1.0, Gf.Vec3d(0.0, 0.0, 0.0))
+
+
+def create_scene(stage) -> None:
+    UsdGeom.Xform.Define(stage, GRIPPER_PATH)
+    for path in JOINTS:
+        joint = UsdPhysics.PrismaticJoint.Define(stage, path)
+        drive = UsdPhysics.DriveAPI.Apply(joint.GetPrim(), "linear")
+        drive.CreateTargetPositionAttr(0.025)
+
+    workpiece = UsdGeom.Xform.Define(stage, WORKPIECE_PATH)
+    workpiece.AddTranslateOp().Set(WORKPIECE_POSITION)
+    workpiece.AddOrientOp(UsdGeom.XformOp.PrecisionDouble).Set(WORKPIECE_ORIENT)
+
+
+def check_targets(stage, closed: bool) -> None:
+    # Both paths must leave the fingers where the last toggle put them
+    expected = 0.0 if closed else 0.025
+    for path in JOINTS:
+        value = stage.GetAttributeAtPath(f"{path}.{TARGET}").Get()
+        assert abs(value - expected) < 1e-9, f"{path} target is {value}, not {expected}"
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        # Peak instead of current on other platforms
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+def undo_stack_size() -> int:
+    try:
+        return len(omni.kit.undo.get_undo_stack())
+    except Exception:
+        return -1
+
+
+def main():
+    omni.usd.get_context().new_stage()
+    stage = omni.usd.get_context().get_stage()
+    create_scene(stage)
+
+    def change_property(closed: bool):
+        # The prismatic joint gripper example before the controller
+        for path in JOINTS:
+            omni.kit.commands.execute(
+                "ChangeProperty",
+                prop_path=Sdf.Path(f"{path}.{TARGET}"),
+                value=0.0 if closed else 0.025,
+                prev=None,
+            )
+        if not closed:
+            omni.kit.commands.execute(
+                "ChangeProperty",
+                prop_path=Sdf.Path(f"{WORKPIECE_PATH}.xformOp:translate"),
+                value=WORKPIECE_POSITION,
+                prev=None,
+            )
+            omni.kit.commands.execute(
+                "ChangeProperty",
+                prop_path=Sdf.Path(f"{WORKPIECE_PATH}.xformOp:orient"),
+                value=WORKPIECE_ORIENT,
+                prev=None,
+            )
+
+    gripper = PrismaticGripperController(stage, JOINTS)
+    pose = CachedXformPose(stage, WORKPIECE_PATH)
+
+    def controller(closed: bool):
+        gripper.set_closed(closed)
+        if not closed:
+            pose.set(WORKPIECE_POSITION, WORKPIECE_ORIENT)
+
+    for title, toggle in (
+        ("ChangeProperty", change_property),
+        ("controller", controller),
+    ):
+        state = [False]
+
+        def cycle():
+            state[0] = not state[0]
+            toggle(state[0])
+
+        rows = [("time per toggle", measure(cycle, 3, 1000), "us")]
+
+        start_rss = rss_mb()
+        chunk = max(1, args.cycles // args.samples)
+        for sample in range(args.samples):
+            for _ in range(chunk * 2):
+                cycle()
+            rows.append(
+                (
+                    f"RSS growth after {(sample + 1) * chunk} cycles",
+                    rss_mb() - start_rss,
+                    "MB",
+                )
+            )
+        check_targets(stage, state[0])
+        rows.append(("undo stack entries", undo_stack_size(), ""))
+        report(f"{title}, {args.cycles} open/close cycles", rows)
+
+        omni.kit.undo.clear_stack()
+
+
+if __name__ == "__main__":
+    main()
+    simulation_app.close()
@@ -0,0 +1,122 @@
+"""Compare N referenced workpiece prims walked for the spawn check with
+InstancedWorkpieces: load time, RSS growth and time of the spawn position check,
+from 100 to 10k parts.
+
+Needs the Isaac Sim python:
+Usage: <isaac-sim>/python.sh benchmarks/bench_instanced_workpieces.py --parts 100 1000 10000
+"""
+
+import argparse
+import gc
+import os
+import resource
+import time
+
+from isaacsim import SimulationApp
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--parts", type=int, nargs="+", default=[100, 1000, 10000])
+args = parser.parse_args()
+
+simulation_app = SimulationApp({"headless": True})
+
+import numpy as np  # noqa: E402
+import omni.usd  # noqa: E402
+from common import EXTENSION_PATH, measure, report, use_extension_modules  # noqa: E402
+from isaacsim.core.utils.stage import add_reference_to_stage  # noqa: E402
+from pxr import Gf, UsdGeom  # noqa: E402
+
+use_extension_modules()
+
+from tmrobot.digital_robot.services.instanced_workpieces import (  # noqa: E402
+    InstancedWorkpieces,
+)
+
+USD_PATH = os.path.abspath(
+    os.path.join(
+        EXTENSION_PATH,
+        "tmrobot/digital_robot/assets/worlds/accessories/workpiece",
+        "004_sugar_box/004_sugar_box.usd",
+    )
+)
+ROOT_PATH = "/World/Workpieces"
+SPAWN_POSITION = Gf.Vec3d(0, 0.25, 0.5155)
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+def bin_positions(count: int) -> np.ndarray:
+    # Parts 0.05 m apart on a square grid, 4 layers high
+    side = int(np.ceil(np.sqrt(count / 4)))
+    x, y, z = np.meshgrid(
+        np.arange(side) * 0.05 + 0.5, np.arange(side) * 0.05 - 0.5, np.arange(4) * 0.05
+    )
+    return np.stack((x.ravel(), y.ravel(), z.ravel()), axis=1)[:count]
+
+
+def new_stage():
+    omni.usd.get_context().new_stage()
+    gc.collect()
+    stage = omni.usd.get_context().get_stage()
+    UsdGeom.Xform.Define(stage, ROOT_PATH)
+    return stage
+
+
+def walk_check(stage) -> bool:
+    # The former _spawn_workpiece check
+    for workpiece in stage.GetPrimAtPath(ROOT_PATH).GetChildren():
+        translation = (
+            UsdGeom.Xformable(workpiece).GetLocalTransformation().ExtractTranslation()
+        )
+        x = round(translation[0], 2)
+        y = round(translation[1], 2)
+        if SPAWN_POSITION[0] == x and SPAWN_POSITION[1] == y:
+            return False
+    return True
+
+
+def main():
+    for count in args.parts:
+        positions = bin_positions(count)
+
+        stage = new_stage()
+        start_rss = rss_mb()
+        start = time.perf_counter()
+        for i, position in enumerate(positions.tolist()):
+            prim = add_reference_to_stage(USD_PATH, f"{ROOT_PATH}/workpiece_{i}")
+            prim.GetAttribute("xformOp:translate").Set(Gf.Vec3d(*position))
+        references = [
+            ("load", time.perf_counter() - start, "s"),
+            ("RSS growth", rss_mb() - start_rss, "MB"),
+            ("spawn check", measure(lambda: walk_check(stage), 3, 10), "us"),
+        ]
+
+        stage = new_stage()
+        start_rss = rss_mb()
+        start = time.perf_counter()
+        parts = InstancedWorkpieces(stage, f"{ROOT_PATH}/Bulk", USD_PATH)
+        parts.add_many(positions)
+        parts.flush()
+        instanced = [
+            ("load", time.perf_counter() - start, "s"),
+            ("RSS growth", rss_mb() - start_rss, "MB"),
+            (
+                "spawn check",
+                measure(lambda: parts.is_free(SPAWN_POSITION, 0.005), 3, 1000),
+                "us",
+            ),
+        ]
+
+        report(f"{count} referenced prims", references)
+        report(f"{count} instanced parts", instanced)
+
+
+if __name__ == "__main__":
+    main()
+    simulation_app.close()
@@ -0,0 +1,118 @@
+"""Compare the per prim ChangeProperty stepping of _move_to_target with MotionProfiles:
+time per physics step while N accessories move, and the undo stack size afterwards.
+
+Needs the Isaac Sim python:
+Usage: <isaac-sim>/python.sh benchmarks/bench_motion_profile.py --prims 10 100 500
+"""
+
+import argparse
+import time
+
+from isaacsim import SimulationApp
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--prims", type=int, nargs="+", default=[10, 100, 500])
+parser.add_argument("--steps", type=int, default=200, help="physics steps per run")
+args = parser.parse_args()
+
+simulation_app = SimulationApp({"headless": True})
+
+import omni.kit.commands  # noqa: E402
+import omni.kit.undo  # noqa: E402
+import omni.usd  # noqa: E402
+from common import report, use_extension_modules  # noqa: E402
+from pxr import Gf, Sdf, UsdGeom  # noqa: E402
+
+use_extension_modules()
+
+from tmrobot.digital_robot.services.motion_profile import MotionProfiles  # noqa: E402
+
+DT = 1 / 60
+STEP_SIZE = 0.001  # the former _move_to_target default
+TARGET = Gf.Vec3d(1.0, 0.5, 0.0)
+
+
+def create_prims(stage, count: int):
+    paths = []
+    for i in range(count):
+        path = f"/World/Part_{i}"
+        UsdGeom.Xform.Define(stage, path).AddTranslateOp().Set(Gf.Vec3d(0, 0, 0))
+        paths.append(path)
+    return paths
+
+
+def undo_stack_size() -> int:
+    try:
+        return len(omni.kit.undo.get_undo_stack())
+    except Exception:
+        return -1
+
+
+def move_to_target(stage, prim_path: str, target_position) -> bool:
+    # The former per step, per prim implementation
+    attribute = stage.GetPrimAtPath(prim_path).GetAttribute("xformOp:translate")
+    current = [round(coord, 4) for coord in attribute.Get()]
+    target = [round(coord, 4) for coord in target_position]
+    if current == target:
+        return True
+
+    for axis in range(3):
+        if current[axis] < target[axis]:
+            current[axis] += STEP_SIZE
+        elif current[axis] > target[axis]:
+            current[axis] -= STEP_SIZE
+
+    omni.kit.commands.execute(
+        "ChangeProperty",
+        prop_path=Sdf.Path(f"{prim_path}.xformOp:translate"),
+        value=Gf.Vec3d(*current),
+        prev=None,
+    )
+    return False
+
+
+def timed(function) -> float:
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        function()
+    return (time.perf_counter() - start) / args.steps * 1e6
+
+
+def main():
+    for count in args.prims:
+        omni.usd.get_context().new_stage()
+        stage = omni.usd.get_context().get_stage()
+        paths = create_prims(stage, count)
+        omni.kit.undo.clear_stack()
+
+        def change_property():
+            for path in paths:
+                move_to_target(stage, path, TARGET)
+
+        change_property_us = timed(change_property)
+        change_property_undo = undo_stack_size()
+        omni.kit.undo.clear_stack()
+
+        for path in paths:
+            stage.GetAttributeAtPath(f"{path}.xformOp:translate").Set(Gf.Vec3d(0))
+        profiles = MotionProfiles(stage)
+        for path in paths:
+            # Long enough not to arrive during the run
+            profiles.move(path, TARGET * 100, max_velocity=1.0, max_acceleration=2.0)
+
+        profiles_us = timed(lambda: profiles.step(DT))
+
+        report(
+            f"{count} prims moving, {args.steps} steps",
+            [
+                ("ChangeProperty per step", change_property_us, "us"),
+                ("ChangeProperty undo stack entries", change_property_undo, ""),
+                ("MotionProfiles per step", profiles_us, "us"),
+                ("MotionProfiles undo stack entries", undo_stack_size(), ""),
+            ],
+        )
+
+
+if __name__ == "__main__":
+    main()
+    simulation_app.close()
@@ -0,0 +1,88 @@
+"""Compare the PNG grab path with the raw RGB/MONO packing, for the camera resolutions.
+
+The PNG path needs Pillow, it is skipped when Pillow isn't installed.
+
+Usage: python benchmarks/bench_raw_image.py
+"""
+
+import io
+import tracemalloc
+
+import numpy as np
+from common import measure, report, use_extension_modules
+
+use_extension_modules()
+
+from tmrobot.digital_robot.services.raw_image import RawImagePacker  # noqa: E402
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Sizes of the DigitalCamera Resolution options
+RESOLUTIONS = {"1MP": (1280, 960), "5MP": (2592, 1944), "12MP": (4024, 3036)}
+
+
+def make_frame(width: int, height: int) -> np.ndarray:
+    # Smooth gradients with noise, compresses like a rendered scene rather than random bytes
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    frame = np.empty((height, width, 4), dtype=np.uint8)
+    frame[..., 0] = x
+    frame[..., 1] = y
+    frame[..., 2] = (x + y) / 2
+    frame[..., 3] = 255
+    frame[..., :3] += np.random.randint(0, 8, (height, width, 3), dtype=np.uint8)
+    return frame
+
+
+def legacy_png(frame: np.ndarray) -> bytes:
+    # annotator RGBA -> ascontiguousarray -> frombytes -> PNG -> getvalue
+    height, width = frame.shape[:2]
+    rgb = np.ascontiguousarray(frame[..., :3])
+    image = Image.frombytes("RGB", (width, height), rgb.tobytes())
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def peak_memory(function) -> float:
+    """Peak traced allocation of one call in MB."""
+    function()
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1e6
+
+
+def main():
+    for name, (width, height) in RESOLUTIONS.items():
+        frame = make_frame(width, height)
+        rgb = RawImagePacker("RGB")
+        mono = RawImagePacker("MONO")
+
+        # DigitalCamera.get_rgb copies the RGB annotator frame into bytes
+        annotator_rgb = np.ascontiguousarray(frame[..., :3])
+        size = (width, height)
+
+        paths = [
+            ("raw RGB of RGBA", lambda: rgb.pack(frame).tobytes()),
+            ("raw RGB", lambda: rgb.pack_bytes(bytes(annotator_rgb), size)),
+            ("raw MONO", lambda: mono.pack_bytes(bytes(annotator_rgb), size)),
+        ]
+        if Image is not None:
+            paths.insert(0, ("PNG", lambda: legacy_png(frame)))
+
+        rows = []
+        for title, function in paths:
+            rows.append((f"{title} latency", measure(function, 3, 5) / 1000, "ms"))
+            rows.append((f"{title} peak memory", peak_memory(function), "MB"))
+            rows.append((f"{title} response size", len(function()) / 1e6, "MB"))
+
+        report(f"{name} {width}x{height}", rows)
+
+
+if __name__ == "__main__":
+    main()
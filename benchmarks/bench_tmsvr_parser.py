@@ -0,0 +1,137 @@
+"""Compare the string based $TMSVR decoding with the in place frame parser,
+for STRING and BINARY transmit tables.
+
+Usage: python benchmarks/bench_tmsvr_parser.py
+"""
+
+import math
+import random
+import tracemalloc
+
+from common import measure, report, use_extension_modules
+
+use_extension_modules()
+
+from tmrobot.digital_robot.services.tmsvr_parser import (  # noqa: E402
+    MODE_STRING,
+    TMSVRFrameParser,
+    build_packet,
+    decode_string_motion,
+)
+from tmrobot.digital_robot.services.transmit_table import TransmitTable  # noqa: E402
+
+FRAMES_PER_CHUNK = 4
+
+
+def make_packet() -> bytes:
+    joint_angle = ",".join(f"{random.uniform(-180, 180):.3f}" for _ in range(6))
+    bits = lambda size: ",".join(str(random.randint(0, 1)) for _ in range(size))  # noqa
+    content = (
+        f"Joint_Angle={{{joint_angle}}}\r\n"
+        f"Ctrl_DI={{{bits(16)}}}\r\n"
+        f"Ctrl_DO={{{bits(16)}}}\r\n"
+        f"End_DI={{{bits(4)}}}\r\n"
+        f"End_DO={{{bits(4)}}}"
+    )
+    return build_packet("0", MODE_STRING, content)
+
+
+def make_binary_packet(table: TransmitTable) -> bytes:
+    values = [random.uniform(-180, 180) for _ in range(6)]
+    values += [random.randint(0, 1) for _ in range(16 + 16 + 4 + 4)]
+    return build_packet("0", table.mode, table.binary_layout.pack(values))
+
+
+def legacy_decode(chunk: bytes):
+    # The recv/decode/split/strip/replace path of EthernetMaster.receive_data
+    samples = []
+    for packet in chunk.decode("utf-8").split("$TMSVR,"):
+        if not packet:
+            continue
+        values = {}
+        data = packet.split(",", 3)[3].rsplit(",*", 1)[0]
+        for line in data.split("\r\n"):
+            line = line.strip()
+            if "=" not in line:
+                continue
+            name, value = line.split("=", 1)
+            values[name] = value.replace("{", "").replace("}", "")
+        joint_angle_str = values["Joint_Angle"].split(",")
+        ctrl_di_str = values["Ctrl_DI"].split(",")
+        ctrl_do_str = values["Ctrl_DO"].split(",")
+        end_di_str = values["End_DI"].split(",")
+        end_do_str = values["End_DO"].split(",")
+        samples.append(
+            (
+                [math.radians(float(angle)) for angle in joint_angle_str],
+                [int(v) for v in ctrl_di_str],
+                [int(v) for v in ctrl_do_str],
+                [int(v) for v in end_di_str],
+                [int(v) for v in end_do_str],
+            )
+        )
+    return samples
+
+
+def main():
+    random.seed(0)
+    chunk = b"".join(make_packet() for _ in range(FRAMES_PER_CHUNK))
+    parser = TMSVRFrameParser()
+
+    def stream_decode(chunk=chunk, decode=decode_string_motion):
+        parser.feed(chunk)
+        samples = []
+        frame = parser.next_frame()
+        while frame is not None:
+            samples.append(decode(frame, "Robot01", 0.0))
+            frame = parser.next_frame()
+        return samples
+
+    binary_table = TransmitTable.default("BINARY")
+    binary_chunk = b"".join(
+        make_binary_packet(binary_table) for _ in range(FRAMES_PER_CHUNK)
+    )
+    binary_decode = binary_table.binary_layout.decode
+    assert len(stream_decode(binary_chunk, binary_decode)) == FRAMES_PER_CHUNK
+
+    legacy = legacy_decode(chunk)
+    stream = stream_decode()
+    assert [s[0] for s in legacy] == [s.joint_radian for s in stream]
+    assert [s[2] for s in legacy] == [list(s.ctrl_do) for s in stream]
+
+    legacy_us = measure(lambda: legacy_decode(chunk)) / FRAMES_PER_CHUNK
+    stream_us = measure(stream_decode) / FRAMES_PER_CHUNK
+    binary_us = measure(lambda: stream_decode(binary_chunk, binary_decode))
+    binary_us /= FRAMES_PER_CHUNK
+
+    def allocated(function):
+        tracemalloc.start()
+        for _ in range(1000):
+            function()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return peak / 1024
+
+    report(
+        f"$TMSVR decode, {len(chunk) // FRAMES_PER_CHUNK} bytes per frame",
+        [
+            ("string path", legacy_us, "us/frame"),
+            ("in place parser", stream_us, "us/frame"),
+            ("speedup", legacy_us / stream_us, "x"),
+            (
+                f"binary table, {len(binary_chunk) // FRAMES_PER_CHUNK} bytes per frame",
+                binary_us,
+                "us/frame",
+            ),
+            (
+                "string path peak allocation",
+                allocated(lambda: legacy_decode(chunk)),
+                "KiB",
+            ),
+            ("in place parser peak allocation", allocated(stream_decode), "KiB"),
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
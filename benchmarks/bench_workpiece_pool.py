@@ -0,0 +1,103 @@
+"""Compare spawning a workpiece with add_reference_to_stage and SetRigidBody during the
+simulation with WorkpiecePool: time of the spawn and of the physics step after it,
+including the PhysX parsing and cooking of the new rigid body.
+
+Needs the Isaac Sim python:
+Usage: <isaac-sim>/python.sh benchmarks/bench_workpiece_pool.py --spawns 200
+"""
+
+import argparse
+import os
+import time
+
+from isaacsim import SimulationApp
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--spawns", type=int, default=200)
+parser.add_argument("--pool-size", type=int, default=8)
+args = parser.parse_args()
+
+simulation_app = SimulationApp({"headless": True})
+
+import numpy as np  # noqa: E402
+import omni.kit.commands  # noqa: E402
+from common import EXTENSION_PATH, report, use_extension_modules  # noqa: E402
+from isaacsim.core.api.world.world import World  # noqa: E402
+from isaacsim.core.utils.stage import add_reference_to_stage  # noqa: E402
+from pxr import Gf, Sdf, UsdGeom  # noqa: E402
+
+use_extension_modules()
+
+from tmrobot.digital_robot.services.workpiece_pool import WorkpiecePool  # noqa: E402
+
+USD_PATH = os.path.abspath(
+    os.path.join(
+        EXTENSION_PATH,
+        "tmrobot/digital_robot/assets/worlds/accessories/workpiece",
+        "004_sugar_box/004_sugar_box.usd",
+    )
+)
+ROOT_PATH = "/World/Workpieces"
+POSITION = Gf.Vec3d(0, 0.25, 0.5155)
+
+
+def spawn_reference(stage, index: int) -> None:
+    # The former _spawn_workpiece
+    prim_path = f"{ROOT_PATH}/workpiece_{index}"
+    prim = add_reference_to_stage(usd_path=USD_PATH, prim_path=prim_path).GetPrim()
+    prim.GetAttribute("xformOp:translate").Set(POSITION)
+    prim.GetAttribute("xformOp:scale").Set(Gf.Vec3f(0.5, 0.5, 0.5))
+    prim.GetAttribute("xformOp:rotateXYZ").Set(Gf.Vec3f(0, 0, 0))
+    omni.kit.commands.execute(
+        "SetRigidBody",
+        path=Sdf.Path(prim_path),
+        approximationShape="convexHull",
+        kinematic=False,
+    )
+
+
+def run(world: World, spawn) -> list:
+    spawn_times, step_times = [], []
+    for index in range(args.spawns):
+        start = time.perf_counter()
+        spawn(index + 1)
+        spawned = time.perf_counter()
+        world.step(render=False)
+        spawn_times.append(spawned - start)
+        step_times.append(time.perf_counter() - spawned)
+
+    spawn_times = np.array(spawn_times) * 1e3
+    step_times = np.array(step_times) * 1e3
+    return [
+        ("spawn mean", spawn_times.mean(), "ms"),
+        ("spawn max", spawn_times.max(), "ms"),
+        ("step after spawn mean", step_times.mean(), "ms"),
+        ("step after spawn p99", np.percentile(step_times, 99), "ms"),
+        ("step after spawn max", step_times.max(), "ms"),
+    ]
+
+
+def main():
+    for title in ("add_reference_to_stage", "WorkpiecePool"):
+        world = World(stage_units_in_meters=1.0)
+        world.scene.add_default_ground_plane()
+        stage = world.stage
+        UsdGeom.Xform.Define(stage, ROOT_PATH)
+
+        if title == "WorkpiecePool":
+            pool = WorkpiecePool(stage, ROOT_PATH, USD_PATH, args.pool_size)
+            pool.fill()
+            world.reset()
+            rows = run(world, lambda index: pool.spawn(POSITION))
+        else:
+            world.reset()
+            rows = run(world, lambda index: spawn_reference(stage, index))
+
+        report(f"{title}, {args.spawns} spawns", rows)
+        world.stop()
+        world.clear_instance()
+
+
+if __name__ == "__main__":
+    main()
+    simulation_app.close()
@@ -0,0 +1,39 @@
+import os
+import sys
+import time
+import types
+
+EXTENSION_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "exts", "tmrobot.digital_robot"
+)
+
+
+def use_extension_modules() -> None:
+    # tmrobot/digital_robot/__init__.py imports the Kit extension, register the packages
+    # by path so the pure Python services can be imported outside of Isaac Sim
+    root = os.path.abspath(EXTENSION_PATH)
+    for name, path in (
+        ("tmrobot", os.path.join(root, "tmrobot")),
+        ("tmrobot.digital_robot", os.path.join(root, "tmrobot", "digital_robot")),
+    ):
+        if name not in sys.modules:
+            package = types.ModuleType(name)
+            package.__path__ = [path]
+            sys.modules[name] = package
+
+
+def measure(function, repeat: int = 5, number: int = 1000) -> float:
+    """Best time per call in microseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best * 1e6
+
+
+def report(title: str, rows) -> None:
+    print(f"\n{title}")
+    for name, value, unit in rows:
+        print(f"  {name:<40} {value:>12.2f} {unit}")
@@ -0,0 +1,248 @@
+"""Load test the Ethernet Slave receive path against simulated robots, without TMflow.
+
+N simulated robots stream $TMSVR frames through the Ethernet hub into the motion
+mailbox, and a fake step loop drains it at the physics rate. Reported per run: frames
+sent and decoded, parser errors, mailbox overwrites, sample age at the step and the
+time for a Ctrl_DI write to come back in the transmitted frames, and the per stage
+motion latency percentiles.
+
+--serve only runs the simulated robots, on consecutive addresses from --host at port
+5891, so the extension can be pointed at them: set the robot IPs to 127.0.0.2, 127.0.0.3...
+
+Usage:
+    python benchmarks/load_ethernet_slave.py --robots 8 --rate 100 --jitter 0.002 --fragment 0.2
+    python benchmarks/load_ethernet_slave.py --serve --robots 2 --host 127.0.0.2
+"""
+
+import argparse
+import ipaddress
+import time
+
+import numpy as np
+from common import report, use_extension_modules
+
+use_extension_modules()
+
+from tmrobot.digital_robot.services.ethernet_hub import EthernetHub  # noqa: E402
+from tmrobot.digital_robot.services.ethernet_slave_simulator import (  # noqa: E402
+    EthernetSlaveSimulator,
+)
+from tmrobot.digital_robot.services.motion_latency import (  # noqa: E402
+    PERCENTILES,
+    STAGES,
+    MotionLatency,
+)
+from tmrobot.digital_robot.services.motion_mailbox import MotionMailbox  # noqa: E402
+from tmrobot.digital_robot.services.transmit_table import TransmitTable  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--robots", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=100.0, help="frames/s per robot")
+    parser.add_argument("--jitter", type=float, default=0.0, help="seconds, std dev")
+    parser.add_argument("--fragment", type=float, default=0.0, help="probability")
+    parser.add_argument("--max-fragments", type=int, default=4)
+    parser.add_argument("--binary", action="store_true", help="BINARY transmit table")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds")
+    parser.add_argument("--step-rate", type=float, default=60.0, help="steps/s")
+    parser.add_argument("--serve", action="store_true", help="only run the robots")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def create_simulator(args, table: TransmitTable) -> EthernetSlaveSimulator:
+    simulator = EthernetSlaveSimulator(
+        rate=args.rate,
+        jitter=args.jitter,
+        fragment=args.fragment,
+        max_fragments=args.max_fragments,
+        transmit_table=table,
+        seed=args.seed,
+    )
+
+    host = ipaddress.ip_address(args.host)
+    for i in range(args.robots):
+        if args.serve:
+            # At the Ethernet Slave port the extension connects to
+            simulator.add_robot(f"Robot{i + 1:02d}", str(host + i))
+        else:
+            simulator.add_robot(f"Robot{i + 1:02d}", args.host, 0)
+    return simulator
+
+
+def serve(simulator: EthernetSlaveSimulator) -> None:
+    simulator.start()
+    for name in simulator.slaves:
+        host, port = simulator.address(name)
+        print(f"{name} Ethernet Slave on {host}:{port}")
+
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulator.stop()
+
+
+def step_loop(
+    hub, mailbox, masters, simulator, latency, duration: float, step_rate: float
+):
+    """Drain the mailbox at the step rate, toggle Ctrl_DI[0] and [1] of every robot each
+    second, the writes of a step are flushed together at its end."""
+    ages = []
+    write_latencies = []
+    pending_writes = {}  # [robot name] (value, time written)
+    period = 1.0 / step_rate
+    end = time.perf_counter() + duration
+    next_step = time.perf_counter()
+    next_write = next_step + 0.5
+
+    while next_step < end:
+        next_step += period
+        time.sleep(max(0.0, next_step - time.perf_counter()))
+        now = time.perf_counter()
+
+        samples = mailbox.drain()
+        dequeued = time.perf_counter()
+        latency.record_applied(samples.values(), dequeued, time.perf_counter())
+        for robot_name, sample in samples.items():
+            ages.append(now - sample.timestamp)
+            pending = pending_writes.get(robot_name)
+            if pending is not None and sample.ctrl_di[0] == pending[0]:
+                write_latencies.append(sample.timestamp - pending[1])
+                del pending_writes[robot_name]
+
+        if now >= next_write:
+            next_write += 1.0
+            for robot_name, master in masters.items():
+                value = 1 - simulator.slaves[robot_name].robot.ctrl_di[0]
+                pending_writes[robot_name] = (value, time.perf_counter())
+                master.set_ctrl_di(0, value)
+                master.set_ctrl_di(1, value)
+
+        hub.flush_di_writes()
+
+    return np.array(ages) * 1000, np.array(write_latencies) * 1000
+
+
+def run(args, simulator: EthernetSlaveSimulator, table: TransmitTable) -> None:
+    simulator.start()
+    names = list(simulator.slaves)
+    mailbox = MotionMailbox(names)
+    latency = MotionLatency(names)
+    hub = EthernetHub()
+
+    try:
+        masters = {}
+        for name in names:
+            host, port = simulator.address(name)
+            masters[name] = hub.create_master(
+                name,
+                host,
+                port=port,
+                transmit_table=table,
+                latency=latency,
+                connect=False,
+            )
+        for master in masters.values():
+            master.connect().result(3.0)
+        for master in masters.values():
+            master.receive_data(mailbox)
+
+        ages, write_latencies = step_loop(
+            hub, mailbox, masters, simulator, latency, args.duration, args.step_rate
+        )
+        received = {name: master.receive_count for name, master in masters.items()}
+        di_writes = [master.di_writes for master in masters.values()]
+        parser_errors = sum(
+            master.parser.checksum_errors
+            + master.parser.format_errors
+            + master.parser.value_errors
+            for master in masters.values()
+        )
+    finally:
+        hub.stop()
+        simulator.stop()
+
+    slave_stats = simulator.get_stats()
+    mailbox_stats = mailbox.get_stats()
+    sent = sum(stats.frames_sent for stats in slave_stats.values())
+    rows = [
+        ("frames sent", sent, ""),
+        ("frames decoded", sum(received.values()), ""),
+        (
+            "frames written in pieces",
+            sum(s.fragmented for s in slave_stats.values()),
+            "",
+        ),
+        ("late frames", sum(s.late for s in slave_stats.values()), ""),
+        ("parser errors", parser_errors, ""),
+        (
+            "decoded per robot",
+            sum(received.values()) / len(names) / args.duration,
+            "/s",
+        ),
+        (
+            "overwritten in the mailbox",
+            sum(s.overwritten for s in mailbox_stats.values()),
+            "",
+        ),
+        (
+            "Ctrl_DI writes acknowledged",
+            sum(s.writes_acked for s in slave_stats.values()),
+            "",
+        ),
+    ]
+    if len(ages):
+        rows += [
+            ("sample age at step p50", np.percentile(ages, 50), "ms"),
+            ("sample age at step p99", np.percentile(ages, 99), "ms"),
+        ]
+    if len(write_latencies):
+        rows += [
+            ("Ctrl_DI write to transmit p50", np.percentile(write_latencies, 50), "ms"),
+            ("Ctrl_DI write to transmit max", write_latencies.max(), "ms"),
+        ]
+
+    rows += [
+        ("DI write packets", sum(w.stats.packets for w in di_writes), ""),
+        ("DI writes acknowledged", sum(w.stats.acked for w in di_writes), ""),
+        ("DI write ack p50", di_writes[0].latency.percentile(50) * 1000, "ms"),
+        ("DI write ack max", di_writes[0].latency.max * 1000, "ms"),
+    ]
+
+    histograms = latency.snapshot()[names[0]]
+    for stage in STAGES:
+        for percent in PERCENTILES:
+            rows.append(
+                (
+                    f"{names[0]} {stage} p{percent}",
+                    histograms[stage][f"p{percent}_ms"],
+                    "ms",
+                )
+            )
+
+    report(
+        f"{len(names)} robots, {table.comm_mode} at {args.rate:g}/s, "
+        f"jitter {args.jitter * 1000:g} ms, fragment {args.fragment:g}, "
+        f"step {args.step_rate:g}/s",
+        rows,
+    )
+
+
+def main():
+    args = parse_args()
+    table = TransmitTable.default("BINARY" if args.binary else "STRING")
+    simulator = create_simulator(args, table)
+
+    if args.serve:
+        serve(simulator)
+    else:
+        run(args, simulator, table)
+
+
+if __name__ == "__main__":
+    main()
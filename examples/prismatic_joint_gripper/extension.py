@@ -36,6 +36,8 @@ from tmrobot.digital_robot.models.setting import RobotSetting  # type: ignore
 from tmrobot.digital_robot.services.echo_client import EchoClient  # type: ignore
 from tmrobot.digital_robot.services.ethernet_master import EthernetData  # type: ignore
 from tmrobot.digital_robot.services.ethernet_master import EthernetMaster  # type: ignore
+from tmrobot.digital_robot.services.gripper_controller import CachedXformPose  # type: ignore
+from tmrobot.digital_robot.services.gripper_controller import PrismaticGripperController  # type: ignore
 from tmrobot.digital_robot.services.virtual_camera_server_secure import VirtualCameraServerSecure  # type: ignore
 from tmrobot.digital_robot.ui import constants as const  # type: ignore
 from tmrobot.digital_robot.ui.extension_ui import ExtensionUI  # type: ignore
@@ -66,7 +68,13 @@ class TMDigitalRobotExtension(omni.ext.IExt):
         self._fps_accumulated = 0
         self._surface_gripper_state = 0
         self._surface_gripper = None
-        self._parallel_gripper = None
+        self._parallel_gripper: PrismaticGripperController = None
+        self._parallel_gripper_joints = [
+            "/World/Robot01/Robotiq_Hand_E_edit/Slider_1",
+            "/World/Robot01/Robotiq_Hand_E_edit/Slider_2",
+        ]
+        self._work_piece_pose: CachedXformPose = None
+        self._work_piece_prim_path = "/World/Accessories/work_piece"
         self._workpiece_id = 0
         self._world: World = World()
         self._default_workpiece_position = Gf.Vec3d(0, 0.25, 0.5155)
@@ -232,6 +240,18 @@ class TMDigitalRobotExtension(omni.ext.IExt):
             ).IsValid():
                 self._world.stage.RemovePrim(self._default_workpieces_prim_path)
 
+        # Write the gripper drive targets and the workpiece pose through cached
+        # attributes, without adding ChangeProperty commands to the undo stack
+        self._parallel_gripper = PrismaticGripperController(
+            self._world.stage,
+            self._parallel_gripper_joints,
+            open_position=0.025,
+            closed_position=0.0,
+        )
+        self._work_piece_pose = CachedXformPose(
+            self._world.stage, self._work_piece_prim_path
+        )
+
         # Play the world
         async def _play_world_async():
             await self._world.initialize_simulation_context_async()
@@ -307,69 +327,16 @@ class TMDigitalRobotExtension(omni.ext.IExt):
                     self._surface_gripper_state = motion.ctrl_do[0]
 
                     if self._surface_gripper_state == 1:
-
-                        omni.kit.commands.execute(
-                            "ChangeProperty",
-                            prop_path=Sdf.Path(
-                                "/World/Robot01/Robotiq_Hand_E_edit/Slider_1.drive:linear:physics:targetPosition"
-                            ),
-                            value=0,
-                            prev=None,
-                            usd_context_name=omni.usd.get_context().get_stage(),
-                        )
-
-                        omni.kit.commands.execute(
-                            "ChangeProperty",
-                            prop_path=Sdf.Path(
-                                "/World/Robot01/Robotiq_Hand_E_edit/Slider_2.drive:linear:physics:targetPosition"
-                            ),
-                            value=0,
-                            prev=None,
-                            usd_context_name=omni.usd.get_context().get_stage(),
-                        )
-
+                        self._parallel_gripper.close()
                         self._console("Parallel Gripper is closed")
 
                     if self._surface_gripper_state == 0:
-                        omni.kit.commands.execute(
-                            "ChangeProperty",
-                            prop_path=Sdf.Path(
-                                "/World/Robot01/Robotiq_Hand_E_edit/Slider_1.drive:linear:physics:targetPosition"
-                            ),
-                            value=0.025,
-                            prev=None,
-                            usd_context_name=omni.usd.get_context().get_stage(),
-                        )
-
-                        omni.kit.commands.execute(
-                            "ChangeProperty",
-                            prop_path=Sdf.Path(
-                                "/World/Robot01/Robotiq_Hand_E_edit/Slider_2.drive:linear:physics:targetPosition"
-                            ),
-                            value=0.025,
-                            prev=None,
-                            usd_context_name=omni.usd.get_context().get_stage(),
-                        )
-
+                        self._parallel_gripper.open()
                         self._console("Parallel Gripper is opened")
 
-                        omni.kit.commands.execute(
-                            "ChangeProperty",
-                            prop_path=Sdf.Path(
-                                "/World/Accessories/work_piece.xformOp:translate"
-                            ),
-                            value=Gf.Vec3d(0, 0.25, 0.51551),
-                            prev=None,
-                        )
-
-                        omni.kit.commands.execute(
-                            "ChangeProperty",
-                            prop_path=Sdf.Path(
-                                "/World/Accessories/work_piece.xformOp:orient"
-                            ),
-                            value=Gf.Quatd(1.0, Gf.Vec3d(0.0, 0.0, 0.0)),
-                            prev=None,
-                            usd_context_name=omni.usd.get_context().get_stage(),
+                        self._work_piece_pose.set(
+                            Gf.Vec3d(0, 0.25, 0.51551),
+                            Gf.Quatd(1.0, Gf.Vec3d(0.0, 0.0, 0.0)),
                         )
 
         except queue.Empty:
@@ -1,11 +1,17 @@
 import asyncio
 import gc
+import json
 import logging
+import math
+import os  # type: ignore
 import queue  # type: ignore
 import random  # type: ignore
 import socket  # type: ignore
+import tempfile  # type: ignore
 import threading  # type: ignore
+import time  # type: ignore
 import traceback  # type: ignore
+import xml.etree.ElementTree as ET
 from datetime import datetime, timezone  # type: ignore
 from typing import List  # type: ignore
 
@@ -13,9 +19,7 @@ import numpy as np  # noqa
 import omni.kit.commands
 import omni.kit.viewport.utility as vp_utils  # noqa
 from isaacsim.core.api.world.world import World
-from isaacsim.core.utils.prims import get_prim_at_path
 from isaacsim.core.utils.stage import (
-    add_reference_to_stage,
     clear_stage,
     close_stage,
     create_new_stage,
@@ -27,19 +31,44 @@ from isaacsim.robot.surface_gripper._surface_gripper import (  # noqa
     Surface_Gripper,
     Surface_Gripper_Properties,
 )
-from pxr import Gf, Sdf, Usd, UsdGeom
+from pxr import Gf, Sdf
 
 # isort: off
 from tmrobot.digital_robot.models.digital_camera import DigitalCamera  # type: ignore
 from tmrobot.digital_robot.models.digital_robot import DigitalRobot  # type: ignore
 from tmrobot.digital_robot.models.setting import ExtensionSetting  # type: ignore
 from tmrobot.digital_robot.models.setting import RobotSetting  # type: ignore
-from tmrobot.digital_robot.services.echo_client import EchoClient  # type: ignore
-from tmrobot.digital_robot.services.ethernet_master import EthernetData  # type: ignore
-from tmrobot.digital_robot.services.ethernet_master import EthernetMaster  # type: ignore
+from tmrobot.digital_robot.services.bbox_service import BBoxService  # type: ignore
+from tmrobot.digital_robot.services.camera_property_queue import CameraPropertyQueue  # type: ignore
+from tmrobot.digital_robot.services.ethernet_hub import AsyncEthernetMaster  # type: ignore
+from tmrobot.digital_robot.services.ethernet_hub import EthernetHub  # type: ignore
+from tmrobot.digital_robot.services.fleet_articulation import FleetArticulation  # type: ignore
+from tmrobot.digital_robot.services.gripper_controller import CachedAttributes  # type: ignore
+from tmrobot.digital_robot.services.gripper_controller import PrismaticGripperController  # type: ignore
+from tmrobot.digital_robot.services.grpc_channel_pool import channel_pool  # type: ignore
+from tmrobot.digital_robot.services.idle_throttle import IdleThrottle  # type: ignore
+from tmrobot.digital_robot.services.image_cache import CachedVirtualCameraServer  # type: ignore
+from tmrobot.digital_robot.services.image_cache import SceneVersion  # type: ignore
+from tmrobot.digital_robot.services.instanced_workpieces import InstancedWorkpieces  # type: ignore
+from tmrobot.digital_robot.services.io_rules import IORuleEngine  # type: ignore
+from tmrobot.digital_robot.services.lockstep import LockstepScheduler  # type: ignore
+from tmrobot.digital_robot.services.motion_latency import MotionLatency  # type: ignore
+from tmrobot.digital_robot.services.motion_log import MOTION_LOG_EXTENSION  # type: ignore
+from tmrobot.digital_robot.services.motion_log import MotionLog  # type: ignore
+from tmrobot.digital_robot.services.motion_log import MotionRecorder  # type: ignore
+from tmrobot.digital_robot.services.motion_log import MotionReplayer  # type: ignore
+from tmrobot.digital_robot.services.motion_mailbox import MotionMailbox  # type: ignore
+from tmrobot.digital_robot.services.motion_profile import PROFILE_TRAPEZOID  # type: ignore
+from tmrobot.digital_robot.services.motion_profile import MotionProfiles  # type: ignore
+from tmrobot.digital_robot.services.service_preflight import ServicePreflight  # type: ignore
+from tmrobot.digital_robot.services.tmsvr_parser import MotionSample  # type: ignore
+from tmrobot.digital_robot.services.trajectory_buffer import TrajectoryBuffer  # type: ignore
+from tmrobot.digital_robot.services.transmit_table import TransmitTable  # type: ignore
 from tmrobot.digital_robot.services.virtual_camera_server_secure import VirtualCameraServerSecure  # type: ignore
+from tmrobot.digital_robot.services.workpiece_pool import WorkpiecePool  # type: ignore
 from tmrobot.digital_robot.ui import constants as const  # type: ignore
 from tmrobot.digital_robot.ui.extension_ui import ExtensionUI  # type: ignore
+from tmrobot.digital_robot.ui.latency_window import MotionLatencyWindow  # type: ignore
 
 # isort: on
 
@@ -53,17 +82,57 @@ class TMDigitalRobotExtension(omni.ext.IExt):
         self._models = {}
         self._virtual_camera_thread: threading.Thread = None
         self._virtual_camera_server: VirtualCameraServerSecure = None
+        self._virtual_camera_enabled = True  # False without the Virtual Camera server, e.g. many headless sessions
+        self._scene_version = SceneVersion()  # invalidates the cached camera images
+        self._camera_raw_pixel_format = None  # "RGB" or "MONO" to send unencoded images
         self._dg_robots: dict[str, DigitalRobot] = {}
+        self._fleet: FleetArticulation = None  # batched joint targets of all robots
         self._dg_cameras: dict[str, dict[str, DigitalCamera]] = {}  # [tmflow ip][camera name]
-        self._ethernet_masters: dict[str, EthernetMaster] = {}  # [robot name]
-        self._ethernet_master_threads: dict[str, threading.Thread] = {}  # [robot name]
-        self._motion_queue: queue.Queue = None
+        self._ethernet_hub = EthernetHub()
+        self._ethernet_masters: dict[str, AsyncEthernetMaster] = {}  # [robot name]
+        self._motion_queue: MotionMailbox = None
+        self._motion_interpolation = True  # resample the received motion at each physics step
+        self._motion_latency_budget = 0.05  # seconds the applied motion lags the received one
+        self._motion_record_dir = None  # record the received motion, one <robot name>.tmlog per robot
+        self._motion_replay_dir = None  # replay the .tmlog of this directory instead of connecting TMflow
+        self._motion_replay_speed = 1.0  # 2.0 for twice as fast, None as fast as possible
+        self._motion_replayer: MotionReplayer = None
+        self._motion_replay_lockstep = False  # step physics by the replayed timestamps, see LockstepScheduler
+        self._lockstep_steps_per_sample = 4  # physics steps per sample of the longest replayed log
+        self._lockstep_render_interval = 10  # samples between the rendered steps
+        self._lockstep: LockstepScheduler = None  # stepped by its owner, e.g. HeadlessRunner.run_lockstep
+        self._motion_latency = MotionLatency()  # per robot and stage latency histograms
+        self._motion_latency_file = None  # also dump the latency histograms to this JSON file on stop
+        self._latency_window: MotionLatencyWindow = None
+        self._latency_refresh_interval = 1.0  # seconds between the latency window updates
+        self._latency_refreshed = 0.0
+        self._trajectories: dict[str, TrajectoryBuffer] = {}  # [robot name]
+        self._preflight_deadline = 3.0  # seconds for the service checks of all robots
+        # EthSlave/Transmit/*.xml of the TMflow project, read when connecting
+        self._transmit_table_file = None  # the default STRING table when None
         self._robot_settings: List[RobotSetting] = []
         self._set_queue = queue.Queue()
+        self._camera_properties: CameraPropertyQueue = None  # consumer of the set queue
         self._simulation_count = 0
         self._surface_gripper_state = 0
+        self._io_rules_file = None  # JSON file of Ctrl_DO/End_DO edge -> action rules, see IORuleEngine
+        self._io_rules: IORuleEngine = None
+        self._rule_grippers: dict[tuple, PrismaticGripperController] = {}  # [joint paths]
+        self._rule_attributes: dict[str, CachedAttributes] = {}  # [attribute path]
+        self._motion_profiles: MotionProfiles = None  # kinematic moves of the accessories, see _move_to_target
         self._surface_gripper = None
-        self._workpiece_id = 0
+        self._workpiece_pool: WorkpiecePool = None
+        self._workpiece_pool_size = 8  # pre-created workpieces, the oldest one is reused when all are spawned
+        self._workpiece_spawn_radius = 0.005  # meters in x and y, a workpiece this close occupies the spawn position
+        self._workpiece_grip_radius = 0.05  # meters around the closing fingers, a workpiece this close is held
+        self._held_workpieces: dict[tuple, list] = {}  # [gripper joint paths] held workpieces, never recycled
+        # JSON file {"positions": [[x, y, z], ...], "yaws": [radians, ...]} of resting parts
+        self._bulk_workpieces_file = None  # added when the services start
+        self._bulk_workpieces: InstancedWorkpieces = None  # point instanced resting parts, see _add_bulk_workpieces
+        self._bbox: BBoxService = None  # cached prim bounds of the current stage, see _get_bbox_service
+        self._idle_after = 3.0  # seconds without joint, pose, DO or grab activity before throttling, None to never
+        self._idle_update_rate = 5.0  # Kit updates per second while idle, the viewport doesn't render
+        self._idle_throttle: IdleThrottle = None
         self._world: World = World()
         self._default_workpiece_position = Gf.Vec3d(0, 0.25, 0.5155)
         self._default_workpieces_prim_path = "/World/Accessories/Workpieces"
@@ -80,21 +149,36 @@ class TMDigitalRobotExtension(omni.ext.IExt):
         )
 
         self._initialize()
+        self._latency_window = MotionLatencyWindow(
+            self._motion_latency, self._on_dump_motion_latency
+        )
 
     def on_shutdown(self):
         if hasattr(self, "_virtual_camera_server"):
             if self._virtual_camera_server is not None:
                 asyncio.ensure_future(self._virtual_camera_server.stop())
 
+        self._scene_version.unwatch_stage()
+        if self._bbox is not None:
+            self._bbox.unwatch()
+            self._bbox = None
+
         if self._world.stage.GetPrimAtPath(Sdf.Path("/World")).IsValid():
             for robot in const.ROBOT_LIST:
                 if self._world.scene.object_exists(robot):
                     self._world.scene.remove_object(robot)
 
-        if len(self._ethernet_masters) != 0:
-            for robot in self._robot_settings:
-                self._ethernet_masters[robot.name].stop()
-                self._ethernet_master_threads[robot.name].join(timeout=0)
+            if self._fleet is not None:
+                self._remove_fleet_views()
+
+        self._ethernet_hub.stop()
+        channel_pool.close()
+
+        if self._motion_replayer is not None:
+            self._motion_replayer.stop()
+
+        if self._idle_throttle is not None:
+            self._idle_throttle.restore()
 
         if self._world.physics_callback_exists("sim_step"):
             self._world.remove_physics_callback("sim_step")
@@ -112,6 +196,10 @@ class TMDigitalRobotExtension(omni.ext.IExt):
         self._robot_settings = []
         self._ext_ui.clear()
 
+        if self._latency_window is not None:
+            self._latency_window.destroy()
+            self._latency_window = None
+
         if is_stage_loading():
             clear_stage()
             close_stage()
@@ -146,8 +234,8 @@ class TMDigitalRobotExtension(omni.ext.IExt):
             return
 
         self._initialize()
-        self._ext_ui.change_action_mode(const.BUTTON_STOP_SERVICE)
-        self._ext_ui.update_message("Services started")
+        self._ext_ui.change_action_mode(const.BUTTON_DISABLE_ALL)
+        self._ext_ui.update_message("Checking services...")
         self._ext_ui.collapsed_robot_settings(False)
         self._ext_ui.on_save_scene()
 
@@ -159,33 +247,75 @@ class TMDigitalRobotExtension(omni.ext.IExt):
             self._world.stage.RemovePrim(self._default_workpieces_prim_path)
 
         self._robot_settings = self._get_activated_robots_setting()
+        self._motion_queue = MotionMailbox(
+            [robot.name for robot in self._robot_settings]
+        )
+        self._trajectories = {
+            robot.name: TrajectoryBuffer(latency_budget=self._motion_latency_budget)
+            for robot in self._robot_settings
+        }
+        self._motion_latency.reset([robot.name for robot in self._robot_settings])
+        self._motion_latency.latency_budget = (
+            self._motion_latency_budget if self._motion_interpolation else 0.0
+        )
 
-        # Check if TMSimulator services are available
-        for setting in self._robot_settings:
-            self._console(f"Add {setting.name} to the scene")
+        # Check if TMSimulator services are available, for all robots at once and
+        # without blocking the main thread
+        asyncio.ensure_future(self._check_services_async())
+
+    async def _check_services_async(self):
+        preflight = ServicePreflight(
+            self._robot_settings, const.PORT_ETHERNET, self._preflight_deadline
+        )
+        report = await preflight.run_async()
+        self._console(report.summary())
+
+        messages = []
+        for result in report.results:
+            for error in result.errors:
+                logger.error(f"{result.robot_name}: {error}")
 
             # Check if the status of TMSimulator Virtual Camera API is Activated
-            echo_client = EchoClient(setting.ip)
-            if not echo_client.connectVirtualCameraAPI():
+            if not result.virtual_camera:
                 warning_message = (
-                    f"Can't connect to {setting.name} Virtual Camera API at IP: {setting.ip}, "
+                    f"Can't connect to {result.robot_name} Virtual Camera API at IP: {result.ip}, "
                     "please check if Virtual Camera API is enabled if you are using TMSimulator. "
                     "You can ignore this message if you are using TMFlow with physical robot."
                 )
                 logger.warning(warning_message)
-                self._ext_ui.update_message(warning_message)
+                messages.append(warning_message)
 
             # Check if the status of TMSimulator Ethernet Slave is Enabled
-            if not self._is_service_on(setting.ip, const.PORT_ETHERNET):
+            if not result.ethernet and self._motion_replay_dir is None:
                 error_message = (
-                    f"Can't connect to {setting.name} Ethernet at {setting.ip}:{const.PORT_ETHERNET}, "
+                    f"Can't connect to {result.robot_name} Ethernet at {result.ip}:{const.PORT_ETHERNET}, "
                     "please check if the status of TMSimulator Ethernet Slave is Enabled"
                 )
                 logger.error(error_message)
-                self._ext_ui.update_message(error_message)
-                self._ext_ui.change_action_mode(const.BUTTON_START_SERVICE)
-                self._ext_ui.collapsed_robot_settings(True)
-                return
+                messages.append(error_message)
+
+        if not report.ethernet_ok() and self._motion_replay_dir is None:
+            self._ext_ui.update_message("\n".join(messages))
+            self._ext_ui.change_action_mode(const.BUTTON_START_SERVICE)
+            self._ext_ui.collapsed_robot_settings(True)
+            return
+
+        self._ext_ui.update_message("\n".join(["Services started"] + messages))
+        self._start_services()
+
+    def _start_services(self):
+        self._io_rules = self._create_io_rules()
+        self._rule_grippers = {}
+        self._held_workpieces = {}
+        self._rule_attributes = {}
+        self._motion_profiles = MotionProfiles(self._world.stage)
+
+        # Lockstep renders on its own schedule, it isn't throttled
+        if self._idle_after is not None and not self._motion_replay_lockstep:
+            self._idle_throttle = IdleThrottle(self._idle_after, self._idle_update_rate)
+
+        for setting in self._robot_settings:
+            self._console(f"Add {setting.name} to the scene")
 
             # Create Digital Robots
             try:
@@ -197,8 +327,6 @@ class TMDigitalRobotExtension(omni.ext.IExt):
                 for camera in camera_list:
                     self._dg_cameras[setting.ip][camera.get_serial_number()] = camera
 
-                self._motion_queue = queue.Queue(maxsize=len(self._robot_settings))
-
                 if not self._world.scene.object_exists(setting.name):
                     self._world.scene.add(self._dg_robots[setting.name].get_robot())
 
@@ -250,6 +378,26 @@ class TMDigitalRobotExtension(omni.ext.IExt):
             #         )
             #     self._spawn_workpiece()
 
+        # Create the workpieces before the simulation plays, spawning only activates one
+        if self._is_prim_exist(self._default_workpieces_prim_path):
+            self._get_workpiece_pool().fill()
+
+        if self._bulk_workpieces_file is not None:
+            self._load_bulk_workpieces()
+
+        # Write the joint targets of the robots of each model with one articulation view
+        try:
+            self._fleet = FleetArticulation(
+                {name: robot.get_robot() for name, robot in self._dg_robots.items()},
+                {setting.name: setting.model for setting in self._robot_settings},
+            )
+            self._remove_fleet_views()
+            for view in self._fleet.views:
+                self._world.scene.add(view)
+        except Exception as e:
+            logger.error(f"Failed to create the robot fleet views: {e}")
+            self._fleet = None
+
         # Play the world
         async def _play_world_async():
             await self._world.initialize_simulation_context_async()
@@ -261,65 +409,388 @@ class TMDigitalRobotExtension(omni.ext.IExt):
             await update_stage_async()
             await self._world.play_async()
 
-        # Create a ethernet master threads for updating robot motion from ethernet slave
+        # Connect the ethernet masters for updating robot motion from ethernet slave,
+        # all connections share the event loop of the ethernet hub
         async def _ethernet_master_async():
 
-            robot_models_are_different = []
-
-            for robot in self._robot_settings:
-                if robot.activated:
-                    self._ethernet_masters[robot.name] = EthernetMaster(
-                        robot.name, robot.ip
-                    )
+            if self._motion_replay_dir is not None:
+                if self._motion_replay_lockstep:
+                    self._create_lockstep()
+                else:
+                    self._start_motion_replay()
+                return
 
-                    actual_robot_model = self._ethernet_masters[
-                        robot.name
-                    ].get_robot_model()
+            robot_models_are_different = []
+            robots = [robot for robot in self._robot_settings if robot.activated]
+
+            for robot in robots:
+                self._ethernet_masters[robot.name] = self._ethernet_hub.create_master(
+                    robot.name,
+                    robot.ip,
+                    transmit_table=self._load_transmit_table(),
+                    recorder=self._create_motion_recorder(robot.name),
+                    latency=self._motion_latency,
+                    connect=False,
+                )
 
-                    if actual_robot_model in const.ROBOT_MODELS:
-                        if actual_robot_model != robot.model:
-                            robot_models_are_different.append(
-                                f"{robot.name}: Virtual Robot model {robot.model} is connect to a "
-                                f"TMSimulator/TMflow model {actual_robot_model}, which may cause unexpected behavior"
-                            )
+            results = await asyncio.gather(
+                *[
+                    asyncio.wrap_future(master.connect())
+                    for master in self._ethernet_masters.values()
+                ],
+                return_exceptions=True,
+            )
 
-                        self._console(
-                            f"{robot.name}({robot.model}) is connect to {robot.ip}({actual_robot_model})"
+            for robot, result in zip(robots, results):
+                if isinstance(result, Exception):
+                    logger.error(
+                        f"Failed to connect {robot.name} Ethernet at {robot.ip}: {result}"
+                    )
+                    continue
+
+                try:
+                    actual_robot_model = await asyncio.wait_for(
+                        asyncio.wrap_future(
+                            self._ethernet_masters[robot.name].request_robot_model()
+                        ),
+                        timeout=3,
+                    )
+                except Exception as e:
+                    logger.error(f"Get wrong robot model with exception: {e}")
+                    actual_robot_model = "Unknown"
+
+                if actual_robot_model in const.ROBOT_MODELS:
+                    if actual_robot_model != robot.model:
+                        robot_models_are_different.append(
+                            f"{robot.name}: Virtual Robot model {robot.model} is connect to a "
+                            f"TMSimulator/TMflow model {actual_robot_model}, which may cause unexpected behavior"
                         )
 
-                    self._ethernet_master_threads[robot.name] = threading.Thread(
-                        target=self._ethernet_masters[robot.name].receive_data,
-                        args=(self._motion_queue,),
+                    self._console(
+                        f"{robot.name}({robot.model}) is connect to {robot.ip}({actual_robot_model})"
                     )
 
-                    self._ethernet_master_threads[robot.name].start()
+                self._ethernet_masters[robot.name].receive_data(self._motion_queue)
 
             if len(robot_models_are_different) > 0:
                 self._ext_ui.update_message("\n".join(robot_models_are_different))
 
         # Create Virtual Camera gRPC Server
-        self._virtual_camera_server = VirtualCameraServerSecure(
-            self._set_queue, self._dg_cameras
-        )
+        if self._virtual_camera_enabled:
+            self._virtual_camera_server = CachedVirtualCameraServer(
+                self._set_queue,
+                self._dg_cameras,
+                self._scene_version,
+                raw_pixel_format=self._camera_raw_pixel_format,
+            )
+            if self._idle_throttle is not None:
+                self._virtual_camera_server.on_request = self._idle_throttle.mark_active
+            asyncio.ensure_future(self._virtual_camera_server.start())
+        self._scene_version.watch_stage(self._world.stage)
+        self._camera_properties = CameraPropertyQueue(self._set_queue, self._dg_cameras)
 
-        asyncio.ensure_future(self._virtual_camera_server.start())
         asyncio.ensure_future(_ethernet_master_async())
         asyncio.ensure_future(_play_world_async())
         omni.kit.commands.execute("SelectNone")
 
         self._ext_ui.change_action_mode(const.BUTTON_STOP_SERVICE)
 
+        if self._latency_window is not None:
+            self._latency_window.show()
+
+    def _create_io_rules(self) -> IORuleEngine:
+        if self._io_rules_file is None:
+            return None
+
+        actions = {
+            "gripper_close": self._on_rule_gripper_close,
+            "gripper_open": self._on_rule_gripper_open,
+            "drive_target": self._on_rule_drive_target,
+            "set_di": self._on_rule_set_di,
+            "spawn_workpiece": self._on_rule_spawn_workpiece,
+            "pick_bulk_workpiece": self._on_rule_pick_bulk_workpiece,
+            "move_to": self._on_rule_move_to,
+            "console": self._on_rule_console,
+        }
+        try:
+            io_rules = IORuleEngine.from_json(self._io_rules_file, actions)
+            io_rules.validate()
+        except (OSError, ValueError, TypeError) as e:
+            logger.error(f"Failed to load the I/O rules {self._io_rules_file}: {e}")
+            return None
+
+        self._console(f"{len(io_rules.rules)} I/O rules from {self._io_rules_file}")
+        return io_rules
+
+    # === I/O rule actions, action(robot_name, rising, **params) ===
+    def _on_rule_gripper_close(self, robot_name: str, rising: bool, **gripper):
+        if gripper:
+            rule_gripper = self._get_rule_gripper(**gripper)
+            rule_gripper.close()
+            self._attach_workpieces(tuple(gripper["joints"]), rule_gripper)
+            return
+
+        if self._surface_gripper is None:
+            raise RuntimeError("no surface gripper")
+        self._surface_gripper.close()
+        self._console(f"{robot_name} Surface Gripper suck")
+
+    def _on_rule_gripper_open(self, robot_name: str, rising: bool, **gripper):
+        if gripper:
+            self._get_rule_gripper(**gripper).open()
+            self._detach_workpieces(tuple(gripper["joints"]))
+            return
+
+        if self._surface_gripper is None:
+            raise RuntimeError("no surface gripper")
+        self._surface_gripper.open()
+        self._console(f"{robot_name} Surface Gripper release")
+
+    def _get_rule_gripper(
+        self, joints: list, open_position=0.025, closed_position=0.0
+    ) -> PrismaticGripperController:
+        # The prismatic joints of a parallel gripper, e.g. [.../Slider_1, .../Slider_2]
+        key = tuple(joints)
+        gripper = self._rule_grippers.get(key)
+        if gripper is None:
+            gripper = PrismaticGripperController(
+                self._world.stage, joints, open_position, closed_position
+            )
+            self._rule_grippers[key] = gripper
+        return gripper
+
+    def _attach_workpieces(self, key: tuple, gripper: PrismaticGripperController):
+        # The pool doesn't recycle the workpieces between the fingers until they open
+        grip_point = gripper.grip_point()
+        if self._workpiece_pool is None or grip_point is None:
+            return
+        self._held_workpieces[key] = self._workpiece_pool.attach_near(
+            grip_point, self._workpiece_grip_radius
+        )
+
+    def _detach_workpieces(self, key: tuple):
+        held = self._held_workpieces.pop(key, None)
+        if held and self._workpiece_pool is not None:
+            self._workpiece_pool.detach(held)
+
+    def _on_rule_drive_target(
+        self, robot_name: str, rising: bool, attribute: str, value
+    ):
+        # e.g. /World/Robot01/Robotiq_Hand_E_edit/Slider_1.drive:linear:physics:targetPosition
+        target = self._rule_attributes.get(attribute)
+        if target is None:
+            target = CachedAttributes(self._world.stage, [attribute])
+            self._rule_attributes[attribute] = target
+        target.set([value])
+
+    def _on_rule_set_di(
+        self, robot_name: str, rising: bool, item: str, index: int, value: int
+    ):
+        master = self._ethernet_masters[robot_name]
+        if item == "End_DI":
+            master.set_end_di(index, value)
+        elif item == "Ctrl_DI":
+            master.set_ctrl_di(index, value)
+        else:
+            raise ValueError(f"Unsupported DI {item}")
+
+    def _on_rule_spawn_workpiece(self, robot_name: str, rising: bool):
+        self._spawn_workpiece()
+
+    def _on_rule_pick_bulk_workpiece(
+        self, robot_name: str, rising: bool, position: list, radius: float = 0.02
+    ):
+        if not self._pick_bulk_workpiece(tuple(position), radius):
+            raise RuntimeError(f"no bulk workpiece within {radius} m of {position}")
+
+    def _on_rule_move_to(
+        self,
+        robot_name: str,
+        rising: bool,
+        prim_path: str,
+        target: list,
+        arrived_di: dict = None,
+        **profile,
+    ):
+        # e.g. a conveyor part, arrived_di {"item": "End_DI", "index": 1, "value": 1}
+        def on_arrived(path: str):
+            self._on_rule_set_di(robot_name, rising, **arrived_di)
+
+        self._move_to_target(
+            prim_path,
+            target,
+            on_arrived=on_arrived if arrived_di is not None else None,
+            **profile,
+        )
+
+    def _on_rule_console(self, robot_name: str, rising: bool, message: str):
+        self._console(f"{robot_name}: {message}")
+
+    def _load_transmit_table(self) -> TransmitTable:
+        if self._transmit_table_file is None:
+            return TransmitTable.default()
+
+        try:
+            return TransmitTable.from_xml(self._transmit_table_file)
+        except (OSError, ET.ParseError, ValueError) as e:
+            message = (
+                f"Failed to load the transmit table {self._transmit_table_file}: {e}"
+            )
+            logger.error(message)
+            self._ext_ui.update_message(message)
+            return TransmitTable.default()
+
+    def _create_motion_recorder(self, robot_name: str) -> MotionRecorder:
+        if self._motion_record_dir is None:
+            return None
+
+        os.makedirs(self._motion_record_dir, exist_ok=True)
+        path = os.path.join(self._motion_record_dir, robot_name + MOTION_LOG_EXTENSION)
+        self._console(f"Record {robot_name} motion to {path}")
+        return MotionRecorder(path, robot_name)
+
+    def _load_motion_logs(self) -> List[MotionLog]:
+        logs = []
+        for robot in self._robot_settings:
+            path = os.path.join(
+                self._motion_replay_dir, robot.name + MOTION_LOG_EXTENSION
+            )
+            if os.path.exists(path):
+                logs.append(MotionLog(path))
+                self._console(f"Replay {robot.name} motion from {path}")
+            else:
+                logger.warning(f"No motion log for {robot.name} at {path}")
+        return logs
+
+    def _start_motion_replay(self):
+        try:
+            self._motion_replayer = MotionReplayer(
+                self._load_motion_logs(),
+                self._motion_queue,
+                speed=self._motion_replay_speed,
+                loop=True,
+            )
+        except ValueError as e:
+            logger.error(f"Failed to start the motion replay: {e}")
+            return
+        self._motion_replayer.start()
+
+    def _create_lockstep(self):
+        try:
+            self._lockstep = LockstepScheduler(
+                self._world,
+                self._load_motion_logs(),
+                self._apply_joint_positions,
+                self._on_robot_motion,
+                steps_per_sample=self._lockstep_steps_per_sample,
+                render_interval=self._lockstep_render_interval,
+            )
+        except ValueError as e:
+            logger.error(f"Failed to create the lockstep scheduler: {e}")
+
+    def _on_dump_motion_latency(self):
+        path = self._motion_latency_file or os.path.join(
+            tempfile.gettempdir(), "tm_digital_robot_motion_latency.json"
+        )
+        self._dump_motion_latency(path)
+        self._latency_window.set_status(f"Saved to {path}")
+
+    def _dump_motion_latency(self, path: str):
+        try:
+            self._motion_latency.dump_json(path)
+            self._console(f"Motion latency saved to {path}")
+        except OSError as e:
+            logger.error(f"Failed to save the motion latency to {path}: {e}")
+
     def _on_simulation_step(self, step_size):
         self._simulation_count += 1
+        self._scene_version.advance(self._simulation_count)
 
-        try:
-            motion: EthernetData = self._motion_queue.get_nowait()
+        # Apply the camera properties set by TMflow since the last step
+        if self._camera_properties is not None:
+            if self._camera_properties.apply(self._world.stage) > 0:
+                self._scene_version.bump()
+
+        # Move the accessories, one batched write of all their translations
+        if self._motion_profiles is not None:
+            self._motion_profiles.step(step_size)
+
+        if self._motion_queue is None:
+            return
+
+        now = time.perf_counter()
+
+        # Take the latest motion of every robot, one sample per robot per step
+        motions = list(self._motion_queue.drain().values())
+        dequeued = time.perf_counter()
+        for motion in motions:
+            if self._motion_interpolation:
+                self._trajectories[motion.robot_name].push(
+                    motion.timestamp, motion.joint_radian
+                )
+            else:
+                self._apply_joint_positions(motion.robot_name, motion.joint_radian)
+
+        if self._motion_interpolation:
+            for robot_name, trajectory in self._trajectories.items():
+                joint_positions = trajectory.sample(now)
+                if joint_positions is not None:
+                    self._apply_joint_positions(robot_name, joint_positions)
+
+        if self._fleet is not None:
+            self._fleet.apply()
+
+        # The apply stage ends with the joint targets, the I/O below isn't part of it
+        applied = time.perf_counter()
+        self._motion_latency.record_applied(motions, dequeued, applied)
+
+        for motion in motions:
+            self._on_robot_motion(motion)
+            if self._idle_throttle is not None:
+                self._idle_throttle.observe_outputs(motion)
+
+        # Send the DI writes of this step, one packet per robot from the hub I/O thread
+        self._ethernet_hub.flush_di_writes()
+
+        # Lower the update rate once nothing moved for a while, resume on any change
+        if self._idle_throttle is not None:
+            self._idle_throttle.update(applied, self._scene_version.value)
+
+        if applied - self._latency_refreshed > self._latency_refresh_interval:
+            self._latency_refreshed = applied
+            if self._latency_window is not None:
+                self._latency_window.refresh()
+
+    def _remove_fleet_views(self):
+        for view in self._fleet.views:
+            if self._world.scene.object_exists(view.name):
+                self._world.scene.remove_object(view.name)
+
+    def _apply_joint_positions(self, robot_name: str, joint_positions):
+        self._scene_version.update_joints(robot_name, joint_positions)
+
+        # Until the fleet views are initialized, or for a robot they can't write
+        if self._fleet is not None and self._fleet.set_target(
+            robot_name, joint_positions
+        ):
+            return
 
-            self._dg_robots[motion.robot_name].apply_action(
-                ArticulationAction(joint_positions=motion.joint_radian)
+        try:
+            self._dg_robots[robot_name].apply_action(
+                ArticulationAction(joint_positions=joint_positions)
             )
+        except Exception as e:  # noqa
+            # logger.warning(f"{robot_name}: failed to update robot motion: {e}")
+            pass
+
+    def _on_robot_motion(self, motion: MotionSample):
+        try:
+            # Ctrl_DO/End_DO edges to actions, see self._io_rules_file
+            if self._io_rules is not None:
+                self._io_rules.process(motion)
 
             # === (Surface Gripper Example) Uncomment the code below to control the surface gripper ===
+            # The same as examples/io_rules/surface_gripper.json
             # if motion.robot_name == const.ROBOT_LIST[0]:
             #     if self._surface_gripper_state != motion.ctrl_do[0]:
             #         self._surface_gripper_state = motion.ctrl_do[0]
@@ -334,11 +805,8 @@ class TMDigitalRobotExtension(omni.ext.IExt):
             #             self._spawn_workpiece()
             #             self._ethernet_masters[motion.robot_name].set_end_di(0, 1)
 
-        except queue.Empty:
-            # logger.warning("Motion queue is empty")
-            pass
         except Exception as e:  # noqa
-            # logger.warning(f"{motion.robot_name}: failed to update robot motion: {e}")
+            # logger.warning(f"{motion.robot_name}: failed to handle robot motion: {e}")
             pass
 
     def _on_stop_service(self):
@@ -347,6 +815,16 @@ class TMDigitalRobotExtension(omni.ext.IExt):
             self._ext_ui.update_message("Services stopping...")
             self._ext_ui.collapsed_robot_settings(True)
 
+            # Stop at the full update rate
+            if self._idle_throttle is not None:
+                self._idle_throttle.restore()
+                stats = self._idle_throttle.stats
+                if stats.idled > 0:
+                    self._console(
+                        f"Idle: {stats.idled} times, {stats.idle_time:.1f} s throttled"
+                    )
+                self._idle_throttle = None
+
             await self._world.stop_async()
 
             if self._world.stage.GetPrimAtPath(
@@ -354,17 +832,76 @@ class TMDigitalRobotExtension(omni.ext.IExt):
             ).IsValid():
                 self._world.stage.RemovePrim(self._default_workpieces_prim_path)
 
+            for robot_name, master in self._ethernet_masters.items():
+                if master.di_writes.stats.requested > 0:
+                    self._console(f"{robot_name} {master.di_writes.summary()}")
+
+            self._ethernet_hub.stop()
+            if self._motion_replayer is not None:
+                self._motion_replayer.stop()
+                self._motion_replayer = None
+            if self._lockstep is not None:
+                self._console(self._lockstep.summary())
+                self._lockstep.restore()
+                self._lockstep = None
+
             for robot in self._robot_settings:
-                self._ethernet_masters[robot.name].stop()
                 self._world.scene.remove_object(robot.name)
-                self._ethernet_master_threads[robot.name].join(timeout=0)
+
+            if self._fleet is not None:
+                self._remove_fleet_views()
+                self._fleet = None
+
+            if self._motion_queue is not None:
+                self._motion_queue.close()
+                for robot_name, stats in self._motion_queue.get_stats().items():
+                    self._console(
+                        f"{robot_name} motion: received={stats.received}, applied={stats.consumed}, "
+                        f"overwritten={stats.overwritten}, dropped={stats.dropped}"
+                    )
 
             if self._world.physics_callback_exists("sim_step"):
                 self._world.remove_physics_callback("sim_step")
 
+            if self._motion_profiles is not None:
+                stats = self._motion_profiles.stats
+                if stats.started > 0:
+                    self._console(
+                        f"Accessory moves: started={stats.started}, arrived={stats.arrived}, "
+                        f"cancelled={stats.cancelled}, lost={stats.lost}"
+                    )
+                self._motion_profiles = None
+
+            if self._workpiece_pool is not None:
+                stats = self._workpiece_pool.stats
+                if stats.spawned > 0:
+                    self._console(
+                        f"Workpieces: pooled={stats.created}, spawned={stats.spawned}, "
+                        f"recycled={stats.recycled}"
+                    )
+                self._workpiece_pool = None
+            self._bulk_workpieces = None
+
+            latency_summary = self._motion_latency.summary()
+            if latency_summary:
+                self._console(latency_summary)
+            if self._motion_latency_file is not None:
+                self._dump_motion_latency(self._motion_latency_file)
+
             if hasattr(self, "_virtual_camera_server"):
                 if self._virtual_camera_server is not None:
                     await self._virtual_camera_server.stop()
+                    self._virtual_camera_server.stop_grab_pool()
+
+            self._scene_version.unwatch_stage()
+
+            if self._camera_properties is not None:
+                stats = self._camera_properties.stats
+                self._console(
+                    f"Camera properties: received={stats.received}, applied={stats.applied}, "
+                    f"coalesced={stats.coalesced}, unresolved={stats.unresolved}, "
+                    f"rejected={stats.rejected}, max queue depth={stats.max_depth}"
+                )
 
             # self._stop_all_async_functions()
             self._ext_ui.change_action_mode(const.BUTTON_START_SERVICE)
@@ -407,66 +944,105 @@ class TMDigitalRobotExtension(omni.ext.IExt):
                 logger.error(f"{ip}:{port} is not available. exception: {e}")
                 return False
 
-    def _spawn_workpiece(self):
-        workpieces_prim = self._world.stage.GetPrimAtPath(
-            Sdf.Path(self._default_workpieces_prim_path)
+    def _get_workpiece_pool(self) -> WorkpiecePool:
+        if self._workpiece_pool is None:
+            self._workpiece_pool = WorkpiecePool(
+                self._world.stage,
+                self._default_workpieces_prim_path,
+                self._workpiece_usd_path(),
+                self._workpiece_pool_size,
+            )
+        return self._workpiece_pool
+
+    def _spawn_workpiece(
+        self, position: Gf.Vec3d = None, rotate_z: float = None, ignore=()
+    ) -> str:
+        # Check if a workpiece or a bulk part is already there, if yes, return None
+        spawn_position = position
+        if spawn_position is None:
+            spawn_position = self._default_workpiece_position
+        if not self._get_workpiece_pool().is_free(
+            spawn_position, self._workpiece_spawn_radius, ignore
+        ):
+            return None
+
+        # Place a pooled workpiece on the table
+        if rotate_z is None:
+            rotate_z = random.uniform(0, 360)
+        workpiece_prim_path = self._workpiece_pool.spawn(
+            spawn_position, Gf.Vec3f(0, 0, rotate_z)
         )
 
-        # Check if the workpiece is already spawned, if yes, return
-        spawn_position = self._default_workpiece_position
-        for workpiece in workpieces_prim.GetChildren():
-            path: str = workpiece.GetPath()
-            wp_prim = self._world.stage.GetPrimAtPath(Sdf.Path(path))
-            wp_xformable = UsdGeom.Xformable(wp_prim)
-            wp_transform = wp_xformable.GetLocalTransformation()
-            wp_translation = wp_transform.ExtractTranslation()
-            x = round(wp_translation[0], 2)
-            y = round(wp_translation[1], 2)
-            if spawn_position[0] == x and spawn_position[1] == y:
-                return
-
-        self._workpiece_id += 1
-        workpiece_prim_path = (
-            f"{self._default_workpieces_prim_path}/workpiece_{self._workpiece_id}"
-        )
+        self._console(f"{workpiece_prim_path} is spawned")
+        return workpiece_prim_path
 
-        # Create a workpiece
-        absolute_path = f"{const.EXTENSION_ROOT_PATH}/assets/worlds/accessories/workpiece/004_sugar_box/004_sugar_box.usd"  # noqa
-        workpiece_prim = add_reference_to_stage(
-            usd_path=absolute_path,
-            prim_path=workpiece_prim_path,
-        ).GetPrim()
+    def _load_bulk_workpieces(self):
+        try:
+            with open(self._bulk_workpieces_file, "r", encoding="utf-8") as f:
+                parts = json.load(f)
+            self._add_bulk_workpieces(parts["positions"], parts.get("yaws"))
+        except (OSError, KeyError, TypeError, ValueError) as e:
+            logger.error(
+                f"Failed to load the bulk workpieces {self._bulk_workpieces_file}: {e}"
+            )
 
-        # Place the workpiece on the table
-        # fmt: off
-        workpiece_prim.GetAttribute("xformOp:translate").Set(Gf.Vec3d(self._default_workpiece_position))
-        workpiece_prim.GetAttribute("xformOp:scale").Set(Gf.Vec3f(0.5, 0.5, 0.5))
-        workpiece_prim.GetAttribute("xformOp:rotateXYZ").Set(Gf.Vec3f(0, 0, random.uniform(0, 360)))
-        # fmt: on
+    def _add_bulk_workpieces(self, positions, yaws=None) -> list:
+        # Resting parts, e.g. a bin of 10k parts, as one point instancer. They share the
+        # index of the pool, a workpiece isn't spawned onto a part
+        if self._bulk_workpieces is None:
+            self._bulk_workpieces = InstancedWorkpieces(
+                self._world.stage,
+                f"{self._default_workpieces_prim_path}/Bulk",
+                self._workpiece_usd_path(),
+                index=self._get_workpiece_pool().index,
+            )
 
-        omni.kit.commands.execute(
-            "SetRigidBody",
-            path=Sdf.Path(workpiece_prim_path),
-            approximationShape="convexHull",
-            kinematic=False,
+        part_ids = self._bulk_workpieces.add_many(positions, yaws)
+        self._bulk_workpieces.flush()
+        self._console(f"{len(self._bulk_workpieces)} bulk workpieces")
+        return part_ids
+
+    def _pick_bulk_workpiece(self, position: tuple, radius: float = 0.02) -> bool:
+        # Replace the nearest bulk part by a rigid body workpiece, e.g. before a pick
+        if self._bulk_workpieces is None:
+            return False
+
+        nearest = self._bulk_workpieces.nearest(position, radius)
+        if nearest is None:
+            return False
+
+        # The part is removed only once a workpiece is spawned in its place, only a
+        # workpiece there prevents it, not the parts packed around it
+        part_id, translate, yaw = nearest
+        spawned = self._spawn_workpiece(
+            Gf.Vec3d(*translate), math.degrees(yaw), ignore=self._bulk_workpieces
         )
+        if spawned is None:
+            return False
 
-        self._console(f"{workpiece_prim_path} is spawned")
+        self._bulk_workpieces.remove(part_id)
+        self._bulk_workpieces.flush()
+        return True
+
+    def _workpiece_usd_path(self) -> str:
+        return f"{const.EXTENSION_ROOT_PATH}/assets/worlds/accessories/workpiece/004_sugar_box/004_sugar_box.usd"  # noqa
 
     # === Common functions ===
     def _is_prim_exist(self, prim_path: str) -> bool:
         prim = self._world.stage.GetPrimAtPath(Sdf.Path(prim_path))
         return prim.IsValid()
 
+    def _get_bbox_service(self) -> BBoxService:
+        # A new stage is loaded with the scene, the bounds of the previous one are dropped
+        if self._bbox is None or self._bbox.stage is not self._world.stage:
+            if self._bbox is not None:
+                self._bbox.unwatch()
+            self._bbox = BBoxService(self._world.stage)
+            self._bbox.watch()
+        return self._bbox
+
     def _get_prim_size(self, prim_path: str) -> Gf.Vec3d:
-        bbox_cache = UsdGeom.BBoxCache(
-            Usd.TimeCode.Default(), includedPurposes=[UsdGeom.Tokens.default_]
-        )
-        bbox_cache.Clear()
-        prim = self._world.stage.GetPrimAtPath(Sdf.Path(prim_path))
-        prim_bbox = bbox_cache.ComputeWorldBound(prim)
-        prim_range = prim_bbox.ComputeAlignedRange()
-        prim_size: Gf.Vec3d = prim_range.GetSize()
+        prim_size = self._get_bbox_service().get_size(prim_path)
 
         # Get the changed size of the prim
         x = f"{prim_size[0]:.4f}"
@@ -477,85 +1053,43 @@ class TMDigitalRobotExtension(omni.ext.IExt):
         return prim_size
 
     def _set_prim_size(self, prim_path: str, target_size: tuple) -> None:
-        def __get_prim_size(prim_path: str) -> Gf.Vec3d:
-            bbox_cache = UsdGeom.BBoxCache(
-                Usd.TimeCode.Default(), includedPurposes=[UsdGeom.Tokens.default_]
-            )
-            bbox_cache.Clear()
-            prim = self._world.stage.GetPrimAtPath(Sdf.Path(prim_path))
-            prim_bbox = bbox_cache.ComputeWorldBound(prim)
-            prim_range = prim_bbox.ComputeAlignedRange()
-            prim_size: Gf.Vec3d = prim_range.GetSize()
-            return prim_size
-
-        # Reset the prim scale to 1, 1, 1
-        omni.kit.commands.execute(
-            "ChangeProperty",
-            prop_path=Sdf.Path(f"{prim_path}.xformOp:scale"),
-            value=Gf.Vec3d(1, 1, 1),
-            prev=None,
-        )
+        self._set_prim_sizes({prim_path: target_size})
 
-        # Get the original size of the prim
-        origin_size = __get_prim_size(prim_path)
-        x = target_size[0] / origin_size[0]
-        y = target_size[1] / origin_size[1]
-        z = target_size[2] / origin_size[2]
-
-        # Set the prim scale to the target size by calculating the ratio
-        omni.kit.commands.execute(
-            "ChangeProperty",
-            prop_path=Sdf.Path(f"{prim_path}.xformOp:scale"),
-            value=Gf.Vec3d(x, y, z),
-            prev=None,
-        )
+    def _set_prim_sizes(self, target_sizes: dict) -> None:
+        # {prim path: (x, y, z) meters}, all the scales are written in one change block
+        bbox = self._get_bbox_service()
+        bbox.set_sizes(target_sizes)
 
         # Get the changed size of the prim
-        changed_size = __get_prim_size(prim_path)
-        x = f"{changed_size[0]:.4f}"
-        y = f"{changed_size[1]:.4f}"
-        z = f"{changed_size[2]:.4f}"
-        self._console(f"Set prim size(Meter): x={x}, y={y}, z={z} {prim_path}")
+        for prim_path in target_sizes:
+            changed_size = bbox.get_size(prim_path)
+            x = f"{changed_size[0]:.4f}"
+            y = f"{changed_size[1]:.4f}"
+            z = f"{changed_size[2]:.4f}"
+            self._console(f"Set prim size(Meter): x={x}, y={y}, z={z} {prim_path}")
 
     def _move_to_target(
-        self, prim_path: str, target_position: tuple, step_size=0.001
-    ) -> bool:
-        prim = get_prim_at_path(prim_path)
-        # fmt: off
-        cx, cy, cz = [round(coord, 4) for coord in prim.GetPrim().GetAttribute("xformOp:translate").Get()]
-        tx, ty, tz = [round(coord, 4) for coord in target_position]
-        # fmt: on
-
-        # print(f"tx: {tx}, ty: {ty}, tz: {tz}")
-        # print(f"cx: {cx}, cy: {cy}, cz: {cz}")
-
-        if cx == tx and cy == ty and cz == tz:
-            return True
-
-        if cx < tx:
-            cx += step_size
-        elif cx > tx:
-            cx -= step_size
-
-        if cy < ty:
-            cy += step_size
-        elif cy > ty:
-            cy -= step_size
-
-        if cz < tz:
-            cz += step_size
-        elif cz > tz:
-            cz -= step_size
-
-        omni.kit.commands.execute(
-            "ChangeProperty",
-            prop_path=Sdf.Path(f"{prim_path}.xformOp:translate"),
-            value=Gf.Vec3d(cx, cy, cz),
-            prev=None,
+        self,
+        prim_path: str,
+        target_position: tuple,
+        max_velocity: float = 0.1,
+        max_acceleration: float = 0.5,
+        profile: str = PROFILE_TRAPEZOID,
+        on_arrived=None,
+    ) -> float:
+        # Moved by the physics steps, on_arrived(prim_path) is called at the target.
+        # Returns the duration of the move in seconds.
+        if self._motion_profiles is None:
+            self._motion_profiles = MotionProfiles(self._world.stage)
+        return self._motion_profiles.move(
+            prim_path,
+            target_position,
+            max_velocity,
+            max_acceleration,
+            profile,
+            on_arrived,
         )
 
-        return False
-
     def _console(self, message: str):
         current_time = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
 
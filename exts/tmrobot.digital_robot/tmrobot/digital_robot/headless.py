@@ -0,0 +1,295 @@
+import json
+import logging
+import os
+import time
+from dataclasses import asdict
+from typing import Callable, Dict, List
+
+from isaacsim.core.utils.stage import is_stage_loading, open_stage
+
+from tmrobot.digital_robot.extension import TMDigitalRobotExtension  # type: ignore
+from tmrobot.digital_robot.models.setting import ExtensionSetting  # type: ignore
+from tmrobot.digital_robot.services.motion_latency import LatencyHistogram  # type: ignore
+from tmrobot.digital_robot.ui import constants as const  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+
+def load_setting(path: str) -> ExtensionSetting:
+    """Robot settings and scene of a JSON file saved by the extension UI.
+
+    ``ExtensionSetting.load_extension_setting_from_json`` fills the setting or returns
+    a new one. Raises ``ValueError`` when the file gives no robots, instead of failing
+    later in the services.
+    """
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"No extension setting file at {path}")
+
+    setting = ExtensionSetting()
+    loaded = setting.load_extension_setting_from_json(path)
+    if isinstance(loaded, ExtensionSetting):
+        setting = loaded
+
+    robots = getattr(setting, "robots_setting", None)
+    if not isinstance(robots, dict) or not robots:
+        raise ValueError(f"{path} has no robots_setting")
+    return setting
+
+
+class HeadlessUI:
+    """Stands in for ExtensionUI without any window.
+
+    The settings come from an ``ExtensionSetting`` JSON file, the messages go to the log
+    and the action mode tells the runner whether the services started or stopped.
+    """
+
+    def __init__(self, setting: ExtensionSetting):
+        self.setting = setting
+        self.mode = const.BUTTON_INITIAL
+        self.messages: List[str] = []
+
+    def update_message(self, message: str):
+        self.messages.append(message)
+        logger.info(message)
+
+    def change_action_mode(self, mode):
+        self.mode = mode
+
+    def collapsed_robot_settings(self, collapsed: bool):
+        pass
+
+    def validate_form(self, world) -> bool:
+        robots = self.setting.robots_setting.values()
+        if not any(robot.activated for robot in robots):
+            self.update_message("No activated robot in the settings")
+            return False
+        return True
+
+    def on_save_scene(self):
+        # The scene file is left as loaded
+        pass
+
+    def _on_load_setting(self) -> ExtensionSetting:
+        return self.setting
+
+    def clear(self):
+        pass
+
+
+class HeadlessExtension(TMDigitalRobotExtension):
+    """The extension driven by a ``HeadlessUI``, ``options`` override ``_initialize``.
+
+    The options are the attributes of ``_initialize`` without the leading underscore,
+    e.g. ``{"motion_replay_dir": "/data/logs", "virtual_camera_enabled": False}``.
+    """
+
+    def __init__(self, ui: HeadlessUI, options: Dict[str, object] = None):
+        super().__init__()
+        self._ext_ui = ui
+        self._options = dict(options or {})
+        self._initialize()
+
+    def _initialize(self):
+        super()._initialize()
+        for name, value in self._options.items():
+            if not hasattr(self, f"_{name}"):
+                raise ValueError(f"Unknown option {name}")
+            setattr(self, f"_{name}", value)
+
+
+class HeadlessRunner:
+    """Loads a scene, starts the services and runs them without ExtensionUI.
+
+    Every ``simulation_app.update()`` runs the Kit loop: physics steps, rendering for the
+    cameras and the asyncio tasks of the services. ``run`` returns why it stopped.
+    """
+
+    def __init__(
+        self,
+        simulation_app,
+        settings_path: str,
+        scene_path: str = None,
+        options: Dict[str, object] = None,
+    ):
+        self.simulation_app = simulation_app
+        self.settings_path = settings_path
+        self.setting = load_setting(settings_path)
+        if scene_path is None:
+            usd_path = getattr(self.setting, "usd_path", None)
+            if not usd_path:
+                raise ValueError(f"{settings_path} has no usd_path, pass the scene")
+            scene_path = self._resolve(usd_path)
+        self.scene_path = scene_path
+        self.options = dict(options or {})
+        self.ui = HeadlessUI(self.setting)
+        self.extension: HeadlessExtension = None
+        # Duration of an update, or of a lockstep sample
+        self.updates = LatencyHistogram()
+        self.started = 0.0
+        self.stop_reason = None
+
+    def load_scene(self) -> None:
+        logger.info(f"Load {self.scene_path}")
+        if not open_stage(self.scene_path):
+            raise RuntimeError(f"Failed to open {self.scene_path}")
+        while is_stage_loading():
+            self.simulation_app.update()
+
+    def start(self, timeout: float = 60.0) -> bool:
+        """Start the services as the Start button does, False if they didn't start."""
+        self.load_scene()
+        self.extension = HeadlessExtension(self.ui, self.options)
+        self.extension._post_load_scene()
+        self.extension._on_start_service()
+        if self.ui.mode == const.BUTTON_INITIAL:
+            # The settings didn't validate
+            return False
+
+        deadline = time.monotonic() + timeout
+        while self.ui.mode != const.BUTTON_STOP_SERVICE:
+            # Back to the Start button: the service checks failed
+            if self.ui.mode == const.BUTTON_START_SERVICE:
+                return False
+            if time.monotonic() > deadline:
+                logger.error(f"The services didn't start within {timeout} s")
+                return False
+            self.simulation_app.update()
+
+        self.started = time.monotonic()
+        return True
+
+    def run(
+        self,
+        duration: float = None,
+        steps: int = None,
+        until: Callable[["HeadlessRunner"], bool] = None,
+    ) -> str:
+        """Update until a stop condition, returns which one.
+
+        The conditions are ``duration`` seconds after starting, ``steps`` physics steps,
+        ``until`` returning True and ``request_stop``, e.g. from a signal handler.
+        """
+        deadline = None if duration is None else self.started + duration
+        while self.stop_reason is None:
+            start = time.perf_counter()
+            self.simulation_app.update()
+            self.updates.record(time.perf_counter() - start)
+
+            if not self.simulation_app.is_running():
+                self.stop_reason = "closed"
+            elif deadline is not None and time.monotonic() >= deadline:
+                self.stop_reason = "duration"
+            elif steps is not None and self.extension._simulation_count >= steps:
+                self.stop_reason = "steps"
+            elif until is not None and until(self):
+                self.stop_reason = "condition"
+        return self.stop_reason
+
+    def run_lockstep(
+        self,
+        duration: float = None,
+        until: Callable[["HeadlessRunner"], bool] = None,
+        timeout: float = 60.0,
+    ) -> str:
+        """Step the replayed motion logs as fast as possible, returns why it stopped.
+
+        Needs the ``motion_replay_dir`` and ``motion_replay_lockstep`` options. Each
+        iteration simulates one sample of the longest log, ``duration`` is in simulated
+        seconds and the end of the log stops with ``"end"``.
+        """
+        extension = self.extension
+        deadline = time.monotonic() + timeout
+        while extension._lockstep is None or not extension._world.is_playing():
+            if time.monotonic() > deadline:
+                logger.error(f"Lockstep didn't start within {timeout} s")
+                self.stop_reason = "timeout"
+                return self.stop_reason
+            self.simulation_app.update()
+
+        scheduler = extension._lockstep
+        while self.stop_reason is None:
+            start = time.perf_counter()
+            stepped = scheduler.step_sample()
+            self.updates.record(time.perf_counter() - start)
+
+            if not stepped:
+                self.stop_reason = "end"
+            elif not self.simulation_app.is_running():
+                self.stop_reason = "closed"
+            elif duration is not None and scheduler.stats.sim_time >= duration:
+                self.stop_reason = "duration"
+            elif until is not None and until(self):
+                self.stop_reason = "condition"
+        return self.stop_reason
+
+    def request_stop(self, reason: str = "signal") -> None:
+        self.stop_reason = reason
+
+    def metrics(self) -> dict:
+        """Counters and latency of the run, call it before ``stop``."""
+        extension = self.extension
+        metrics = {
+            "settings": self.settings_path,
+            "scene": self.scene_path,
+            "stop_reason": self.stop_reason,
+            "wall_time": time.monotonic() - self.started if self.started else 0.0,
+            "physics_steps": extension._simulation_count,
+            "update": self.updates.summary(),
+            "motion_latency": extension._motion_latency.snapshot(),
+            "messages": self.ui.messages,
+        }
+        if extension._motion_queue is not None:
+            metrics["motion"] = {
+                robot_name: asdict(stats)
+                for robot_name, stats in extension._motion_queue.get_stats().items()
+            }
+        metrics["di_writes"] = {
+            robot_name: dict(
+                asdict(master.di_writes.stats),
+                latency=master.di_writes.latency.summary(),
+            )
+            for robot_name, master in extension._ethernet_masters.items()
+        }
+        for name, owner in (
+            ("camera_properties", extension._camera_properties),
+            ("accessory_moves", extension._motion_profiles),
+            ("workpieces", extension._workpiece_pool),
+            ("idle", extension._idle_throttle),
+        ):
+            if owner is not None:
+                metrics[name] = asdict(owner.stats)
+        if extension._lockstep is not None:
+            metrics["lockstep"] = dict(
+                asdict(extension._lockstep.stats),
+                speedup=extension._lockstep.stats.speedup(),
+            )
+        return metrics
+
+    def write_metrics(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.metrics(), f, indent=2)
+        logger.info(f"Metrics saved to {path}")
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Stop the services as the Stop button does."""
+        if self.extension is None or self.ui.mode != const.BUTTON_STOP_SERVICE:
+            return
+
+        self.extension._on_stop_service()
+        deadline = time.monotonic() + timeout
+        while self.ui.mode != const.BUTTON_START_SERVICE:
+            if time.monotonic() > deadline:
+                logger.error(f"The services didn't stop within {timeout} s")
+                return
+            self.simulation_app.update()
+
+    def close(self) -> None:
+        if self.extension is not None:
+            self.extension.on_shutdown()
+            self.extension = None
+
+    def _resolve(self, usd_path: str) -> str:
+        # Scenes of the extension may be saved relative to it
+        if usd_path and not os.path.isabs(usd_path) and not os.path.exists(usd_path):
+            return os.path.join(const.EXTENSION_ROOT_PATH, usd_path)
+        return usd_path
@@ -0,0 +1,171 @@
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Sequence
+
+from pxr import Gf, Sdf, Tf, Usd, UsdGeom
+
+logger = logging.getLogger(__name__)
+
+# Changed properties which may change a bound, the others (physics, materials...) don't
+_BOUND_PROPERTIES = (
+    "xformOp",
+    "extent",
+    "points",
+    "visibility",
+    "purpose",
+    "radius",
+    "size",
+    "height",
+    "axis",
+)
+
+
+@dataclass
+class BBoxStats:
+    hits: int = 0
+    misses: int = 0
+    invalidated: int = 0  # cached bounds dropped by a change notice
+    resynced: int = 0  # notices which dropped every cached bound
+
+
+class BBoxService:
+    """World aligned bounds of prims, cached until a change notice invalidates them.
+
+    One ``UsdGeom.BBoxCache`` is kept for the stage instead of a new one per query, it
+    shares the bounds of the common descendants between queries. A ``Tf`` notice
+    listener drops the cached bounds of the changed prims, of their ancestors and of
+    their descendants, edits unrelated to bounds are ignored.
+
+    ``set_sizes`` scales many prims to a size in one ``Sdf.ChangeBlock``. The unscaled
+    size is the current size divided by the current scale, the prim axes are assumed
+    aligned with the world ones as before.
+    """
+
+    def __init__(
+        self, stage: Usd.Stage, purposes: Sequence[str] = (UsdGeom.Tokens.default_,)
+    ):
+        self.stage = stage
+        self.stats = BBoxStats()
+        self._bbox_cache = UsdGeom.BBoxCache(
+            Usd.TimeCode.Default(), includedPurposes=list(purposes)
+        )
+        self._ranges: Dict[Sdf.Path, Gf.Range3d] = {}  # [prim path]
+        self._stale = False  # the BBoxCache holds invalidated bounds
+        self._listener = None
+
+    def watch(self) -> None:
+        self.unwatch()
+        self._listener = Tf.Notice.Register(
+            Usd.Notice.ObjectsChanged, self._on_objects_changed, self.stage
+        )
+
+    def unwatch(self) -> None:
+        if self._listener is not None:
+            self._listener.Revoke()
+            self._listener = None
+
+    def clear(self) -> None:
+        self._ranges = {}
+        self._bbox_cache.Clear()
+        self._stale = False
+
+    def get_range(self, prim_path: str) -> Gf.Range3d:
+        path = Sdf.Path(prim_path)
+        prim_range = self._ranges.get(path)
+        if prim_range is not None:
+            self.stats.hits += 1
+            return prim_range
+
+        prim = self.stage.GetPrimAtPath(path)
+        if not prim.IsValid():
+            raise ValueError(f"{prim_path} doesn't exist")
+
+        if self._stale:
+            # UsdGeom.BBoxCache can only be cleared as a whole
+            self._bbox_cache.Clear()
+            self._stale = False
+
+        prim_range = self._bbox_cache.ComputeWorldBound(prim).ComputeAlignedRange()
+        self._ranges[path] = prim_range
+        self.stats.misses += 1
+        return prim_range
+
+    def get_size(self, prim_path: str) -> Gf.Vec3d:
+        return self.get_range(prim_path).GetSize()
+
+    def get_sizes(self, prim_paths: Sequence[str]) -> List[Gf.Vec3d]:
+        return [self.get_size(prim_path) for prim_path in prim_paths]
+
+    def set_sizes(self, sizes: Dict[str, Sequence[float]]) -> Dict[str, Gf.Vec3d]:
+        """Scale ``{prim path: (x, y, z) size}``, returns the scales written.
+
+        A prim without ``xformOp:scale`` or with an empty bound is skipped.
+        """
+        scales = {}
+        for prim_path, target_size in sizes.items():
+            attribute = self.stage.GetAttributeAtPath(
+                Sdf.Path(prim_path).AppendProperty("xformOp:scale")
+            )
+            if not attribute:
+                logger.warning(f"{prim_path} has no xformOp:scale")
+                continue
+
+            current_scale = attribute.Get()
+            if current_scale is None:
+                current_scale = Gf.Vec3d(1, 1, 1)
+
+            size = self.get_size(prim_path)
+            if any(size[axis] <= 0 or current_scale[axis] == 0 for axis in range(3)):
+                logger.warning(f"{prim_path} has an empty bound, it isn't scaled")
+                continue
+
+            scale = Gf.Vec3d(
+                *(
+                    target_size[axis] * current_scale[axis] / size[axis]
+                    for axis in range(3)
+                )
+            )
+            scales[prim_path] = (attribute, type(current_scale)(scale))
+
+        # An unauthored value can't be set inside a change block, author it first
+        batched = []
+        for attribute, scale in scales.values():
+            if attribute.HasAuthoredValue():
+                batched.append((attribute, scale))
+            else:
+                attribute.Set(scale)
+
+        with Sdf.ChangeBlock():
+            for attribute, scale in batched:
+                attribute.Set(scale)
+
+        return {prim_path: Gf.Vec3d(scale) for prim_path, (_, scale) in scales.items()}
+
+    def _on_objects_changed(self, notice, sender) -> None:
+        if notice.GetResyncedPaths():
+            self.stats.resynced += 1
+            self._ranges = {}
+            self._stale = True
+            return
+
+        changed = {
+            path.GetPrimPath()
+            for path in notice.GetChangedInfoOnlyPaths()
+            if not path.IsPropertyPath() or path.name.startswith(_BOUND_PROPERTIES)
+        }
+        if not changed:
+            return
+
+        self._stale = True
+        if not self._ranges:
+            return
+
+        # The bound of a prim depends on its descendants, the world bound on its ancestors
+        invalid = [
+            path
+            for path in self._ranges
+            if any(path.HasPrefix(prim) or prim.HasPrefix(path) for prim in changed)
+        ]
+        for path in invalid:
+            del self._ranges[path]
+        self.stats.invalidated += len(invalid)
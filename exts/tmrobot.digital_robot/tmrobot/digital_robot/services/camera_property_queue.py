@@ -0,0 +1,162 @@
+import logging
+import queue
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from pxr import Sdf, Usd
+
+logger = logging.getLogger(__name__)
+
+# USD attribute of each CameraProperty, by member name, on the DigitalCamera prim or
+# below it. The DigitalCamera getters read gain, shutter_time and white_balance.
+# setFocus is a focus distance, whatever the FOCAL_LENGTH member says.
+PROPERTY_ATTRIBUTES = {
+    "GAIN": "gain",
+    "SHUTTER_TIME": "shutter_time",
+    "WHITE_BALANCE": "white_balance",
+    "FOCAL_LENGTH": "focusDistance",
+}
+
+# Conversion of a message value for the scalar attribute types a property may have
+VALUE_TYPES: Dict[str, Callable[[Any], Any]] = {
+    "half": float,
+    "float": float,
+    "double": float,
+    "int": int,
+    "uint": int,
+    "int64": int,
+    "uint64": int,
+}
+
+
+@dataclass
+class PropertyQueueStats:
+    depth: int = 0  # messages waiting at the last drain
+    max_depth: int = 0
+    received: int = 0
+    coalesced: int = 0  # replaced by a newer value before being applied
+    applied: int = 0
+    unresolved: int = 0  # no camera or attribute for the message
+    rejected: int = 0  # value of the wrong type for the attribute, or not set by USD
+
+
+class CameraPropertyQueue:
+    """Consumer of the ``MessageCamera`` set-queue of the Virtual Camera server.
+
+    ``apply`` drains everything queued since the last frame, keeps the latest value per
+    (robot_ip, camera_sn, set_property) and writes them to the camera prims in one
+    ``Sdf.ChangeBlock``, so a burst of setGain calls costs one USD change notice.
+
+    A property is written to the attribute named in ``PROPERTY_ATTRIBUTES`` only if
+    that attribute has one of the scalar ``VALUE_TYPES`` and the value converts to it.
+    Resolved attributes are kept while they are valid on the stage, a property that
+    doesn't resolve is looked up again by its next message, e.g. once the camera prim
+    is loaded.
+    """
+
+    def __init__(self, set_queue: queue.Queue, dg_cameras: dict):
+        self.set_queue = set_queue
+        self.cameras = dg_cameras  # [tmflow ip][serial number]
+        self.stats = PropertyQueueStats()
+        self._attributes: Dict[Tuple, Usd.Attribute] = {}
+
+    def drain(self) -> Dict[Tuple, Any]:
+        """Latest ``MessageCamera`` of each (robot_ip, camera_sn, set_property)."""
+        latest: Dict[Tuple, Any] = {}
+        self.stats.depth = self.set_queue.qsize()
+        self.stats.max_depth = max(self.stats.max_depth, self.stats.depth)
+
+        while True:
+            try:
+                message = self.set_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            key = (message.robot_ip, message.camera_sn, message.set_property)
+            if key in latest:
+                self.stats.coalesced += 1
+            latest[key] = message
+            self.stats.received += 1
+
+        return latest
+
+    def apply(self, stage: Usd.Stage) -> int:
+        """Apply the queued updates, returns the number of attributes written."""
+        latest = self.drain()
+        if not latest:
+            return 0
+
+        # Resolve outside of the change block, attributes are looked up once per camera
+        writes = []
+        for key, message in latest.items():
+            attribute = self._resolve(stage, key)
+            if attribute is None:
+                self.stats.unresolved += 1
+                continue
+
+            value = self._convert(attribute, message.value)
+            if value is None:
+                self.stats.rejected += 1
+                continue
+            writes.append((attribute, value))
+
+        applied = 0
+        with Sdf.ChangeBlock():
+            for attribute, value in writes:
+                if attribute.Set(value):
+                    applied += 1
+                else:
+                    self.stats.rejected += 1
+                    logger.warning(f"{attribute.GetPath()} refused {value}")
+
+        self.stats.applied += applied
+        return applied
+
+    def _convert(self, attribute: Usd.Attribute, value) -> Optional[Any]:
+        type_name = str(attribute.GetTypeName())
+        try:
+            return VALUE_TYPES[type_name](value)
+        except (KeyError, TypeError, ValueError):
+            logger.warning(
+                f"Can't set {attribute.GetPath()} ({type_name}) to {value!r}"
+            )
+            return None
+
+    def _resolve(self, stage: Usd.Stage, key: Tuple) -> Optional[Usd.Attribute]:
+        attribute = self._attributes.get(key)
+        if attribute is not None:
+            if attribute.IsValid() and attribute.GetStage() == stage:
+                return attribute
+            del self._attributes[key]
+
+        robot_ip, camera_sn, set_property = key
+        attribute = None
+        camera = self.cameras.get(robot_ip, {}).get(camera_sn)
+        prim_path = self._get_prim_path(camera)
+        name = PROPERTY_ATTRIBUTES.get(set_property.name)
+
+        root = stage.GetPrimAtPath(prim_path) if prim_path is not None else None
+
+        if root and root.IsValid() and name is not None:
+            for prim in Usd.PrimRange(root):
+                if prim.HasAttribute(name):
+                    attribute = prim.GetAttribute(name)
+                    break
+
+        if attribute is None:
+            logger.warning(
+                f"Can't apply {set_property} of camera {camera_sn} at {robot_ip}"
+            )
+            return None
+
+        self._attributes[key] = attribute
+        return attribute
+
+    def _get_prim_path(self, camera) -> Optional[str]:
+        if camera is None:
+            return None
+
+        prim_path = getattr(camera, "prim_path", None)
+        if prim_path is None:
+            prim_path = getattr(getattr(camera, "camera", None), "prim_path", None)
+        return prim_path
@@ -0,0 +1,125 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from tmrobot.digital_robot.services.motion_latency import LatencyHistogram  # type: ignore
+from tmrobot.digital_robot.services.tmsvr_parser import MODE_STRING  # type: ignore
+from tmrobot.digital_robot.services.tmsvr_parser import TMSVRFrame  # type: ignore
+from tmrobot.digital_robot.services.tmsvr_parser import build_packet  # type: ignore
+
+ITEM_CTRL_DI = "Ctrl_DI"
+ITEM_END_DI = "End_DI"
+ACK_OK = b"00"
+
+
+@dataclass
+class DIWriteStats:
+    requested: int = 0  # set calls
+    coalesced: int = 0  # replaced by a later value before being sent
+    packets: int = 0
+    items: int = 0
+    acked: int = 0
+    rejected: int = 0  # acknowledged with an error code
+    timeouts: int = 0  # no acknowledgement within ack_timeout
+    dropped: int = 0  # not sent, the robot wasn't connected
+
+
+class DIWriteQueue:
+    """Outbound Ctrl_DI/End_DI writes of one robot, coalesced into one packet per flush.
+
+    ``set`` only records the value, a later value of the same item and index replaces it.
+    ``take_packet`` builds one multi-item ``$TMSVR`` write of everything recorded since
+    the last one and keeps its transaction id until TMflow acknowledges it, the time
+    from ``take_packet`` to the acknowledgement is the write latency.
+    """
+
+    def __init__(self, ack_timeout: float = 3.0):
+        self.ack_timeout = ack_timeout
+        self.stats = DIWriteStats()
+        self.latency = LatencyHistogram()
+        self.last_error: Optional[str] = None
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[str, int], int] = {}  # [(item, index)] value
+        self._in_flight: Dict[str, Tuple[float, int]] = {}  # [id] (sent, item count)
+
+    def set(self, item: str, index: int, value: int) -> bool:
+        """Record a write, True if it is the first one since the last packet."""
+        with self._lock:
+            first = not self._pending
+            key = (item, int(index))
+            if key in self._pending:
+                self.stats.coalesced += 1
+            self._pending[key] = 1 if value else 0
+            self.stats.requested += 1
+            return first
+
+    def has_pending(self) -> bool:
+        return bool(self._pending)
+
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def take_packet(self, transaction_id: str) -> Optional[bytes]:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        if not pending:
+            return None
+
+        content = "\r\n".join(
+            f"{item}[{index}]={value}" for (item, index), value in pending.items()
+        )
+        self._in_flight[transaction_id] = (time.perf_counter(), len(pending))
+        self.stats.packets += 1
+        self.stats.items += len(pending)
+        return build_packet(transaction_id, MODE_STRING, content)
+
+    def drop_pending(self) -> int:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        self.stats.dropped += len(pending)
+        return len(pending)
+
+    def acknowledge(self, frame: TMSVRFrame) -> bool:
+        """Match a response frame with its write, False if it isn't one of ours."""
+        transaction_id = bytes(frame.buffer[frame.id_start : frame.id_end]).decode(
+            "utf-8", "replace"
+        )
+        sent = self._in_flight.pop(transaction_id, None)
+        if sent is None:
+            return False
+
+        self.latency.record(time.perf_counter() - sent[0])
+
+        # <error code>,<message>, 00 is success
+        content = frame.content()
+        if content.split(b",", 1)[0].strip() == ACK_OK:
+            self.stats.acked += 1
+        else:
+            self.stats.rejected += 1
+            self.last_error = content.decode("utf-8", "replace")
+        return True
+
+    def expire(self, now: float = None) -> int:
+        """Forget the writes older than ``ack_timeout``, returns how many expired."""
+        now = time.perf_counter() if now is None else now
+        expired = [
+            transaction_id
+            for transaction_id, (sent, _) in self._in_flight.items()
+            if now - sent > self.ack_timeout
+        ]
+        for transaction_id in expired:
+            del self._in_flight[transaction_id]
+        self.stats.timeouts += len(expired)
+        return len(expired)
+
+    def summary(self) -> str:
+        stats = self.stats
+        summary = self.latency.summary()
+        return (
+            f"DI writes: requested={stats.requested}, coalesced={stats.coalesced}, "
+            f"packets={stats.packets}, acked={stats.acked}, rejected={stats.rejected}, "
+            f"timeouts={stats.timeouts}, dropped={stats.dropped}, "
+            f"latency p50={summary['p50_ms']:.1f}ms p99={summary['p99_ms']:.1f}ms"
+        )
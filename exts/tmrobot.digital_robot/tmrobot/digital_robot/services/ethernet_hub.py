@@ -0,0 +1,283 @@
+import asyncio
+import concurrent.futures
+import logging
+import socket
+import threading
+import time
+from typing import Dict
+
+from tmrobot.digital_robot.services.di_write_queue import ITEM_CTRL_DI  # type: ignore
+from tmrobot.digital_robot.services.di_write_queue import ITEM_END_DI  # type: ignore
+from tmrobot.digital_robot.services.di_write_queue import DIWriteQueue  # type: ignore
+from tmrobot.digital_robot.services.stream_ethernet_master import ROBOT_MODEL_ID  # type: ignore
+from tmrobot.digital_robot.services.stream_ethernet_master import StreamEthernetMaster  # type: ignore
+from tmrobot.digital_robot.services.tmsvr_parser import MODE_RESPONSE  # type: ignore
+from tmrobot.digital_robot.services.tmsvr_parser import MODE_STRING  # type: ignore
+from tmrobot.digital_robot.services.tmsvr_parser import build_packet  # type: ignore
+from tmrobot.digital_robot.services.transmit_table import TransmitTable  # type: ignore
+from tmrobot.digital_robot.ui import constants as const  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+
+class _EthernetSlaveProtocol(asyncio.BufferedProtocol):
+    def __init__(self, master: "AsyncEthernetMaster"):
+        self._master = master
+
+    def connection_made(self, transport):
+        sock = transport.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._master._on_connection_made(transport)
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        # The event loop receives straight into the frame parser buffer
+        return self._master.parser.get_buffer(sizehint)
+
+    def buffer_updated(self, nbytes: int) -> None:
+        self._master.parser.buffer_updated(nbytes)
+        self._master._on_frames(time.perf_counter())
+
+    def connection_lost(self, exc):
+        self._master._on_connection_lost(exc)
+
+
+class AsyncEthernetMaster(StreamEthernetMaster):
+    """EthernetMaster surface on a connection multiplexed by an ``EthernetHub``.
+
+    ``receive_data`` doesn't block: it starts forwarding frames to ``motion_queue``
+    from the hub I/O thread. ``set_end_di``/``set_ctrl_di`` can be called from any thread
+    and never touch the socket: the writes are coalesced in ``di_writes`` and sent as one
+    packet by ``flush_di``, or at the latest ``di_flush_delay`` seconds after the first.
+    """
+
+    def __init__(
+        self,
+        hub: "EthernetHub",
+        robot_name: str,
+        tmflow_ip: str,
+        port: int = const.PORT_ETHERNET,
+        timeout: float = 3.0,
+        transmit_table: TransmitTable = None,
+        recorder=None,
+        latency=None,
+        connect: bool = True,
+        di_flush_delay: float = 0.05,
+    ):
+        self.hub = hub
+        self.transport: asyncio.Transport = None
+        self.di_writes = DIWriteQueue()
+        self.di_flush_delay = di_flush_delay
+        self._di_flush_handle: asyncio.TimerHandle = None
+        self._motion_queue = None
+        self._robot_model_future: concurrent.futures.Future = None
+        self._connect = connect
+        super().__init__(
+            robot_name, tmflow_ip, port, timeout, transmit_table, recorder, latency
+        )
+
+    def start(self) -> None:
+        if self._connect:
+            self.connect().result(self.timeout)
+
+    def connect(self) -> concurrent.futures.Future:
+        return self.hub.submit(self._connect_async())
+
+    def stop(self) -> None:
+        self.running = False
+        self._motion_queue = None
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.transport is not None:
+            self.hub.call_soon(self.transport.close)
+
+    def get_robot_model(self) -> str:
+        try:
+            return self.request_robot_model().result(self.timeout)
+        except Exception as e:
+            logger.error(f"Get wrong robot model with exception: {e}")
+            return "Unknown"
+
+    def request_robot_model(self) -> concurrent.futures.Future:
+        future = concurrent.futures.Future()
+        self._robot_model_future = future
+        self._send_packet(build_packet(ROBOT_MODEL_ID, 12, "Robot_Model"))
+        return future
+
+    def receive_data(self, motion_queue) -> None:
+        self.receive_count = 0
+        self.receive_start_time = time.time()
+        self._motion_queue = motion_queue
+        self.running = True
+
+    def set_end_di(self, index: int, value: int) -> None:
+        if self.di_writes.set(ITEM_END_DI, index, value):
+            self.hub.call_soon(self._schedule_di_flush)
+
+    def set_ctrl_di(self, index: int, value: int) -> None:
+        if self.di_writes.set(ITEM_CTRL_DI, index, value):
+            self.hub.call_soon(self._schedule_di_flush)
+
+    def flush_di(self) -> None:
+        """Send the DI writes made so far as one packet, from the hub I/O thread."""
+        if self.di_writes.has_pending():
+            self.hub.call_soon(self._flush_di_writes)
+
+    def _send(self, content: str) -> None:
+        self._send_packet(
+            build_packet(self._generate_short_uuid(), MODE_STRING, content)
+        )
+
+    def _send_packet(self, packet: bytes) -> None:
+        if self.transport is None or self.transport.is_closing():
+            raise ConnectionError(f"{self.robot_name} is not connected")
+        self.hub.call_soon(self.transport.write, packet)
+
+    async def _connect_async(self) -> None:
+        loop = asyncio.get_running_loop()
+        self.parser.reset()
+        await asyncio.wait_for(
+            loop.create_connection(
+                lambda: _EthernetSlaveProtocol(self), self.tmflow_ip, self.port
+            ),
+            self.timeout,
+        )
+
+    # The callbacks below run on the hub I/O thread
+    def _schedule_di_flush(self) -> None:
+        if self._di_flush_handle is None:
+            self._di_flush_handle = asyncio.get_running_loop().call_later(
+                self.di_flush_delay, self._flush_di_writes
+            )
+
+    def _flush_di_writes(self) -> None:
+        if self._di_flush_handle is not None:
+            self._di_flush_handle.cancel()
+            self._di_flush_handle = None
+
+        self.di_writes.expire()
+        if not self.di_writes.has_pending():
+            return
+
+        if self.transport is None or self.transport.is_closing():
+            dropped = self.di_writes.drop_pending()
+            logger.warning(
+                f"{self.robot_name}: {dropped} DI writes dropped, not connected"
+            )
+            return
+
+        packet = self.di_writes.take_packet(self._generate_short_uuid())
+        if packet is not None:
+            self.transport.write(packet)
+
+    def _on_connection_made(self, transport) -> None:
+        self.transport = transport
+        self._decoders = self.transmit_table.decoders()
+        self._console(
+            f"Connected to {self.tmflow_ip}:{self.port} ({self.transmit_table.comm_mode})"
+        )
+
+    def _on_frames(self, timestamp: float) -> None:
+        parser = self.parser
+        frame = parser.next_frame()
+
+        while frame is not None:
+            # The Robot_Model reply may use the mode of the motion frames
+            decode = self._decoders.get(frame.mode)
+            if frame.id_equals(ROBOT_MODEL_ID.encode()):
+                future = self._robot_model_future
+                if future is not None and not future.done():
+                    future.set_result(self._parse_robot_model(frame))
+            elif decode is not None:
+                motion_queue = self._motion_queue
+                if motion_queue is not None:
+                    sample = self._decode(decode, frame, timestamp)
+                    if sample is not None:
+                        self._put(motion_queue, sample)
+            elif frame.mode == MODE_RESPONSE:
+                self.di_writes.acknowledge(frame)
+
+            frame = parser.next_frame()
+
+    def _on_connection_lost(self, exc) -> None:
+        if self.running:
+            self._console(f"Ethernet Slave closed the connection: {exc}")
+
+        self.running = False
+        self.transport = None
+        future = self._robot_model_future
+        if future is not None and not future.done():
+            future.set_exception(ConnectionError(f"{self.robot_name} disconnected"))
+
+
+class EthernetHub:
+    """One asyncio event loop on one I/O thread, multiplexing all Ethernet Slave connections."""
+
+    def __init__(self):
+        self._loop: asyncio.AbstractEventLoop = None
+        self._thread: threading.Thread = None
+        self.masters: Dict[str, AsyncEthernetMaster] = {}  # [robot name]
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._run, name="EthernetHub", daemon=True
+        )
+        self._thread.start()
+
+    def create_master(
+        self, robot_name: str, tmflow_ip: str, **kwargs
+    ) -> AsyncEthernetMaster:
+        self.start()
+        master = AsyncEthernetMaster(self, robot_name, tmflow_ip, **kwargs)
+        self.masters[robot_name] = master
+        return master
+
+    def flush_di_writes(self) -> None:
+        """Send the DI writes of every robot made since the last flush, once per tick."""
+        for master in self.masters.values():
+            master.flush_di()
+
+    def submit(self, coroutine) -> concurrent.futures.Future:
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    def call_soon(self, callback, *args) -> None:
+        self._loop.call_soon_threadsafe(callback, *args)
+
+    def stop(self, timeout: float = 3.0) -> None:
+        if self._thread is None:
+            return
+
+        for master in self.masters.values():
+            master.stop()
+
+        try:
+            self.submit(self._cancel_tasks()).result(timeout)
+        except Exception as e:
+            logger.warning(f"Ethernet hub tasks didn't stop cleanly: {e}")
+
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            self._loop.close()
+
+        self._thread = None
+        self._loop = None
+        self.masters = {}
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    async def _cancel_tasks(self) -> None:
+        tasks = [
+            task for task in asyncio.all_tasks() if task is not asyncio.current_task()
+        ]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Let the closed transports call connection_lost
+        await asyncio.sleep(0)
@@ -0,0 +1,376 @@
+import asyncio
+import logging
+import math
+import random
+import re
+import socket
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from tmrobot.digital_robot.services.stream_ethernet_master import ROBOT_MODEL_ID  # type: ignore
+from tmrobot.digital_robot.services.tmsvr_parser import MODE_BINARY  # type: ignore
+from tmrobot.digital_robot.services.tmsvr_parser import MODE_RESPONSE  # type: ignore
+from tmrobot.digital_robot.services.tmsvr_parser import MODE_STRING  # type: ignore
+from tmrobot.digital_robot.services.tmsvr_parser import TMSVRFrameParser  # type: ignore
+from tmrobot.digital_robot.services.tmsvr_parser import build_packet  # type: ignore
+from tmrobot.digital_robot.services.transmit_table import TransmitTable  # type: ignore
+from tmrobot.digital_robot.ui import constants as const  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+MODE_READ = 12
+TRANSMIT_ID = "TMflow"
+
+# Acknowledgements of the simulator, <error code>,<message>
+ACK_OK = "00,OK"
+ACK_INVALID = "01,Invalid"
+
+_DI_WRITE = re.compile(rb"(Ctrl_DI|End_DI)\[(\d+)\]\s*=\s*([01])")
+
+
+class SimulatedRobot:
+    """Joint angles and digital I/O of one simulated robot.
+
+    Joints follow slow sine waves and every Ctrl_DO/End_DO toggles at its own period, so
+    consecutive frames differ like a moving robot. Ctrl_DI/End_DI hold what was written.
+    """
+
+    def __init__(self, name: str, model: str = "TM5S", seed: int = None):
+        self.name = name
+        self.model = model
+        self.joint_angle = [0.0] * 6  # degree
+        self.ctrl_di = bytearray(16)
+        self.ctrl_do = bytearray(16)
+        self.end_di = bytearray(4)
+        self.end_do = bytearray(4)
+
+        rng = random.Random(seed)
+        self._amplitudes = [rng.uniform(10.0, 90.0) for _ in range(6)]
+        self._frequencies = [rng.uniform(0.05, 0.5) for _ in range(6)]
+        self._phases = [rng.uniform(0.0, 2 * math.pi) for _ in range(6)]
+
+    def advance(self, elapsed: float) -> None:
+        for i in range(6):
+            self.joint_angle[i] = self._amplitudes[i] * math.sin(
+                2 * math.pi * self._frequencies[i] * elapsed + self._phases[i]
+            )
+
+        for i in range(len(self.ctrl_do)):
+            self.ctrl_do[i] = int(elapsed / (i + 1)) & 1
+        for i in range(len(self.end_do)):
+            self.end_do[i] = int(elapsed / (i + 2)) & 1
+
+    def write(self, content: bytes) -> bool:
+        """Apply ``Ctrl_DI[i]=v``/``End_DI[i]=v`` lines, False if any of them is invalid."""
+        lines = [line for line in content.splitlines() if line.strip()]
+        if not lines:
+            return False
+
+        writes = []
+        for line in lines:
+            match = _DI_WRITE.fullmatch(line.strip())
+            if match is None:
+                return False
+
+            name, index, value = match.groups()
+            io = self.ctrl_di if name == b"Ctrl_DI" else self.end_di
+            if int(index) >= len(io):
+                return False
+            writes.append((io, int(index), int(value)))
+
+        for io, index, value in writes:
+            io[index] = value
+        return True
+
+    def transmit_content(self, transmit_table: TransmitTable) -> bytes:
+        if transmit_table.mode == MODE_BINARY:
+            values = {
+                "Joint_Angle": self.joint_angle,
+                "Ctrl_DI": self.ctrl_di,
+                "Ctrl_DO": self.ctrl_do,
+                "End_DI": self.end_di,
+                "End_DO": self.end_do,
+            }
+            packed = []
+            for item in transmit_table.items:
+                packed.extend(values.get(item.name, [0] * item.size)[: item.size])
+            return transmit_table.binary_layout.pack(packed)
+
+        joint_angle = ",".join(f"{angle:.3f}" for angle in self.joint_angle)
+        bits = lambda io: ",".join("1" if bit else "0" for bit in io)  # noqa
+        return (
+            f"Joint_Angle={{{joint_angle}}}\r\n"
+            f"Ctrl_DI={{{bits(self.ctrl_di)}}}\r\n"
+            f"Ctrl_DO={{{bits(self.ctrl_do)}}}\r\n"
+            f"End_DI={{{bits(self.end_di)}}}\r\n"
+            f"End_DO={{{bits(self.end_do)}}}"
+        ).encode("utf-8")
+
+
+@dataclass
+class SlaveStats:
+    connections: int = 0
+    frames_sent: int = 0
+    bytes_sent: int = 0
+    fragmented: int = 0  # frames written in several pieces
+    late: int = 0  # frames sent more than one period after their schedule
+    writes_acked: int = 0
+    writes_rejected: int = 0
+
+
+class _SlaveProtocol(asyncio.Protocol):
+    def __init__(self, slave: "_SimulatedSlave"):
+        self._slave = slave
+        self._parser = TMSVRFrameParser(4096)
+        self._task: asyncio.Task = None
+        self._deferred: List[bytes] = None  # written after the fragmented frame
+        self.transport: asyncio.Transport = None
+
+    def connection_made(self, transport):
+        sock = transport.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        self.transport = transport
+        self._slave.connections.add(self)
+        self._slave.stats.connections += 1
+        self._task = asyncio.get_running_loop().create_task(self._slave.transmit(self))
+
+    def data_received(self, data):
+        self._parser.feed(data)
+        frame = self._parser.next_frame()
+        while frame is not None:
+            self._slave.handle(self, frame)
+            frame = self._parser.next_frame()
+
+    def connection_lost(self, exc):
+        if self._task is not None:
+            self._task.cancel()
+        self._slave.connections.discard(self)
+        self.transport = None
+
+    def write(self, packet: bytes) -> None:
+        if self._deferred is not None:
+            self._deferred.append(packet)
+        elif self.transport is not None and not self.transport.is_closing():
+            self.transport.write(packet)
+
+    async def write_pieces(self, pieces: List[bytes], delay: float) -> None:
+        # Responses must not land inside the frame, hold them until its last piece
+        self._deferred = []
+        try:
+            for i, piece in enumerate(pieces):
+                if self.transport is None or self.transport.is_closing():
+                    return
+                self.transport.write(piece)
+                if i < len(pieces) - 1:
+                    await asyncio.sleep(delay)
+        finally:
+            deferred, self._deferred = self._deferred, None
+            for packet in deferred:
+                self.write(packet)
+
+
+class _SimulatedSlave:
+    """Ethernet Slave server of one simulated robot, on the simulator event loop."""
+
+    def __init__(
+        self,
+        simulator: "EthernetSlaveSimulator",
+        robot: SimulatedRobot,
+        host: str,
+        port: int,
+        rate: float,
+    ):
+        self.simulator = simulator
+        self.robot = robot
+        self.host = host
+        self.port = port
+        self.rate = rate
+        self.stats = SlaveStats()
+        self.server: asyncio.AbstractServer = None
+        self.connections = set()
+        self._rng = random.Random(simulator.seed)
+
+    async def serve(self) -> None:
+        self.server = await asyncio.get_running_loop().create_server(
+            lambda: _SlaveProtocol(self), self.host, self.port
+        )
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    def handle(self, connection: _SlaveProtocol, frame) -> None:
+        transaction_id = bytes(frame.buffer[frame.id_start : frame.id_end]).decode()
+
+        if frame.mode == MODE_READ and frame.id_equals(ROBOT_MODEL_ID.encode()):
+            connection.write(
+                build_packet(
+                    ROBOT_MODEL_ID, MODE_READ, f"Robot_Model={self.robot.model}"
+                )
+            )
+        elif frame.mode == MODE_STRING and self.robot.write(frame.content()):
+            self.stats.writes_acked += 1
+            connection.write(build_packet(transaction_id, MODE_RESPONSE, ACK_OK))
+        else:
+            self.stats.writes_rejected += 1
+            connection.write(build_packet(transaction_id, MODE_RESPONSE, ACK_INVALID))
+
+    async def transmit(self, connection: _SlaveProtocol) -> None:
+        simulator = self.simulator
+        period = 1.0 / self.rate
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        deadline = start
+
+        while connection.transport is not None:
+            deadline += period
+            delay = deadline - loop.time()
+            if simulator.jitter > 0:
+                delay += abs(self._rng.gauss(0.0, simulator.jitter))
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif -delay > period:
+                # Too late to catch up, skip the missed frames like a busy controller
+                self.stats.late += 1
+                deadline = loop.time()
+
+            self.robot.advance(loop.time() - start)
+            packet = build_packet(
+                TRANSMIT_ID,
+                simulator.transmit_table.mode,
+                self.robot.transmit_content(simulator.transmit_table),
+            )
+            await self._write(connection, packet)
+
+    async def _write(self, connection: _SlaveProtocol, packet: bytes) -> None:
+        self.stats.frames_sent += 1
+        self.stats.bytes_sent += len(packet)
+
+        simulator = self.simulator
+        if simulator.fragment <= 0 or self._rng.random() >= simulator.fragment:
+            connection.write(packet)
+            return
+
+        # Split at random points, including inside the header and the checksum
+        count = self._rng.randint(2, simulator.max_fragments)
+        cuts = [0] + sorted(self._rng.sample(range(1, len(packet)), count - 1))
+        cuts.append(len(packet))
+        self.stats.fragmented += 1
+
+        await connection.write_pieces(
+            [packet[start:end] for start, end in zip(cuts, cuts[1:])],
+            simulator.fragment_delay,
+        )
+
+
+class EthernetSlaveSimulator:
+    """Stand-in for the TMflow Ethernet Slave of N robots, speaking ``$TMSVR``.
+
+    Every robot listens on its own address and streams its transmit table at ``rate``
+    frames per second once a master connects. It answers ``S0,12,Robot_Model`` and
+    acknowledges ``Ctrl_DI``/``End_DI`` writes with a mode 0 response of the same
+    transaction id. ``jitter`` is the standard deviation in seconds of the delay added to
+    each frame, ``fragment`` the probability of a frame being written in 2 to
+    ``max_fragments`` pieces. Everything runs on one event loop in a background thread.
+    """
+
+    def __init__(
+        self,
+        rate: float = 100.0,
+        jitter: float = 0.0,
+        fragment: float = 0.0,
+        max_fragments: int = 4,
+        fragment_delay: float = 0.0005,
+        transmit_table: TransmitTable = None,
+        seed: int = None,
+    ):
+        self.rate = rate
+        self.jitter = jitter
+        self.fragment = fragment
+        self.max_fragments = max(2, max_fragments)
+        self.fragment_delay = fragment_delay
+        self.transmit_table = transmit_table or TransmitTable.default()
+        self.seed = seed
+        self.slaves: Dict[str, _SimulatedSlave] = {}  # [robot name]
+        self._loop: asyncio.AbstractEventLoop = None
+        self._thread: threading.Thread = None
+
+    def add_robot(
+        self,
+        name: str,
+        host: str = "127.0.0.1",
+        port: int = const.PORT_ETHERNET,
+        model: str = "TM5S",
+        rate: Optional[float] = None,
+    ) -> SimulatedRobot:
+        """Port 0 picks a free port, see ``address``. Call before ``start``."""
+        seed = None if self.seed is None else self.seed + len(self.slaves)
+        robot = SimulatedRobot(name, model, seed)
+        self.slaves[name] = _SimulatedSlave(self, robot, host, port, rate or self.rate)
+        return robot
+
+    def address(self, name: str) -> Tuple[str, int]:
+        slave = self.slaves[name]
+        return slave.host, slave.port
+
+    def start(self, timeout: float = 3.0) -> None:
+        if self._thread is not None:
+            return
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._run, name="EthernetSlaveSimulator", daemon=True
+        )
+        self._thread.start()
+
+        asyncio.run_coroutine_threadsafe(self._serve(), self._loop).result(timeout)
+
+    def stop(self, timeout: float = 3.0) -> None:
+        if self._thread is None:
+            return
+
+        try:
+            asyncio.run_coroutine_threadsafe(self._close(), self._loop).result(timeout)
+        except Exception as e:
+            logger.warning(f"Ethernet Slave simulator didn't stop cleanly: {e}")
+
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            self._loop.close()
+
+        self._thread = None
+        self._loop = None
+
+    def get_stats(self) -> Dict[str, SlaveStats]:
+        return {
+            name: SlaveStats(**vars(slave.stats)) for name, slave in self.slaves.items()
+        }
+
+    def robots(self) -> List[SimulatedRobot]:
+        return [slave.robot for slave in self.slaves.values()]
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    async def _serve(self) -> None:
+        await asyncio.gather(*[slave.serve() for slave in self.slaves.values()])
+
+    async def _close(self) -> None:
+        for slave in self.slaves.values():
+            if slave.server is not None:
+                slave.server.close()
+            for connection in list(slave.connections):
+                connection.transport.close()
+
+        tasks = [
+            task for task in asyncio.all_tasks() if task is not asyncio.current_task()
+        ]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        for slave in self.slaves.values():
+            if slave.server is not None:
+                await slave.server.wait_closed()
@@ -0,0 +1,148 @@
+import logging
+from typing import Dict, List, Sequence
+
+import numpy as np
+from isaacsim.core.prims import Articulation
+
+logger = logging.getLogger(__name__)
+
+
+class _FleetGroup:
+    """Robots of one model, the same articulation structure, behind one view."""
+
+    def __init__(self, name: str, articulations: Dict[str, object], num_joints: int):
+        self.name = name
+        self.robot_names = list(articulations)
+        self.articulations = list(articulations.values())
+        self.num_joints = num_joints
+        self.rows = {robot_name: i for i, robot_name in enumerate(self.robot_names)}
+        self.targets = np.zeros((len(self.robot_names), num_joints), dtype=np.float32)
+        self.dirty = np.zeros(len(self.robot_names), dtype=bool)
+        self.joint_indices: np.ndarray = None  # resolved by DOF name once initialized
+        self.failed = False
+
+        # Initialized by World.reset once it is added to the scene
+        self.view = Articulation(
+            prim_paths_expr=[
+                articulation.prim_path for articulation in self.articulations
+            ],
+            name=name,
+            reset_xform_properties=False,
+        )
+
+    def is_ready(self) -> bool:
+        if not self.view.is_physics_handle_valid():
+            return False
+        if self.joint_indices is None and not self.failed:
+            self._resolve_joints()
+        return self.joint_indices is not None
+
+    def _resolve_joints(self) -> None:
+        # The joint positions of a sample are the first DOFs of each robot articulation,
+        # the order apply_action writes them in
+        joint_names = list(self.articulations[0].dof_names or [])[: self.num_joints]
+        view_names = list(self.view.dof_names or [])
+        if len(joint_names) < self.num_joints:
+            self._fail(f"has {len(joint_names)} DOFs, {self.num_joints} are needed")
+            return
+
+        for robot_name, articulation in zip(self.robot_names, self.articulations):
+            if list(articulation.dof_names)[: self.num_joints] != joint_names:
+                self._fail(f"{robot_name} has other joints than {self.robot_names[0]}")
+                return
+
+        missing = [name for name in joint_names if name not in view_names]
+        if missing:
+            self._fail(f"view has no DOF {', '.join(missing)}")
+            return
+
+        self.joint_indices = np.array(
+            [view_names.index(name) for name in joint_names], dtype=np.int32
+        )
+
+    def _fail(self, reason: str) -> None:
+        self.failed = True
+        logger.warning(f"{self.name} {reason}, its robots are written one by one")
+
+
+class FleetArticulation:
+    """Joint position targets of all digital robots, written in batched calls per step.
+
+    The robots are grouped by ``groups``, e.g. their model: the robots of a group share
+    one articulation structure and one ``Articulation`` view. Their targets are gathered
+    into a preallocated ``(robots, joints)`` array and the rows set since the last
+    ``apply`` are pushed with a single ``set_joint_position_targets`` per group,
+    instead of one ``apply_action`` per robot.
+
+    ``articulations`` are the articulations of the robots, e.g. ``DigitalRobot.get_robot()``.
+    The joints written are resolved by DOF name in the view once it is initialized.
+    ``set_target`` returns False for a robot that can't be batched yet, or at all, the
+    caller writes it itself.
+    """
+
+    def __init__(
+        self,
+        articulations: Dict[str, object],
+        groups: Dict[str, str] = None,
+        num_joints: int = 6,
+        name: str = "digital_robot_fleet",
+    ):
+        self.name = name
+        self.num_joints = num_joints
+        self.batches = 0
+        self.writes = 0
+
+        members: Dict[str, Dict[str, object]] = {}  # [group] robot articulations
+        for robot_name, articulation in articulations.items():
+            group = (groups or {}).get(robot_name, "")
+            members.setdefault(group, {})[robot_name] = articulation
+
+        self._groups: List[_FleetGroup] = [
+            _FleetGroup(f"{name}_{index}", group_articulations, num_joints)
+            for index, group_articulations in enumerate(members.values())
+        ]
+        self._group_of = {
+            robot_name: group
+            for group in self._groups
+            for robot_name in group.robot_names
+        }
+
+    @property
+    def views(self) -> List[Articulation]:
+        return [group.view for group in self._groups]
+
+    def __contains__(self, robot_name: str) -> bool:
+        return robot_name in self._group_of
+
+    def is_initialized(self) -> bool:
+        return any(group.is_ready() for group in self._groups)
+
+    def set_target(self, robot_name: str, joint_positions: Sequence[float]) -> bool:
+        group = self._group_of.get(robot_name)
+        if group is None or not group.is_ready():
+            return False
+
+        row = group.rows[robot_name]
+        group.targets[row] = joint_positions[: self.num_joints]
+        group.dirty[row] = True
+        return True
+
+    def apply(self) -> int:
+        """Write the pending targets, returns the number of robots written."""
+        written = 0
+        for group in self._groups:
+            if not group.dirty.any() or not group.is_ready():
+                continue
+
+            indices = np.flatnonzero(group.dirty).astype(np.int32)
+            group.view.set_joint_position_targets(
+                group.targets[indices],
+                indices=indices,
+                joint_indices=group.joint_indices,
+            )
+            group.dirty[:] = False
+            self.batches += 1
+            written += len(indices)
+
+        self.writes += written
+        return written
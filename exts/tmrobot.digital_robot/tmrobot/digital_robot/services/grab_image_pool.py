@@ -0,0 +1,82 @@
+import asyncio
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Tuple
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotCamera:
+    """DigitalCamera proxy splitting a grab into a copy on the Kit thread and its encoding.
+
+    ``snapshot`` takes the RGB bytes and the size of the frame from the camera, ``encode``
+    turns them into what the compiled ``getGrabImageData`` makes of the renderer on any
+    thread: the PNG saved in ``png_dir`` and the JPEG ``DigitalCamera.get_jpg`` returns.
+    Every other attribute is the camera's.
+    """
+
+    def __init__(self, camera, png_dir: str = None, jpeg_quality: int = 50):
+        self.camera = camera
+        self.png_dir = png_dir  # the grabbed images aren't saved when None
+        self.jpeg_quality = jpeg_quality
+
+    def __getattr__(self, name):
+        return getattr(self.camera, name)
+
+    def snapshot(self) -> Tuple[bytes, Tuple[int, int]]:
+        # DigitalCamera.get_rgb copies the annotator data into bytes
+        return self.camera.get_rgb(), self.camera.get_image_size()
+
+    def encode(self, rgb: bytes, size: Tuple[int, int]) -> bytes:
+        image = Image.frombytes("RGB", size, rgb)
+        if self.png_dir is not None:
+            name = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            image.save(os.path.join(self.png_dir, f"{name}.png"), format="PNG")
+
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=self.jpeg_quality)
+        return buffer.getvalue()
+
+
+class PoolFullError(RuntimeError):
+    pass
+
+
+class GrabImagePool:
+    """Bounded thread pool for the image encoding of the camera server.
+
+    PIL releases the GIL while it encodes, so the Kit loop keeps rendering and stepping
+    physics. At most ``max_pending`` grabs are queued, ``run`` raises ``PoolFullError``
+    beyond that so the server can turn the request away instead of piling up frames.
+    """
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 8):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="GrabImage"
+        )
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def run(self, function, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise PoolFullError(f"{self.pending} images are already being encoded")
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, function, *args)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,172 @@
+from abc import ABC, abstractmethod
+from typing import List, Optional, Sequence
+
+from pxr import Gf, Sdf, Usd, UsdGeom, UsdPhysics
+
+DRIVE_LINEAR_TARGET_POSITION = "drive:linear:physics:targetPosition"
+
+
+class CachedAttributes:
+    """Attribute handles resolved once, written together without the command stack.
+
+    The first write authors the values outside of any change block, the next ones are
+    batched in one ``Sdf.ChangeBlock``: Usd only supports setting already authored
+    values inside a change block. Handles are resolved again if a prim was removed.
+    """
+
+    def __init__(self, stage: Usd.Stage, attribute_paths: Sequence[str]):
+        self.stage = stage
+        self.attribute_paths = [Sdf.Path(path) for path in attribute_paths]
+        self._attributes: List[Usd.Attribute] = []
+        self._authored = False
+
+    def set(self, values: Sequence) -> None:
+        attributes = self.resolve()
+
+        if not self._authored:
+            for attribute, value in zip(attributes, values):
+                attribute.Set(value)
+            self._authored = True
+            return
+
+        with Sdf.ChangeBlock():
+            for attribute, value in zip(attributes, values):
+                attribute.Set(value)
+
+    def resolve(self) -> List[Usd.Attribute]:
+        if self._attributes and all(attribute for attribute in self._attributes):
+            return self._attributes
+
+        attributes = []
+        for path in self.attribute_paths:
+            attribute = self.stage.GetAttributeAtPath(path)
+            if not attribute:
+                raise RuntimeError(f"{path} doesn't exist")
+            attributes.append(attribute)
+
+        self._attributes = attributes
+        self._authored = False
+        return attributes
+
+
+class GripperController(ABC):
+    """Open/close state of a gripper, ``set_closed`` only acts when the state changes.
+
+    Subclasses implement ``_apply`` for their kind of gripper.
+    """
+
+    def __init__(self):
+        self.closed: bool = None
+        self.toggles = 0
+
+    def close(self) -> bool:
+        return self.set_closed(True)
+
+    def open(self) -> bool:
+        return self.set_closed(False)
+
+    def set_closed(self, closed: bool) -> bool:
+        """Returns False if the gripper was already in that state."""
+        closed = bool(closed)
+        if closed == self.closed:
+            return False
+
+        self._apply(closed)
+        self.closed = closed
+        self.toggles += 1
+        return True
+
+    @abstractmethod
+    def _apply(self, closed: bool) -> None:
+        """Move the gripper to the new state."""
+
+
+class SurfaceGripperController(GripperController):
+    """Surface_Gripper close/open, called once per state change."""
+
+    def __init__(self, surface_gripper):
+        super().__init__()
+        self.surface_gripper = surface_gripper
+
+    def _apply(self, closed: bool) -> None:
+        if closed:
+            self.surface_gripper.close()
+        else:
+            self.surface_gripper.open()
+
+
+class PrismaticGripperController(GripperController):
+    """Parallel gripper driven by the linear drive targets of its prismatic joints.
+
+    ``joint_paths`` are the joint prims, e.g. ``.../Robotiq_Hand_E_edit/Slider_1``. The
+    targets of all fingers are written through cached attribute handles in one change
+    block, instead of one ``ChangeProperty`` command per finger on the undo stack.
+    """
+
+    def __init__(
+        self,
+        stage: Usd.Stage,
+        joint_paths: Sequence[str],
+        open_position: float = 0.025,
+        closed_position: float = 0.0,
+        target_attribute: str = DRIVE_LINEAR_TARGET_POSITION,
+    ):
+        super().__init__()
+        self.stage = stage
+        self.joint_paths = list(joint_paths)
+        self.open_position = open_position
+        self.closed_position = closed_position
+        self._targets = CachedAttributes(
+            stage, [f"{path}.{target_attribute}" for path in joint_paths]
+        )
+        self._count = len(joint_paths)
+
+    def set_target(self, position: float) -> None:
+        self._targets.set([position] * self._count)
+
+    def grip_point(self) -> Optional[Gf.Vec3d]:
+        """World position between the fingers, the body1 of the joints, None without."""
+        positions = []
+        for path in self.joint_paths:
+            joint = UsdPhysics.Joint(self.stage.GetPrimAtPath(path))
+            fingers = joint.GetBody1Rel().GetTargets() if joint else []
+            if fingers:
+                finger = UsdGeom.Xformable(self.stage.GetPrimAtPath(fingers[0]))
+                transform = finger.ComputeLocalToWorldTransform(Usd.TimeCode.Default())
+                positions.append(transform.ExtractTranslation())
+
+        if not positions:
+            return None
+        return sum(positions, Gf.Vec3d(0, 0, 0)) / len(positions)
+
+    def _apply(self, closed: bool) -> None:
+        self.set_target(self.closed_position if closed else self.open_position)
+
+
+class CachedXformPose:
+    """Writes the translate and orient xformOps of a prim, e.g. to reset a workpiece."""
+
+    def __init__(self, stage: Usd.Stage, prim_path: str):
+        self._ops = CachedAttributes(
+            stage, [f"{prim_path}.xformOp:translate", f"{prim_path}.xformOp:orient"]
+        )
+        self._types = None
+
+    def set(self, translate: Gf.Vec3d, orient: Gf.Quatd = None) -> None:
+        attributes = self._ops.resolve()
+
+        if self._types is None:
+            # Match the precision of the authored ops, e.g. float3 and quatf
+            values = [attribute.Get() for attribute in attributes]
+            self._types = [
+                type(value) if value is not None else default
+                for value, default in zip(values, (Gf.Vec3d, Gf.Quatd))
+            ]
+
+        if orient is None:
+            orient = attributes[1].Get()
+            if orient is None:
+                orient = Gf.Quatd(1.0)
+
+        translate_type, orient_type = self._types
+        self._ops.set([translate_type(translate), orient_type(orient)])
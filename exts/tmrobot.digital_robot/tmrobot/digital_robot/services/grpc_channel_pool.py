@@ -0,0 +1,143 @@
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List
+
+import grpc
+
+from tmrobot.digital_robot.grpcs.OmniverseAPI_pb2_grpc import OmniverseApiStub  # type: ignore
+from tmrobot.digital_robot.services.echo_client import EchoClient  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+# Channel of the Virtual Camera API, as opened by the compiled EchoClient.__init__
+VIRTUAL_CAMERA_API_PORT = 15568
+CERTIFICATE_PATH = os.path.join(
+    os.path.dirname(__file__), "credentials", "virtual_camera.crt"
+)
+TARGET_NAME = "virtual_camera"  # CN of the certificate
+
+_credentials: grpc.ChannelCredentials = None
+_credentials_lock = threading.Lock()
+
+
+def get_channel_credentials() -> grpc.ChannelCredentials:
+    """Credentials of the Virtual Camera API certificate, read once per process."""
+    global _credentials
+    with _credentials_lock:
+        if _credentials is None:
+            with open(CERTIFICATE_PATH, "rb") as f:
+                _credentials = grpc.ssl_channel_credentials(root_certificates=f.read())
+        return _credentials
+
+
+class PooledEchoClient(EchoClient):
+    """``EchoClient`` on a pooled channel, instead of one opened by its ``__init__``.
+
+    ``connectVirtualCameraAPI`` is the compiled one: a ``connectTMFlow`` call on
+    ``_stub``, the stub ``EchoClient.__init__`` creates on its channel.
+    """
+
+    def __init__(self, channel: grpc.Channel):
+        self.channel = channel
+        self._stub = OmniverseApiStub(channel)
+
+
+@dataclass
+class _PooledChannel:
+    channel: grpc.Channel
+    client: PooledEchoClient
+    last_used: float
+
+
+class GrpcChannelPool:
+    """Secure channels to the Virtual Camera API shared by TMflow IP.
+
+    Every channel uses the credentials of ``get_channel_credentials``, so the certificate
+    is read once per process, and is kept open between the service starts: the
+    ``connectTMFlow`` and ``connectVirtualCameraAPI`` calls of an IP reuse its warm
+    HTTP/2 connection instead of a TLS handshake each. A daemon timer closes the
+    channels unused for ``idle_timeout``.
+    """
+
+    def __init__(self, idle_timeout: float = 300.0):
+        self.idle_timeout = idle_timeout
+        self._channels: Dict[str, _PooledChannel] = {}  # [TMflow IP]
+        self._lock = threading.Lock()
+        self._reaper: threading.Timer = None
+        self.created = 0
+        self.reused = 0
+        self.closed = 0
+
+    def get_client(self, tmflow_ip: str) -> PooledEchoClient:
+        return self._get(tmflow_ip).client
+
+    def drop_idle(self) -> int:
+        """Close the channels unused for ``idle_timeout``, returns the number closed."""
+        deadline = time.monotonic() - self.idle_timeout
+        with self._lock:
+            idle = [ip for ip, p in self._channels.items() if p.last_used <= deadline]
+            channels = [self._channels.pop(ip).channel for ip in idle]
+            self.closed += len(channels)
+            self._reaper = None
+            self._schedule_reaper()
+
+        self._close(channels)
+        return len(channels)
+
+    def close(self) -> None:
+        with self._lock:
+            channels = [pooled.channel for pooled in self._channels.values()]
+            self.closed += len(channels)
+            self._channels = {}
+            if self._reaper is not None:
+                self._reaper.cancel()
+                self._reaper = None
+
+        self._close(channels)
+
+    def __len__(self) -> int:
+        return len(self._channels)
+
+    def _get(self, tmflow_ip: str) -> _PooledChannel:
+        with self._lock:
+            pooled = self._channels.get(tmflow_ip)
+            if pooled is None:
+                channel = grpc.secure_channel(
+                    f"{tmflow_ip}:{VIRTUAL_CAMERA_API_PORT}",
+                    credentials=get_channel_credentials(),
+                    options=(("grpc.ssl_target_name_override", TARGET_NAME),),
+                )
+                pooled = self._channels[tmflow_ip] = _PooledChannel(
+                    channel, PooledEchoClient(channel), 0.0
+                )
+                self.created += 1
+            else:
+                self.reused += 1
+
+            pooled.last_used = time.monotonic()
+            self._schedule_reaper()
+            return pooled
+
+    def _schedule_reaper(self) -> None:
+        # Called with the lock held
+        if self._reaper is not None or not self._channels:
+            return
+
+        self._reaper = threading.Timer(self.idle_timeout, self.drop_idle)
+        self._reaper.daemon = True
+        self._reaper.start()
+
+    def _close(self, channels: List[grpc.Channel]) -> None:
+        # Outside the lock, closing cancels the calls still running on a channel
+        for channel in channels:
+            try:
+                channel.close()
+            except Exception as e:
+                logger.warning(f"Failed to close a Virtual Camera API channel: {e}")
+
+
+# Shared by every service check of the process
+channel_pool = GrpcChannelPool()
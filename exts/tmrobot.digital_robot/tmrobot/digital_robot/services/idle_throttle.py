@@ -0,0 +1,111 @@
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+import carb.settings
+import omni.kit.viewport.utility as vp_utils
+
+logger = logging.getLogger(__name__)
+
+_RATE_LIMIT_ENABLED = "/app/runLoops/main/rateLimitEnabled"
+_RATE_LIMIT_FREQUENCY = "/app/runLoops/main/rateLimitFrequency"
+
+
+@dataclass
+class IdleStats:
+    idled: int = 0  # times the update rate was lowered
+    resumed: int = 0
+    idle_time: float = 0.0  # seconds spent throttled, up to the last resume
+
+
+class IdleThrottle:
+    """Lowers the Kit update rate and pauses the viewport while the twin is static.
+
+    The twin is idle when ``update`` sees the same scene version for ``idle_after``
+    seconds and ``mark_active`` isn't called meanwhile. An unchanged ``SceneVersion``
+    means every joint target equals the last one and no prim moved, motion received
+    from a static robot doesn't count as activity. A changed DO state seen by
+    ``observe_outputs`` and a camera grab request do.
+
+    While idle the main run loop is rate limited to ``idle_rate`` updates per second
+    and the active viewport stops rendering, physics steps and camera grabs go on at
+    that rate. Any activity restores both at once: the motion is seen by the next
+    physics step, a grab request on the Kit loop itself, within one idle frame.
+    """
+
+    def __init__(
+        self, idle_after: float = 3.0, idle_rate: float = 5.0, pause_viewport=True
+    ):
+        self.idle_after = idle_after
+        self.idle_rate = idle_rate
+        self.pause_viewport = pause_viewport
+        self.stats = IdleStats()
+        self.idle = False
+        self._settings = carb.settings.get_settings()
+        self._saved_rate_limit: Tuple[bool, float] = None
+        self._paused_viewport = None
+        self._version = None
+        self._active_at = time.perf_counter()
+        self._idle_since = 0.0
+        self._outputs: Dict[str, Tuple[str, str]] = {}  # [robot name] Ctrl_DO, End_DO
+
+    def observe_outputs(self, motion) -> None:
+        outputs = (motion.ctrl_do, motion.end_do)
+        if self._outputs.get(motion.robot_name) != outputs:
+            self._outputs[motion.robot_name] = outputs
+            self.mark_active()
+
+    def mark_active(self) -> None:
+        self._active_at = time.perf_counter()
+        if self.idle:
+            self._resume(self._active_at)
+
+    def update(self, now: float, scene_version: int) -> bool:
+        """Throttle or resume from the scene version of this step, returns ``idle``."""
+        if scene_version != self._version:
+            self._version = scene_version
+            self.mark_active()
+        elif not self.idle and now - self._active_at >= self.idle_after:
+            self._throttle(now)
+        return self.idle
+
+    def restore(self) -> None:
+        """Resume if idle, e.g. when the services stop."""
+        if self.idle:
+            self._resume(time.perf_counter())
+
+    def _throttle(self, now: float) -> None:
+        self._saved_rate_limit = (
+            self._settings.get(_RATE_LIMIT_ENABLED),
+            self._settings.get(_RATE_LIMIT_FREQUENCY),
+        )
+        self._settings.set(_RATE_LIMIT_ENABLED, True)
+        self._settings.set(_RATE_LIMIT_FREQUENCY, self.idle_rate)
+
+        if self.pause_viewport:
+            # None when headless
+            viewport = vp_utils.get_active_viewport()
+            if viewport is not None and viewport.updates_enabled:
+                viewport.updates_enabled = False
+                self._paused_viewport = viewport
+
+        self.idle = True
+        self._idle_since = now
+        self.stats.idled += 1
+        logger.info(f"Idle, {self.idle_rate} updates per second")
+
+    def _resume(self, now: float) -> None:
+        enabled, frequency = self._saved_rate_limit
+        self._settings.set(_RATE_LIMIT_ENABLED, bool(enabled))
+        if frequency is not None:
+            self._settings.set(_RATE_LIMIT_FREQUENCY, frequency)
+
+        if self._paused_viewport is not None:
+            self._paused_viewport.updates_enabled = True
+            self._paused_viewport = None
+
+        self.idle = False
+        self.stats.resumed += 1
+        self.stats.idle_time += now - self._idle_since
+        logger.info(f"Resumed after {now - self._idle_since:.1f} s idle")
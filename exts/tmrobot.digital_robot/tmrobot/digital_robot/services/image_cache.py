@@ -0,0 +1,258 @@
+import asyncio
+import inspect
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import grpc
+import numpy as np
+from pxr import Tf, Usd
+
+from tmrobot.digital_robot.grpcs import VirtualCameraAPI_pb2  # type: ignore
+from tmrobot.digital_robot.models.digital_camera import ImageType  # type: ignore
+from tmrobot.digital_robot.models.digital_camera import PixelFormat  # type: ignore
+from tmrobot.digital_robot.services.grab_image_pool import GrabImagePool  # type: ignore
+from tmrobot.digital_robot.services.grab_image_pool import PoolFullError  # type: ignore
+from tmrobot.digital_robot.services.grab_image_pool import SnapshotCamera  # type: ignore
+from tmrobot.digital_robot.services.raw_image import RAW_IMAGE_TYPE  # type: ignore
+from tmrobot.digital_robot.services.raw_image import RawImagePacker  # type: ignore
+from tmrobot.digital_robot.services.virtual_camera_server_secure import VirtualCameraServerSecure  # type: ignore
+from tmrobot.digital_robot.ui import constants as const  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+
+class SceneVersion:
+    """Counter bumped when a joint or a prim pose actually changes.
+
+    ``step`` is the physics step count, ``changed_step`` the step of the last change.
+    An image grabbed on the step of a change may not be rendered yet, so it isn't cached.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+        self.step = 0
+        self.changed_step = 0
+        self._joint_positions: Dict[str, np.ndarray] = {}  # [robot name]
+        self._listener = None
+
+    def bump(self) -> None:
+        with self._lock:
+            self.value += 1
+            self.changed_step = self.step
+
+    def advance(self, step: int) -> None:
+        self.step = step
+
+    def is_settled(self) -> bool:
+        return self.step > self.changed_step
+
+    def update_joints(
+        self, robot_name: str, joint_positions, tolerance: float = 1e-6
+    ) -> None:
+        last = self._joint_positions.get(robot_name)
+        if last is not None and np.allclose(
+            last, joint_positions, rtol=0, atol=tolerance
+        ):
+            return
+
+        self._joint_positions[robot_name] = np.array(joint_positions, dtype=np.float64)
+        self.bump()
+
+    def watch_stage(self, stage: Usd.Stage) -> None:
+        """Bump on structural changes and on transform edits of the stage."""
+        self.unwatch_stage()
+        self._listener = Tf.Notice.Register(
+            Usd.Notice.ObjectsChanged, self._on_objects_changed, stage
+        )
+
+    def unwatch_stage(self) -> None:
+        if self._listener is not None:
+            self._listener.Revoke()
+            self._listener = None
+
+    def _on_objects_changed(self, notice, sender) -> None:
+        if notice.GetResyncedPaths():
+            self.bump()
+            return
+
+        for path in notice.GetChangedInfoOnlyPaths():
+            if path.IsPropertyPath() and path.name.startswith("xformOp"):
+                self.bump()
+                return
+
+
+@dataclass
+class CachedImage:
+    version: int
+    response: Any
+    nbytes: int = 0
+
+
+class EncodedImageCache:
+    """Last encoded image of each camera, valid for one scene version and camera setting."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._images: Dict[Hashable, CachedImage] = {}  # [camera key]
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, version: int) -> Optional[Any]:
+        with self._lock:
+            cached = self._images.get(key)
+            if cached is None or cached.version != version:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return cached.response
+
+    def put(self, key: Hashable, version: int, response: Any) -> None:
+        nbytes = len(getattr(response, "EncodeString", b""))
+        with self._lock:
+            self._images[key] = CachedImage(version, response, nbytes)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._images = {}
+
+    def nbytes(self) -> int:
+        return sum(cached.nbytes for cached in self._images.values())
+
+
+class CachedVirtualCameraServer(VirtualCameraServerSecure):
+    """VirtualCameraServerSecure answering repeated grabs of an unchanged scene from a cache.
+
+    ``getGrabImageData`` responses are kept per TMflow IP and camera serial number, keyed
+    on ``scene_version`` and the camera settings that change the encoded image. On a miss
+    only the RGB frame is copied on the Kit loop: the PNG the compiled handler saves, the
+    JPEG and the response are made from that copy in ``grab_pool``. Concurrent grabs of
+    the same camera share one grab.
+
+    With ``raw_pixel_format`` set to "RGB" or "MONO" images aren't encoded: the RGB frame
+    is packed as raw bytes and sent as ImageType "RAW", the size comes from
+    ``getImageSize``.
+
+    ``on_request`` is called on every ``getGrabImageData``, e.g. to wake an idle twin.
+    """
+
+    def __init__(
+        self,
+        set_queue,
+        dg_cameras,
+        scene_version: SceneVersion,
+        cache: EncodedImageCache = None,
+        grab_pool: GrabImagePool = None,
+        raw_pixel_format: str = None,
+    ):
+        # [tmflow ip][serial number]
+        self.cameras = {
+            ip: {
+                sn: SnapshotCamera(camera, const.RAW_IMAGE_PATH)
+                for sn, camera in cameras.items()
+            }
+            for ip, cameras in dg_cameras.items()
+        }
+        super().__init__(set_queue, self.cameras)
+        self.scene_version = scene_version
+        self.image_cache = cache or EncodedImageCache()
+        self.grab_pool = grab_pool or GrabImagePool()
+        self._grabs: Dict[Hashable, asyncio.Future] = {}  # [camera key]
+        self.raw_pixel_format = raw_pixel_format
+        self._packers: Dict[Hashable, RawImagePacker] = {}  # [camera key]
+        self.on_request: Callable[[], None] = None
+
+    async def getGrabImageData(self, request, context):
+        if self.on_request is not None:
+            self.on_request()
+
+        client_ip, camera = self._find_camera(request, context)
+        if camera is None:
+            return await self._grab(request, context)
+
+        key = self._image_key(client_ip, request.SerialNumber, camera)
+        version = self.scene_version.value
+        response = self.image_cache.get(key, version)
+        if response is not None:
+            return response
+
+        grab = self._grabs.get(key)
+        if grab is None:
+            grab = asyncio.ensure_future(self._grab_snapshot(camera, key, version))
+            self._grabs[key] = grab
+            grab.add_done_callback(lambda _: self._grabs.pop(key, None))
+
+        try:
+            return await asyncio.shield(grab)
+        except PoolFullError as e:
+            await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, str(e))
+
+    def stop_grab_pool(self) -> None:
+        self.grab_pool.shutdown()
+
+    async def _grab_snapshot(self, camera: SnapshotCamera, key, version: int):
+        settled = self.scene_version.is_settled()
+
+        if self.raw_pixel_format is not None:
+            response = await self._grab_raw(camera, key)
+            if settled:
+                self.image_cache.put(key, version, response)
+            return response
+
+        rgb, size = camera.snapshot()
+        response = await self.grab_pool.run(self._encode, camera, rgb, size)
+
+        # Only cache complete images rendered after the last change
+        if settled and response.EncodeString:
+            self.image_cache.put(key, version, response)
+
+        return response
+
+    async def _grab_raw(self, camera: SnapshotCamera, key):
+        packer = self._packers.get(key)
+        if packer is None:
+            packer = self._packers[key] = RawImagePacker(self.raw_pixel_format)
+
+        # The bytes are a new copy per call, RGB is sent as is and MONO packed in the pool
+        rgb, size = camera.snapshot()
+        if packer.pixel_format == "RGB":
+            encode_string = packer.pack_bytes(rgb, size)
+        else:
+            encode_string = await self.grab_pool.run(packer.pack_bytes, rgb, size)
+        return VirtualCameraAPI_pb2.getGrabImageDataResponse(
+            ImageType=RAW_IMAGE_TYPE,
+            PixelFormat=packer.pixel_format,
+            EncodeString=encode_string,
+        )
+
+    def _encode(self, camera: SnapshotCamera, rgb: bytes, size):
+        # On a grab_pool thread, the response of the compiled getGrabImageData
+        return VirtualCameraAPI_pb2.getGrabImageDataResponse(
+            ImageType=ImageType.jpg.name,
+            PixelFormat=PixelFormat.RGB.name,
+            EncodeString=camera.encode(rgb, size),
+        )
+
+    async def _grab(self, request, context):
+        response = super().getGrabImageData(request, context)
+        if inspect.isawaitable(response):
+            response = await response
+        return response
+
+    def _find_camera(self, request, context) -> Tuple[str, Optional[SnapshotCamera]]:
+        # peer: ipv4:192.168.1.2:50051
+        peer = context.peer().split(":")
+        client_ip = peer[1] if len(peer) > 2 else ""
+        return client_ip, self.cameras.get(client_ip, {}).get(request.SerialNumber)
+
+    def _image_key(self, client_ip: str, serial_number: str, camera) -> Hashable:
+        # The DigitalCamera settings which change the image, set by TMflow
+        setting = (
+            camera.get_image_size(),
+            camera.get_gain(),
+            camera.get_shutter_time(),
+            camera.get_white_balance(),
+        )
+        return (client_ip, serial_number, repr(setting))
@@ -0,0 +1,175 @@
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from pxr import Gf, Sdf, Usd, UsdGeom, Vt
+
+from tmrobot.digital_robot.services.spatial_hash import SpatialHash  # type: ignore
+
+
+class InstancedWorkpieces:
+    """Many identical resting parts, e.g. a bin, drawn by one ``UsdGeom.PointInstancer``.
+
+    The stage holds one instancer with the prototype referencing ``usd_path`` and three
+    arrays instead of one referenced prim per part, 10k parts stay a few hundred KB of
+    stage. The parts have no physics: ``take`` removes the part nearest to a position,
+    e.g. to spawn a rigid body workpiece there when a robot picks it.
+
+    Changes are written to the arrays by ``flush`` in one ``Sdf.ChangeBlock``, after a
+    batch of ``add``/``take`` calls. The x and y of the parts are indexed by a
+    ``SpatialHash`` of ``cell_size``, or by ``index`` when it is shared with a
+    ``WorkpiecePool``, so that it sees the parts too: ``is_free`` and ``take`` don't
+    depend on the number of parts. The parts are keyed by their ``int`` id in it.
+    """
+
+    def __init__(
+        self,
+        stage: Usd.Stage,
+        prim_path: str,
+        usd_path: str,
+        scale: Gf.Vec3f = Gf.Vec3f(0.5, 0.5, 0.5),
+        cell_size: float = 0.05,
+        index: SpatialHash = None,
+    ):
+        self.stage = stage
+        self.prim_path = prim_path
+        self.index = index if index is not None else SpatialHash(cell_size)
+        self._positions = np.zeros((0, 3), dtype=np.float32)
+        self._yaws = np.zeros(0, dtype=np.float32)  # radians about z
+        self._ids = np.zeros(0, dtype=np.int64)  # [row] part id
+        self._rows: Dict[int, int] = {}  # [part id] row
+        self._next_id = 0
+        self._dirty = False
+
+        self._instancer = UsdGeom.PointInstancer.Define(stage, prim_path)
+        prototype = stage.DefinePrim(f"{prim_path}/Prototypes/part", "Xform")
+        prototype.GetReferences().AddReference(usd_path)
+        scale_op = prototype.GetAttribute("xformOp:scale")
+        if scale_op:
+            scale_op.Set(scale)
+        self._instancer.CreatePrototypesRel().SetTargets([prototype.GetPath()])
+
+        # Authored once, the change block of flush only updates them
+        self._positions_attribute = self._instancer.CreatePositionsAttr(Vt.Vec3fArray())
+        self._orientations_attribute = self._instancer.CreateOrientationsAttr(
+            Vt.QuathArray()
+        )
+        self._proto_indices_attribute = self._instancer.CreateProtoIndicesAttr(
+            Vt.IntArray()
+        )
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, part_id) -> bool:
+        return part_id in self._rows
+
+    def add(self, position: Sequence[float], yaw: float = 0.0) -> int:
+        """Add a part at ``position`` rotated by ``yaw`` radians, returns its id."""
+        return self.add_many([position], [yaw])[0]
+
+    def add_many(
+        self, positions: Sequence[Sequence[float]], yaws: Sequence[float] = None
+    ) -> List[int]:
+        positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+        count = len(positions)
+        if yaws is None:
+            yaws = np.zeros(count, dtype=np.float32)
+        yaws = np.asarray(yaws, dtype=np.float32).reshape(count)
+
+        ids = np.arange(self._next_id, self._next_id + count, dtype=np.int64)
+        self._next_id += count
+        first_row = len(self._ids)
+        self._positions = np.concatenate((self._positions, positions))
+        self._yaws = np.concatenate((self._yaws, yaws))
+        self._ids = np.concatenate((self._ids, ids))
+
+        ids = ids.tolist()
+        for offset, (part_id, position) in enumerate(zip(ids, positions.tolist())):
+            self._rows[part_id] = first_row + offset
+            self.index.insert(part_id, position[:2])
+
+        self._dirty = True
+        return ids
+
+    def is_free(self, position: Sequence[float], radius: float) -> bool:
+        """False if a part, or a workpiece of a shared index, is within ``radius`` in x and y."""
+        return self.index.is_free(position[:2], radius)
+
+    def nearest(
+        self, position: Sequence[float], radius: float
+    ) -> Optional[Tuple[int, Tuple[float, float, float], float]]:
+        """Id, position and yaw of the part nearest to ``position`` within ``radius``."""
+        found = None
+        for part_id in self.index.query(position[:2], radius):
+            row = self._rows.get(part_id)
+            if row is None:
+                continue  # not a part, e.g. a workpiece of the shared index
+
+            part_position = tuple(self._positions[row].tolist())
+            distance = math.dist(position, part_position)
+            if distance <= radius and (found is None or distance < found[0]):
+                found = (distance, part_id, part_position, float(self._yaws[row]))
+
+        return None if found is None else found[1:]
+
+    def take(
+        self, position: Sequence[float], radius: float
+    ) -> Optional[Tuple[Tuple[float, float, float], float]]:
+        """Remove the part nearest to ``position``, returns its position and yaw."""
+        nearest = self.nearest(position, radius)
+        if nearest is None:
+            return None
+
+        part_id, part_position, yaw = nearest
+        self.remove(part_id)
+        return part_position, yaw
+
+    def remove(self, part_id: int) -> bool:
+        row = self._rows.pop(part_id, None)
+        if row is None:
+            return False
+
+        # Move the last part to the row of the removed one
+        last = len(self._ids) - 1
+        if row != last:
+            self._positions[row] = self._positions[last]
+            self._yaws[row] = self._yaws[last]
+            self._ids[row] = self._ids[last]
+            self._rows[int(self._ids[row])] = row
+        self._positions = self._positions[:last]
+        self._yaws = self._yaws[:last]
+        self._ids = self._ids[:last]
+
+        self.index.remove(part_id)
+        self._dirty = True
+        return True
+
+    def clear(self) -> None:
+        for part_id in self._rows:
+            self.index.remove(part_id)
+        self._positions = self._positions[:0]
+        self._yaws = self._yaws[:0]
+        self._ids = self._ids[:0]
+        self._rows = {}
+        self._dirty = True
+
+    def flush(self) -> bool:
+        """Write the arrays if parts were added or removed, True if written."""
+        if not self._dirty:
+            return False
+
+        half = self._yaws.astype(np.float64) / 2
+        orientations = Vt.QuathArray(
+            [Gf.Quath(math.cos(angle), 0, 0, math.sin(angle)) for angle in half]
+        )
+        positions = Vt.Vec3fArray.FromNumpy(self._positions)
+        proto_indices = Vt.IntArray(len(self._ids), 0)
+
+        with Sdf.ChangeBlock():
+            self._positions_attribute.Set(positions)
+            self._orientations_attribute.Set(orientations)
+            self._proto_indices_attribute.Set(proto_indices)
+
+        self._dirty = False
+        return True
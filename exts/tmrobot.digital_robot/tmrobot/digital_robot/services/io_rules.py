@@ -0,0 +1,170 @@
+import json
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from tmrobot.digital_robot.services.tmsvr_parser import pack_bits  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+# Ctrl_DO and End_DO of a robot in one integer: Ctrl_DO[i] is bit i, End_DO[i] bit 16 + i
+CTRL_DO_SIZE = 16
+END_DO_SIZE = 4
+SIGNAL_OFFSETS = {"Ctrl_DO": (0, CTRL_DO_SIZE), "End_DO": (CTRL_DO_SIZE, END_DO_SIZE)}
+
+EDGE_RISING = "rising"
+EDGE_FALLING = "falling"
+EDGE_BOTH = "both"
+EDGES = (EDGE_RISING, EDGE_FALLING, EDGE_BOTH)
+
+_SIGNAL = re.compile(r"(Ctrl_DO|End_DO)\[(\d+)\]")
+
+
+def do_mask(sample) -> int:
+    """Ctrl_DO and End_DO of a motion sample as one bit mask, see ``SIGNAL_OFFSETS``."""
+    return pack_bits(sample.ctrl_do) | pack_bits(sample.end_do) << CTRL_DO_SIZE
+
+
+def signal_bit(signal: str) -> int:
+    """``"Ctrl_DO[3]"`` -> ``1 << 3``, ``"End_DO[0]"`` -> ``1 << 16``."""
+    match = _SIGNAL.fullmatch(signal.replace(" ", ""))
+    if match is None:
+        raise ValueError(
+            f"Unsupported signal {signal}, expected Ctrl_DO[i] or End_DO[i]"
+        )
+
+    offset, size = SIGNAL_OFFSETS[match.group(1)]
+    index = int(match.group(2))
+    if index >= size:
+        raise ValueError(f"{signal} is out of range, {match.group(1)} has {size} bits")
+    return 1 << (offset + index)
+
+
+@dataclass
+class IORule:
+    """Run ``action`` with ``params`` on an edge of ``signal``, for ``robot`` or every robot."""
+
+    signal: str
+    action: str
+    edge: str = EDGE_RISING
+    robot: Optional[str] = None
+    params: dict = field(default_factory=dict)
+
+    def __post_init__(self):
+        if self.edge not in EDGES:
+            raise ValueError(f"Unsupported edge {self.edge}, expected one of {EDGES}")
+        self.bit = signal_bit(self.signal)
+
+
+class IORuleEngine:
+    """Maps Ctrl_DO/End_DO edges of the received motion to simulation actions.
+
+    Actions are registered by name, ``action(robot_name, rising, **params)``. Each
+    ``process`` call packs the DO of the sample into one integer and compares it with
+    the previous one of the robot: the rules are only looked at when a watched bit
+    changed. The motion mailbox keeps the latest sample per step, the edges of the
+    samples it replaced come with it in ``do_rises``/``do_falls``: a pulse shorter than
+    one step fires both edges, in the order they happened. The DO are assumed off
+    before the first sample.
+
+    Rules file::
+
+        {"rules": [
+            {"robot": "Robot01", "signal": "Ctrl_DO[0]", "edge": "rising",
+             "action": "gripper_close"},
+            {"robot": "Robot01", "signal": "Ctrl_DO[0]", "edge": "falling",
+             "action": "set_di", "params": {"item": "End_DI", "index": 0, "value": 1}}
+        ]}
+    """
+
+    def __init__(self, rules: List[IORule], actions: Dict[str, Callable] = None):
+        self.rules = list(rules)
+        self.actions: Dict[str, Callable] = dict(actions or {})
+        self.fired = 0
+        self.failed = 0
+        self._previous: Dict[str, int] = {}  # [robot name] DO mask
+        # [robot name] (watched bits, rules of the robot)
+        self._compiled: Dict[str, Tuple[int, List[IORule]]] = {}
+
+    @classmethod
+    def from_json(
+        cls, path: str, actions: Dict[str, Callable] = None
+    ) -> "IORuleEngine":
+        with open(path, "r", encoding="utf-8") as f:
+            settings = json.load(f)
+
+        rules = [IORule(**rule) for rule in settings.get("rules", [])]
+        return cls(rules, actions)
+
+    def register_action(self, name: str, action: Callable) -> None:
+        self.actions[name] = action
+        self._compiled = {}
+
+    def validate(self) -> None:
+        unknown = sorted({rule.action for rule in self.rules} - set(self.actions))
+        if unknown:
+            raise ValueError(f"Unknown I/O rule actions: {', '.join(unknown)}")
+
+    def reset(self) -> None:
+        self._previous = {}
+
+    def process(self, sample) -> int:
+        """Run the actions of the edges since the previous sample, returns how many ran."""
+        robot_name = sample.robot_name
+        compiled = self._compiled.get(robot_name)
+        if compiled is None:
+            compiled = self._compile(robot_name)
+
+        watched, rules = compiled
+        if not watched:
+            return 0
+
+        mask = do_mask(sample)
+        previous = self._previous.get(robot_name, 0)
+        self._previous[robot_name] = mask
+        rises = (mask & ~previous | sample.do_rises) & watched
+        falls = (previous & ~mask | sample.do_falls) & watched
+        if not rises | falls:
+            return 0
+
+        fired = 0
+        for rule in rules:
+            for rising in self._edges(rule.bit, mask, rises, falls):
+                if rule.edge != EDGE_BOTH and rising != (rule.edge == EDGE_RISING):
+                    continue
+
+                try:
+                    self.actions[rule.action](robot_name, rising, **rule.params)
+                    fired += 1
+                except Exception as e:
+                    self.failed += 1
+                    logger.warning(
+                        f"{robot_name}: {rule.action} on {rule.signal} failed: {e}"
+                    )
+
+        self.fired += fired
+        return fired
+
+    @staticmethod
+    def _edges(bit: int, mask: int, rises: int, falls: int) -> Tuple[bool, ...]:
+        """Edges of ``bit`` in order, ``True`` for rising: the last one gives its state."""
+        if not rises & bit:
+            return (False,) if falls & bit else ()
+        if not falls & bit:
+            return (True,)
+        return (False, True) if mask & bit else (True, False)
+
+    def _compile(self, robot_name: str) -> Tuple[int, List[IORule]]:
+        rules = [
+            rule
+            for rule in self.rules
+            if (rule.robot is None or rule.robot == robot_name)
+            and rule.action in self.actions
+        ]
+        watched = 0
+        for rule in rules:
+            watched |= rule.bit
+
+        compiled = self._compiled[robot_name] = (watched, rules)
+        return compiled
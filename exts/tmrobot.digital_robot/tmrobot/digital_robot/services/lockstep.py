@@ -0,0 +1,197 @@
+import logging
+import math
+import time
+from dataclasses import dataclass
+from typing import Callable, List
+
+import numpy as np
+
+from tmrobot.digital_robot.services.motion_log import MotionLog  # type: ignore
+from tmrobot.digital_robot.services.tmsvr_parser import MotionSample  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LockstepStats:
+    samples: int = 0  # samples of the clock log stepped
+    events: int = 0  # samples of all the logs handed to on_sample
+    skipped: int = 0  # clock samples without a positive interval, e.g. duplicates
+    physics_steps: int = 0
+    renders: int = 0
+    dt_changes: int = 0  # physics dt set again because the sample interval changed
+    sim_time: float = 0.0  # seconds of the logs stepped
+    wall_time: float = 0.0
+
+    def speedup(self) -> float:
+        return self.sim_time / self.wall_time if self.wall_time > 0 else 0.0
+
+
+class _LogCursor:
+    """The samples of one log passed at the simulated time and its position there."""
+
+    def __init__(self, log: MotionLog, start: int):
+        self.log = log
+        self.times = log.timestamps
+        self.joints = log.records["joint_radian"]
+        self.next = start  # first sample later than the simulated time
+
+    def advance(self, timestamp: float, on_sample: Callable) -> int:
+        passed = 0
+        while self.next < len(self.times) and self.times[self.next] <= timestamp:
+            if on_sample is not None:
+                on_sample(self.log.sample(self.next))
+            self.next += 1
+            passed += 1
+        return passed
+
+    def position(self, timestamp: float) -> np.ndarray:
+        previous = self.next - 1
+        if previous < 0:
+            return np.array(self.joints[0], dtype=np.float64)
+        if self.next >= len(self.times):
+            return np.array(self.joints[previous], dtype=np.float64)
+
+        t1, t2 = float(self.times[previous]), float(self.times[self.next])
+        s = (timestamp - t1) / (t2 - t1)
+        p1 = self.joints[previous].astype(np.float64)
+        return p1 + (self.joints[self.next] - p1) * s
+
+
+class LockstepScheduler:
+    """Steps physics by the timestamps of motion logs instead of the wall clock.
+
+    The longest log is the clock: every one of its samples is simulated by exactly
+    ``steps_per_sample`` physics steps of ``World.step`` with a physics dt of the
+    sample interval divided by the steps, as fast as the steps run. The joint targets
+    of every robot are interpolated linearly from its own log at each step, and every
+    sample of the logs is handed to ``on_sample`` when the simulated time passes it,
+    e.g. for the I/O rules.
+
+    Setting the physics dt is slow, it is set again only when the wanted dt differs
+    by more than ``dt_tolerance`` from the current one. The wanted dt also absorbs the
+    difference left by the previous interval: the simulated time never drifts from
+    the log time by more than the tolerance of one interval. Intervals longer than
+    ``max_physics_dt`` per step, e.g. a pause of the recording, take more steps.
+
+    Only the last step of every ``render_interval`` th sample renders: it is the only
+    one running ``app.update``, so the cameras, the UI and the asyncio tasks of the
+    extension are updated at that rate too.
+    """
+
+    def __init__(
+        self,
+        world,
+        logs: List[MotionLog],
+        apply_joint_positions: Callable[[str, np.ndarray], None],
+        on_sample: Callable[[MotionSample], None] = None,
+        steps_per_sample: int = 4,
+        render_interval: int = 10,
+        start: float = 0.0,
+        dt_tolerance: float = 0.05,
+        max_physics_dt: float = 1 / 60,
+    ):
+        logs = [log for log in logs if len(log) > 0]
+        if not logs:
+            raise ValueError("Lockstep needs a motion log with samples")
+        if steps_per_sample < 1 or render_interval < 1:
+            raise ValueError("steps_per_sample and render_interval must be at least 1")
+
+        self.world = world
+        self.apply_joint_positions = apply_joint_positions
+        self.on_sample = on_sample
+        self.steps_per_sample = steps_per_sample
+        self.render_interval = render_interval
+        self.dt_tolerance = dt_tolerance
+        self.max_physics_dt = max_physics_dt
+        self.stats = LockstepStats()
+
+        self._cursors = [_LogCursor(log, log.seek(start)) for log in logs]
+        self._clock = max(self._cursors, key=lambda cursor: cursor.log.duration())
+        clock_start = min(self._clock.next, len(self._clock.times) - 1)
+        self._origin = float(self._clock.times[clock_start])
+        self._sample = self._clock.next  # next clock sample to step to
+        self._dt: float = None
+        self._initial_dt = (world.get_physics_dt(), world.get_rendering_dt())
+        self._begun = False
+
+    def is_done(self) -> bool:
+        return self._sample >= len(self._clock.times)
+
+    def step_sample(self) -> bool:
+        """Step physics to the next sample of the clock log, False after the last one."""
+        if self.is_done():
+            return False
+
+        started = time.perf_counter()
+        if not self._begun:
+            # The targets of the first sample, without stepping
+            self._begun = True
+            self._apply(self._origin)
+            self._sample += 1
+            self.stats.samples += 1
+            self.stats.wall_time += time.perf_counter() - started
+            return True
+
+        target = float(self._clock.times[self._sample]) - self._origin
+        self._sample += 1
+        remaining = target - self.stats.sim_time
+        if remaining <= 0:
+            self.stats.skipped += 1
+            self.stats.wall_time += time.perf_counter() - started
+            return True
+
+        steps = self.steps_per_sample
+        if remaining / steps > self.max_physics_dt:
+            steps = math.ceil(remaining / self.max_physics_dt)
+        self._set_dt(remaining / steps)
+
+        render = self.stats.samples % self.render_interval == 0
+        for step in range(steps):
+            self.stats.sim_time += self._dt
+            # The last step reaches the sample, whatever the rounding of the dt
+            last = step == steps - 1
+            self._apply(self._origin + (target if last else self.stats.sim_time))
+            if render and last:
+                self.world.step(render=True)
+                self.stats.renders += 1
+            else:
+                self.world.step(render=False)
+        self.stats.physics_steps += steps
+        self.stats.samples += 1
+        self.stats.wall_time += time.perf_counter() - started
+        return True
+
+    def restore(self) -> None:
+        """Set the physics and rendering dt back to the ones before lockstep."""
+        if self._dt is not None:
+            physics_dt, rendering_dt = self._initial_dt
+            self.world.set_simulation_dt(
+                physics_dt=physics_dt, rendering_dt=rendering_dt
+            )
+            self._dt = None
+
+    def summary(self) -> str:
+        stats = self.stats
+        return (
+            f"Lockstep: samples={stats.samples}, physics steps={stats.physics_steps}, "
+            f"renders={stats.renders}, dt changes={stats.dt_changes}, "
+            f"simulated {stats.sim_time:.1f} s in {stats.wall_time:.1f} s "
+            f"({stats.speedup():.1f}x)"
+        )
+
+    def _set_dt(self, dt: float) -> None:
+        if self._dt is not None and abs(dt - self._dt) <= self.dt_tolerance * self._dt:
+            return
+
+        # One physics step per rendering, the rendered steps also step physics once
+        self.world.set_simulation_dt(physics_dt=dt, rendering_dt=dt)
+        self._dt = dt
+        self.stats.dt_changes += 1
+
+    def _apply(self, timestamp: float) -> None:
+        for cursor in self._cursors:
+            self.stats.events += cursor.advance(timestamp, self.on_sample)
+            self.apply_joint_positions(
+                cursor.log.robot_name, cursor.position(timestamp)
+            )
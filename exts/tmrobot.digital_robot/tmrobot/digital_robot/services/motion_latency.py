@@ -0,0 +1,175 @@
+import json
+import time
+from typing import Dict, Iterable, List
+
+# Intervals of the motion path, each named by the stage that ends it:
+#   parse      socket recv -> sample decoded
+#   enqueue    decoded -> put in the motion mailbox
+#   dequeue    put -> taken by the physics step
+#   apply      taken -> joint targets written to the articulations, nothing else
+#   end_to_end socket recv -> joint targets written, plus the interpolation latency
+#              budget: the pose of a sample is reached that much later
+STAGES = ("parse", "enqueue", "dequeue", "apply", "end_to_end")
+PERCENTILES = (50, 95, 99)
+
+# Log-linear microsecond buckets: 16 per power of two above 32 us, ~6% resolution,
+# values above 2^27 us (~2 min) go to the last bucket
+_SUB_BITS = 5
+_SUB_BUCKETS = 1 << (_SUB_BITS - 1)
+_BUCKETS = (27 - _SUB_BITS + 2) * _SUB_BUCKETS
+
+
+def _bucket_index(microseconds: int) -> int:
+    if microseconds < (1 << _SUB_BITS):
+        return max(microseconds, 0)
+    shift = microseconds.bit_length() - _SUB_BITS
+    return min((shift << (_SUB_BITS - 1)) + (microseconds >> shift), _BUCKETS - 1)
+
+
+def _bucket_value(index: int) -> float:
+    # Middle of the bucket in microseconds
+    if index < (1 << _SUB_BITS):
+        return float(index)
+    shift = (index >> (_SUB_BITS - 1)) - 1
+    low = (index - (shift << (_SUB_BITS - 1))) << shift
+    return low + ((1 << shift) - 1) / 2
+
+
+class LatencyHistogram:
+    """Fixed bucket latency histogram, recording is an index and an increment.
+
+    There is no lock: every histogram has a single writer thread, readers get a
+    possibly slightly stale view, which is fine for percentiles.
+    """
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * _BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.counts[_bucket_index(int(seconds * 1e6))] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, percent: float) -> float:
+        """Latency in seconds below which ``percent`` of the samples are."""
+        counts = list(self.counts)
+        count = sum(counts)
+        if count == 0:
+            return 0.0
+
+        rank = max(1, int(round(count * percent / 100.0)))
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            seen += bucket_count
+            if seen >= rank:
+                return _bucket_value(index) / 1e6
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        """Count, mean, max and the ``PERCENTILES`` in milliseconds."""
+        count = self.count
+        summary = {
+            "count": count,
+            "mean_ms": self.total / count * 1000 if count else 0.0,
+            "max_ms": self.max * 1000,
+        }
+        for percent in PERCENTILES:
+            summary[f"p{percent}_ms"] = self.percentile(percent) * 1000
+        return summary
+
+
+class MotionLatency:
+    """Per robot and per stage latency histograms of the received motion, see ``STAGES``.
+
+    The Ethernet masters record ``parse`` and ``enqueue`` on their I/O thread, the
+    physics step records the other stages. ``latency_budget`` is the delay the
+    trajectory interpolation adds on purpose, 0 without interpolation.
+    """
+
+    def __init__(self, robot_names: Iterable[str] = (), latency_budget: float = 0.0):
+        self.histograms: Dict[str, Dict[str, LatencyHistogram]] = {}  # [robot][stage]
+        self.latency_budget = latency_budget
+        self.started = time.time()
+        for robot_name in robot_names:
+            self.register(robot_name)
+
+    def register(self, robot_name: str) -> Dict[str, LatencyHistogram]:
+        histograms = self.histograms.get(robot_name)
+        if histograms is None:
+            histograms = {stage: LatencyHistogram() for stage in STAGES}
+            histograms = self.histograms.setdefault(robot_name, histograms)
+        return histograms
+
+    def record(self, robot_name: str, stage: str, seconds: float) -> None:
+        histograms = self.histograms.get(robot_name) or self.register(robot_name)
+        histograms[stage].record(seconds)
+
+    def record_received(self, sample, parsed: float, queued: float) -> None:
+        histograms = self.histograms.get(sample.robot_name) or self.register(
+            sample.robot_name
+        )
+        histograms["parse"].record(parsed - sample.timestamp)
+        histograms["enqueue"].record(queued - parsed)
+
+    def record_applied(self, samples: List, dequeued: float, applied: float) -> None:
+        for sample in samples:
+            histograms = self.histograms.get(sample.robot_name) or self.register(
+                sample.robot_name
+            )
+            if sample.queued > 0:
+                histograms["dequeue"].record(dequeued - sample.queued)
+            histograms["apply"].record(applied - dequeued)
+            histograms["end_to_end"].record(
+                applied - sample.timestamp + self.latency_budget
+            )
+
+    def reset(self, robot_names: Iterable[str] = None) -> None:
+        """Start over, for ``robot_names`` or the robots recorded so far."""
+        robot_names = list(self.histograms if robot_names is None else robot_names)
+        self.histograms = {
+            robot_name: {stage: LatencyHistogram() for stage in STAGES}
+            for robot_name in robot_names
+        }
+        self.started = time.time()
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        return {
+            robot_name: {
+                stage: histogram.summary() for stage, histogram in histograms.items()
+            }
+            for robot_name, histograms in list(self.histograms.items())
+        }
+
+    def summary(self, stage: str = "end_to_end") -> str:
+        lines = []
+        for robot_name, stages in self.snapshot().items():
+            summary = stages[stage]
+            if summary["count"] == 0:
+                continue
+            lines.append(
+                f"{robot_name} {stage} latency: "
+                + ", ".join(f"p{p}={summary[f'p{p}_ms']:.1f}ms" for p in PERCENTILES)
+                + f", max={summary['max_ms']:.1f}ms ({summary['count']} samples)"
+            )
+        return "\n".join(lines)
+
+    def dump_json(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "started": self.started,
+                    "dumped": time.time(),
+                    "stages": list(STAGES),
+                    "latency_budget": self.latency_budget,
+                    "robots": self.snapshot(),
+                },
+                f,
+                indent=2,
+            )
@@ -0,0 +1,250 @@
+import heapq
+import logging
+import os
+import struct
+import threading
+import time
+from typing import Iterator, List, Optional
+
+import numpy as np
+from tmrobot.digital_robot.services.tmsvr_parser import MotionSample  # type: ignore
+from tmrobot.digital_robot.services.tmsvr_parser import pack_bits  # type: ignore
+from tmrobot.digital_robot.services.tmsvr_parser import unpack_bits  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+# Header: magic, version, record size, joint count, wall clock of the first sample, robot name
+MOTION_LOG_MAGIC = b"TMMOTLOG"
+MOTION_LOG_VERSION = 1
+MOTION_LOG_EXTENSION = ".tmlog"
+HEADER = struct.Struct("<8sHHHxxd32s")
+HEADER_SIZE = 64
+NUM_JOINTS = 6
+
+# One fixed size record per sample, digital I/O are bit masks (bit i = index i)
+RECORD_DTYPE = np.dtype(
+    [
+        ("timestamp", "<f8"),
+        ("joint_radian", "<f8", (NUM_JOINTS,)),
+        ("ctrl_di", "<u2"),
+        ("ctrl_do", "<u2"),
+        ("end_di", "u1"),
+        ("end_do", "u1"),
+        ("reserved", "V2"),
+    ]
+)
+RECORD = struct.Struct(f"<d{NUM_JOINTS}dHHBB2x")
+
+
+class MotionRecorder:
+    """Append-only binary log of the motion samples of one robot.
+
+    Records are ``RECORD_DTYPE``, 64 bytes each after a 64 bytes header, so a log can be
+    memory mapped and indexed without parsing, see ``MotionLog``.
+    """
+
+    def __init__(self, path: str, robot_name: str, buffering: int = 1 << 16):
+        self.path = path
+        self.robot_name = robot_name
+        self.count = 0
+        self._lock = threading.Lock()
+        self._file = open(path, "wb", buffering=buffering)
+        self._file.write(self._header(time.time()))
+
+    def write(self, sample: MotionSample) -> None:
+        if len(sample.joint_radian) != NUM_JOINTS:
+            return
+
+        record = RECORD.pack(
+            sample.timestamp,
+            *sample.joint_radian,
+            pack_bits(sample.ctrl_di),
+            pack_bits(sample.ctrl_do),
+            pack_bits(sample.end_di),
+            pack_bits(sample.end_do),
+        )
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(record)
+            self.count += 1
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _header(self, wall_time: float) -> bytes:
+        header = HEADER.pack(
+            MOTION_LOG_MAGIC,
+            MOTION_LOG_VERSION,
+            RECORD_DTYPE.itemsize,
+            NUM_JOINTS,
+            wall_time,
+            self.robot_name.encode("utf-8")[:32],
+        )
+        return header.ljust(HEADER_SIZE, b"\0")
+
+
+class MotionLog:
+    """Read-only memory map of a motion log, ``records`` is a numpy structured array."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            header = f.read(HEADER_SIZE)
+
+        if len(header) < HEADER_SIZE:
+            raise ValueError(f"{path} is not a motion log")
+
+        magic, version, record_size, num_joints, wall_time, name = HEADER.unpack_from(
+            header
+        )
+        if magic != MOTION_LOG_MAGIC or record_size != RECORD_DTYPE.itemsize:
+            raise ValueError(f"{path} is not a version {MOTION_LOG_VERSION} motion log")
+
+        self.version = version
+        self.start_wall_time = wall_time
+        self.robot_name = name.rstrip(b"\0").decode("utf-8")
+
+        # A log still being written may end with a partial record
+        count = (os.path.getsize(path) - HEADER_SIZE) // record_size
+        self.records = (
+            np.memmap(path, RECORD_DTYPE, "r", offset=HEADER_SIZE, shape=(count,))
+            if count > 0
+            else np.zeros(0, RECORD_DTYPE)
+        )
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self.records["timestamp"]
+
+    def duration(self) -> float:
+        return float(self.timestamps[-1] - self.timestamps[0]) if len(self) else 0.0
+
+    def seek(self, seconds: float) -> int:
+        """Index of the first record at least ``seconds`` after the start of the log."""
+        if len(self) == 0:
+            return 0
+        return int(np.searchsorted(self.timestamps, self.timestamps[0] + seconds))
+
+    def sample(self, index: int, timestamp: float = None) -> MotionSample:
+        record = self.records[index]
+        sample = MotionSample(
+            self.robot_name,
+            float(record["timestamp"]) if timestamp is None else timestamp,
+        )
+        sample.joint_radian = record["joint_radian"].tolist()
+        sample.ctrl_di = unpack_bits(int(record["ctrl_di"]), 16)
+        sample.ctrl_do = unpack_bits(int(record["ctrl_do"]), 16)
+        sample.end_di = unpack_bits(int(record["end_di"]), 4)
+        sample.end_do = unpack_bits(int(record["end_do"]), 4)
+        return sample
+
+
+class MotionReplayer:
+    """Feeds the samples of motion logs to a motion queue, without any TMflow.
+
+    ``speed`` 1.0 keeps the recorded timing, 2.0 plays twice as fast, ``None`` or 0
+    replays as fast as possible. The samples of several robots are merged by time.
+    Replayed samples are stamped with ``time.perf_counter()`` when they are put.
+
+    Logs without samples are left out, there must be one with samples. A looping
+    replay stops after a pass replaying nothing, e.g. ``start`` beyond every log.
+    """
+
+    def __init__(
+        self,
+        logs: List[MotionLog],
+        motion_queue,
+        speed: Optional[float] = 1.0,
+        start: float = 0.0,
+        loop: bool = False,
+    ):
+        logs = [log for log in logs if len(log) > 0]
+        if not logs:
+            raise ValueError("Replay needs a motion log with samples")
+
+        self.logs = logs
+        self.motion_queue = motion_queue
+        self.speed = speed
+        self.start_offset = start
+        self.loop = loop
+        self.running = False
+        self.replayed = 0
+        self._thread: threading.Thread = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+
+        self.running = True
+        self._thread = threading.Thread(
+            target=self.run, name="MotionReplayer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 1.0) -> None:
+        self.running = False
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def run(self) -> None:
+        self.running = True
+        while self.running:
+            replayed = self._replay_once()
+            if not self.loop or not self.running:
+                break
+            if replayed == 0:
+                logger.warning(f"No sample after {self.start_offset} s to replay")
+                break
+        self.running = False
+
+    def _replay_once(self) -> int:
+        """Replay the logs once, returns the number of samples put."""
+        real_start = None
+        log_start = None
+        replayed = 0
+
+        for log_time, log, index in self._merged():
+            if not self.running:
+                break
+
+            if real_start is None:
+                real_start, log_start = time.perf_counter(), log_time
+
+            if self.speed:
+                delay = (log_time - log_start) / self.speed - (
+                    time.perf_counter() - real_start
+                )
+                if delay > 0:
+                    time.sleep(delay)
+
+            sample = log.sample(index, time.perf_counter())
+            sample.queued = sample.timestamp
+            self.motion_queue.put(sample)
+            self.replayed += 1
+            replayed += 1
+
+        return replayed
+
+    def _merged(self) -> Iterator:
+        def records(log: MotionLog):
+            timestamps = log.timestamps
+            for index in range(log.seek(self.start_offset), len(log)):
+                yield float(timestamps[index]), id(log), index, log
+
+        for log_time, _, index, log in heapq.merge(
+            *(records(log) for log in self.logs)
+        ):
+            yield log_time, log, index
@@ -0,0 +1,110 @@
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable
+
+from tmrobot.digital_robot.services.io_rules import do_mask  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class MailboxStats:
+    received: int = 0
+    consumed: int = 0
+    overwritten: int = 0
+    dropped: int = 0
+
+
+class MotionMailbox:
+    """Latest joint state per robot, shared by the ethernet master threads and the physics step.
+
+    Producers call ``put`` like on a ``queue.Queue`` but never block: a newer sample
+    replaces the unconsumed one of the same robot, so a fast sender can't starve the
+    other robots and stale frames never pile up behind fresh ones.
+
+    The Ctrl_DO/End_DO edges of an overwritten sample aren't lost: the rising and
+    falling DO bits since the last consumed sample are ORed into ``do_rises`` and
+    ``do_falls`` of the sample kept, so a pulse shorter than one step still shows.
+    """
+
+    def __init__(self, robot_names: Iterable[str] = ()):
+        self._lock = threading.Lock()
+        self._slots: Dict[str, Any] = {}
+        self._do_masks: Dict[str, int] = {}  # [robot name] DO of the last sample put
+        self._stats: Dict[str, MailboxStats] = {}
+        self._closed = False
+
+        for robot_name in robot_names:
+            self.register(robot_name)
+
+    def register(self, robot_name: str) -> None:
+        with self._lock:
+            self._slots.setdefault(robot_name, None)
+            self._do_masks.setdefault(robot_name, 0)
+            self._stats.setdefault(robot_name, MailboxStats())
+
+    # The signature matches queue.Queue.put, which is what EthernetMaster.receive_data calls
+    def put(self, item, block: bool = True, timeout: float = None) -> None:
+        robot_name = item.robot_name
+
+        with self._lock:
+            stats = self._stats.get(robot_name)
+            if stats is None:
+                stats = self._stats[robot_name] = MailboxStats()
+
+            stats.received += 1
+
+            if self._closed or robot_name not in self._slots:
+                stats.dropped += 1
+                return
+
+            mask = do_mask(item)
+            last = self._do_masks[robot_name]
+            self._do_masks[robot_name] = mask
+            item.do_rises = mask & ~last
+            item.do_falls = last & ~mask
+
+            pending = self._slots[robot_name]
+            if pending is not None:
+                stats.overwritten += 1
+                item.do_rises |= pending.do_rises
+                item.do_falls |= pending.do_falls
+
+            self._slots[robot_name] = item
+
+    def put_nowait(self, item) -> None:
+        self.put(item, block=False)
+
+    def drain(self) -> Dict[str, Any]:
+        """Take the latest unconsumed sample of every robot, at most one per robot."""
+        samples = {}
+
+        with self._lock:
+            for robot_name, item in self._slots.items():
+                if item is None:
+                    continue
+
+                samples[robot_name] = item
+                self._slots[robot_name] = None
+                self._stats[robot_name].consumed += 1
+
+        return samples
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            for robot_name, item in self._slots.items():
+                if item is not None:
+                    self._stats[robot_name].dropped += 1
+                self._slots[robot_name] = None
+
+    def is_closed(self) -> bool:
+        return self._closed
+
+    def get_stats(self) -> Dict[str, MailboxStats]:
+        with self._lock:
+            return {
+                robot_name: MailboxStats(**vars(stats))
+                for robot_name, stats in self._stats.items()
+            }
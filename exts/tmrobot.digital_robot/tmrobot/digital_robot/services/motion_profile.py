@@ -0,0 +1,252 @@
+import logging
+import math
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+from pxr import Gf, Sdf, Usd
+
+logger = logging.getLogger(__name__)
+
+PROFILE_TRAPEZOID = "trapezoid"  # constant acceleration ramps
+PROFILE_SCURVE = "scurve"  # smoothstep velocity ramps, the acceleration is continuous
+PROFILES = (PROFILE_TRAPEZOID, PROFILE_SCURVE)
+
+# Ramp time of a profile reaching velocity v within the acceleration limit a is
+# factor * v / a, the peak acceleration of the smoothstep ramp is 1.5 v / t
+_RAMP_FACTORS = {PROFILE_TRAPEZOID: 1.0, PROFILE_SCURVE: 1.5}
+
+
+def profile_timing(
+    length: float, max_velocity: float, max_acceleration: float, profile: str
+) -> Tuple[float, float, float]:
+    """Cruise velocity, ramp time and cruise time of a ``length`` meters move.
+
+    A move too short to reach ``max_velocity`` cruises at the velocity reached at the
+    end of the acceleration ramp, for 0 seconds.
+    """
+    if max_velocity <= 0 or max_acceleration <= 0:
+        raise ValueError("max_velocity and max_acceleration must be positive")
+    if profile not in _RAMP_FACTORS:
+        raise ValueError(f"Unsupported profile {profile}, expected one of {PROFILES}")
+    if length <= 0:
+        return 0.0, 0.0, 0.0
+
+    # Each ramp covers velocity * ramp / 2, the cruise velocity * cruise
+    factor = _RAMP_FACTORS[profile]
+    velocity = min(max_velocity, math.sqrt(length * max_acceleration / factor))
+    ramp = factor * velocity / max_acceleration
+    cruise = max(length / velocity - ramp, 0.0)
+    return velocity, ramp, cruise
+
+
+def profile_distance(
+    elapsed: np.ndarray,
+    velocity: np.ndarray,
+    ramp: np.ndarray,
+    cruise: np.ndarray,
+    scurve: np.ndarray,
+) -> np.ndarray:
+    """Distance covered after ``elapsed`` seconds, for many profiles at once."""
+
+    def ramp_distance(phase):
+        # Per velocity * ramp, 1/2 at the end of the ramp for both profiles
+        return np.where(scurve, phase**3 - phase**4 / 2, phase**2 / 2)
+
+    ramp = np.maximum(ramp, 1e-9)
+    duration = 2 * ramp + cruise
+    elapsed = np.minimum(elapsed, duration)
+    accelerated = np.clip(elapsed / ramp, 0.0, 1.0)
+    remaining = np.clip((duration - elapsed) / ramp, 0.0, 1.0)
+    return velocity * (
+        ramp * (ramp_distance(accelerated) + 0.5 - ramp_distance(remaining))
+        + np.clip(elapsed - ramp, 0.0, cruise)
+    )
+
+
+@dataclass
+class MotionProfileStats:
+    started: int = 0
+    arrived: int = 0
+    cancelled: int = 0  # replaced by another move or cancelled
+    lost: int = 0  # the prim was removed before arriving
+    steps: int = 0
+
+
+class MotionProfiles:
+    """Kinematic straight line moves of accessories, e.g. parts on a conveyor.
+
+    Each move follows a trapezoidal or S-curve velocity profile from the translation of
+    the prim to its target, limited by its own velocity and acceleration. ``step``
+    advances every move at once with numpy and writes all the ``xformOp:translate``
+    values in one ``Sdf.ChangeBlock`` through cached attribute handles, nothing goes to
+    the undo stack. The prims which arrived are returned by ``step``, and passed to the
+    ``on_arrived`` callback of their move.
+    """
+
+    def __init__(self, stage: Usd.Stage):
+        self.stage = stage
+        self.stats = MotionProfileStats()
+        self._paths: List[str] = []
+        self._attributes: List[Usd.Attribute] = []
+        self._types: List[type] = []  # Gf.Vec3d or Gf.Vec3f, as authored
+        self._callbacks: List[Callable] = []
+        self._start = np.zeros((0, 3))
+        self._direction = np.zeros((0, 3))
+        self._velocity = np.zeros(0)
+        self._ramp = np.zeros(0)
+        self._cruise = np.zeros(0)
+        self._scurve = np.zeros(0, dtype=bool)
+        self._elapsed = np.zeros(0)
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def is_moving(self, prim_path: str) -> bool:
+        return prim_path in self._paths
+
+    def move(
+        self,
+        prim_path: str,
+        target: Sequence[float],
+        max_velocity: float = 0.1,
+        max_acceleration: float = 0.5,
+        profile: str = PROFILE_TRAPEZOID,
+        on_arrived: Callable[[str], None] = None,
+    ) -> float:
+        """Move a prim to ``target`` from where it is, returns the duration in seconds.
+
+        A prim already moving starts over from its current translation, at rest.
+        """
+        attribute = self.stage.GetAttributeAtPath(
+            Sdf.Path(prim_path).AppendProperty("xformOp:translate")
+        )
+        if not attribute:
+            raise ValueError(f"{prim_path} has no xformOp:translate")
+
+        current = attribute.Get()
+        if current is None:
+            # Author it outside of the change block of the steps
+            current = Gf.Vec3d(0, 0, 0)
+            attribute.Set(current)
+
+        start = np.array(current, dtype=np.float64)
+        offset = np.array(target, dtype=np.float64) - start
+        length = float(np.linalg.norm(offset))
+        velocity, ramp, cruise = profile_timing(
+            length, max_velocity, max_acceleration, profile
+        )
+
+        self.cancel(prim_path)
+        self._paths.append(prim_path)
+        self._attributes.append(attribute)
+        self._types.append(type(current))
+        self._callbacks.append(on_arrived)
+        self._start = np.vstack((self._start, start))
+        self._direction = np.vstack(
+            (self._direction, offset / length if length > 0 else offset)
+        )
+        self._velocity = np.append(self._velocity, velocity)
+        self._ramp = np.append(self._ramp, ramp)
+        self._cruise = np.append(self._cruise, cruise)
+        self._scurve = np.append(self._scurve, profile == PROFILE_SCURVE)
+        self._elapsed = np.append(self._elapsed, 0.0)
+        self.stats.started += 1
+        return 2 * ramp + cruise
+
+    def cancel(self, prim_path: str) -> bool:
+        """Stop a move where it is, without calling its ``on_arrived``."""
+        if prim_path not in self._paths:
+            return False
+
+        keep = np.ones(len(self._paths), dtype=bool)
+        keep[self._paths.index(prim_path)] = False
+        self._keep(keep)
+        self.stats.cancelled += 1
+        return True
+
+    def clear(self) -> None:
+        self.stats.cancelled += len(self._paths)
+        self._keep(np.zeros(len(self._paths), dtype=bool))
+
+    def step(self, dt: float) -> List[str]:
+        """Advance every move by ``dt`` seconds, returns the prims which arrived."""
+        if not self._paths:
+            return []
+
+        self.stats.steps += 1
+        self._elapsed += dt
+        distance = profile_distance(
+            self._elapsed, self._velocity, self._ramp, self._cruise, self._scurve
+        )
+        positions = (self._start + self._direction * distance[:, None]).tolist()
+
+        try:
+            with Sdf.ChangeBlock():
+                for attribute, value_type, position in zip(
+                    self._attributes, self._types, positions
+                ):
+                    attribute.Set(value_type(*position))
+        except Exception as e:
+            self._drop_lost(e)
+            return []
+
+        arrived = self._elapsed >= 2 * self._ramp + self._cruise
+        if not arrived.any():
+            return []
+
+        moves = [
+            (path, callback)
+            for path, callback, done in zip(self._paths, self._callbacks, arrived)
+            if done
+        ]
+        self._keep(~arrived)
+        self.stats.arrived += len(moves)
+
+        # After removing the moves, a callback may start another one
+        for path, callback in moves:
+            if callback is None:
+                continue
+            try:
+                callback(path)
+            except Exception as e:
+                logger.warning(f"{path}: arrival callback failed: {e}")
+
+        return [path for path, _ in moves]
+
+    def get_positions(self) -> Dict[str, Tuple[float, float, float]]:
+        """Current translation of every moving prim."""
+        distance = profile_distance(
+            self._elapsed, self._velocity, self._ramp, self._cruise, self._scurve
+        )
+        positions = self._start + self._direction * distance[:, None]
+        return dict(zip(self._paths, map(tuple, positions.tolist())))
+
+    def _drop_lost(self, error: Exception) -> None:
+        keep = np.array([bool(attribute) for attribute in self._attributes])
+        lost = [path for path, valid in zip(self._paths, keep) if not valid]
+        if not lost:
+            # Not a removed prim, don't retry every step
+            logger.warning(f"Failed to move {len(self._paths)} prims: {error}")
+            self.clear()
+            return
+
+        logger.warning(f"Stop moving the removed prims {', '.join(lost)}")
+        self._keep(keep)
+        self.stats.lost += len(lost)
+
+    def _keep(self, keep: np.ndarray) -> None:
+        def select(items: list) -> list:
+            return [item for item, kept in zip(items, keep) if kept]
+
+        self._paths = select(self._paths)
+        self._attributes = select(self._attributes)
+        self._types = select(self._types)
+        self._callbacks = select(self._callbacks)
+        self._start = self._start[keep]
+        self._direction = self._direction[keep]
+        self._velocity = self._velocity[keep]
+        self._ramp = self._ramp[keep]
+        self._cruise = self._cruise[keep]
+        self._scurve = self._scurve[keep]
+        self._elapsed = self._elapsed[keep]
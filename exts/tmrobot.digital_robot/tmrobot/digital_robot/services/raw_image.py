@@ -0,0 +1,75 @@
+from typing import Tuple
+
+import numpy as np
+
+RAW_IMAGE_TYPE = "RAW"
+PIXEL_FORMATS = ("RGB", "MONO")
+
+# ITU-R BT.601 luma in 8 bit fixed point, the weights add up to 256
+_MONO_WEIGHTS = np.array([77, 150, 29], dtype=np.uint16)
+
+
+class RawImagePacker:
+    """Packs annotator RGBA/RGB frames as raw RGB or MONO bytes into a reused buffer.
+
+    RGB drops the alpha channel while copying, MONO is the BT.601 luma computed in
+    preallocated ``uint16`` scratch arrays. The buffer is reallocated only when the
+    resolution changes, the returned array is a view on it and is valid until the next
+    ``pack``.
+
+    ``pack_bytes`` packs the RGB ``bytes`` of ``DigitalCamera.get_rgb`` into the ``bytes``
+    a protobuf field needs, it doesn't take a memoryview. They are already packed RGB
+    and are returned as they are, MONO is packed from a view on them.
+    """
+
+    def __init__(self, pixel_format: str = "RGB"):
+        pixel_format = pixel_format.upper()
+        if pixel_format not in PIXEL_FORMATS:
+            raise ValueError(f"Unsupported raw pixel format {pixel_format}")
+
+        self.pixel_format = pixel_format
+        self._buffer: np.ndarray = None
+        self._scratch: tuple = None
+
+    def pack(self, frame: np.ndarray) -> np.ndarray:
+        height, width = frame.shape[:2]
+
+        # One pass per channel is much faster than one strided (h, w, 4) -> (h, w, 3) copy
+        if self.pixel_format == "RGB":
+            out = self._reserve((height, width, 3))
+            for channel in range(3):
+                out[..., channel] = frame[..., channel]
+            return out
+
+        out = self._reserve((height, width))
+        luma, term = self._scratch_for(out.shape)
+        np.multiply(frame[..., 0], _MONO_WEIGHTS[0], out=luma, casting="unsafe")
+        for channel in (1, 2):
+            np.multiply(
+                frame[..., channel], _MONO_WEIGHTS[channel], out=term, casting="unsafe"
+            )
+            np.add(luma, term, out=luma)
+        np.right_shift(luma, 8, out=out, casting="unsafe")
+        return out
+
+    def pack_bytes(self, rgb: bytes, size: Tuple[int, int]) -> bytes:
+        """Pack RGB bytes of ``size`` (width, height)."""
+        if self.pixel_format == "RGB":
+            return rgb
+
+        width, height = size
+        frame = np.frombuffer(rgb, dtype=np.uint8).reshape(height, width, 3)
+        return self.pack(frame).tobytes()
+
+    def _scratch_for(self, shape) -> tuple:
+        if self._scratch is None or self._scratch[0].shape != shape:
+            self._scratch = (
+                np.empty(shape, dtype=np.uint16),
+                np.empty(shape, dtype=np.uint16),
+            )
+        return self._scratch
+
+    def _reserve(self, shape) -> np.ndarray:
+        if self._buffer is None or self._buffer.shape != shape:
+            self._buffer = np.empty(shape, dtype=np.uint8)
+        return self._buffer
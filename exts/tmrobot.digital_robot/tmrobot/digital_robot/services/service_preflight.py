@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import List
+
+from tmrobot.digital_robot.services.grpc_channel_pool import channel_pool  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PreflightResult:
+    robot_name: str
+    ip: str
+    virtual_camera: bool = False
+    ethernet: bool = False
+    timed_out: bool = False
+    elapsed: float = 0.0  # seconds
+    errors: List[str] = field(default_factory=list)
+
+
+@dataclass
+class PreflightReport:
+    results: List[PreflightResult]
+    elapsed: float = 0.0  # seconds
+
+    def ethernet_ok(self) -> bool:
+        return all(result.ethernet for result in self.results)
+
+    def summary(self) -> str:
+        lines = [
+            f"Service preflight of {len(self.results)} robots in {self.elapsed:.2f}s"
+        ]
+        for result in self.results:
+            lines.append(
+                f"  {result.robot_name}({result.ip}): "
+                f"Ethernet={'on' if result.ethernet else 'off'}, "
+                f"Virtual Camera API={'on' if result.virtual_camera else 'off'}"
+                f"{', timed out' if result.timed_out else ''} "
+                f"in {result.elapsed:.2f}s"
+            )
+        return "\n".join(lines)
+
+
+class ServicePreflight:
+    """Reachability checks of the TMSimulator/TMflow services of all robots at once.
+
+    The Ethernet Slave port is probed with a non-blocking connect on the running event
+    loop, ``EchoClient.connectVirtualCameraAPI`` blocks and runs on a worker thread per
+    robot. Checks still running at ``deadline`` are reported as failed and timed out.
+    """
+
+    def __init__(
+        self,
+        robot_settings,
+        ethernet_port: int,
+        deadline: float = 3.0,
+        connect_timeout: float = 1.0,
+    ):
+        self.robot_settings = list(robot_settings)
+        self.ethernet_port = ethernet_port
+        self.deadline = deadline
+        self.connect_timeout = connect_timeout
+
+    async def run_async(self) -> PreflightReport:
+        start = time.perf_counter()
+        results = [
+            PreflightResult(setting.name, setting.ip) for setting in self.robot_settings
+        ]
+        if not results:
+            return PreflightReport(results)
+
+        executor = ThreadPoolExecutor(
+            max_workers=len(results), thread_name_prefix="ServicePreflight"
+        )
+        tasks = [
+            asyncio.ensure_future(self._check_robot(result, executor, start))
+            for result in results
+        ]
+
+        try:
+            _, pending = await asyncio.wait(tasks, timeout=self.deadline)
+            for task in pending:
+                task.cancel()
+        finally:
+            # A gRPC check past the deadline finishes in the background, its result is dropped
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        for result, task in zip(results, tasks):
+            if task in pending:
+                result.timed_out = True
+                result.elapsed = time.perf_counter() - start
+
+        return PreflightReport(results, time.perf_counter() - start)
+
+    async def _check_robot(
+        self, result: PreflightResult, executor: ThreadPoolExecutor, start: float
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        virtual_camera = loop.run_in_executor(
+            executor, self._check_virtual_camera, result
+        )
+        result.ethernet = await self._check_port(result, result.ip, self.ethernet_port)
+        result.virtual_camera = await virtual_camera
+        result.elapsed = time.perf_counter() - start
+
+    def _check_virtual_camera(self, result: PreflightResult) -> bool:
+        try:
+            client = channel_pool.get_client(result.ip)
+            return bool(client.connectVirtualCameraAPI())
+        except Exception as e:
+            result.errors.append(f"Virtual Camera API: {e}")
+            return False
+
+    async def _check_port(self, result: PreflightResult, ip: str, port: int) -> bool:
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(ip, port), self.connect_timeout
+            )
+        except (OSError, asyncio.TimeoutError) as e:
+            result.errors.append(f"{ip}:{port} is not available. exception: {e!r}")
+            return False
+
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return True
@@ -0,0 +1,90 @@
+import math
+from typing import Dict, Hashable, Iterator, List, Sequence, Set, Tuple
+
+Cell = Tuple[int, ...]
+
+
+class SpatialHash:
+    """Uniform grid index of points, e.g. occupied workpiece positions.
+
+    The points are bucketed by ``cell_size`` cells, a query within ``radius`` only looks
+    at the cells the radius overlaps: O(1) when the radius isn't larger than a cell,
+    however many points there are. Works for 2D (a table top) and 3D (a bin) points.
+    """
+
+    def __init__(self, cell_size: float):
+        if cell_size <= 0:
+            raise ValueError("cell_size must be positive")
+
+        self.cell_size = cell_size
+        self._cells: Dict[Cell, Set[Hashable]] = {}
+        self._points: Dict[Hashable, Tuple[Tuple[float, ...], Cell]] = {}  # [key]
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._points
+
+    def insert(self, key: Hashable, position: Sequence[float]) -> None:
+        """Add or move ``key`` to ``position``."""
+        position = tuple(float(coord) for coord in position)
+        cell = self._cell(position)
+        previous = self._points.get(key)
+        if previous is not None and previous[1] != cell:
+            self._discard(key, previous[1])
+
+        self._points[key] = (position, cell)
+        self._cells.setdefault(cell, set()).add(key)
+
+    def remove(self, key: Hashable) -> bool:
+        previous = self._points.pop(key, None)
+        if previous is None:
+            return False
+        self._discard(key, previous[1])
+        return True
+
+    def clear(self) -> None:
+        self._cells = {}
+        self._points = {}
+
+    def position(self, key: Hashable) -> Tuple[float, ...]:
+        return self._points[key][0]
+
+    def query(self, position: Sequence[float], radius: float) -> List[Hashable]:
+        """Keys within ``radius`` of ``position``, nearest first."""
+        position = tuple(float(coord) for coord in position)
+        found = []
+        for key in self._candidates(position, radius):
+            distance = math.dist(position, self._points[key][0])
+            if distance <= radius:
+                found.append((distance, key))
+        found.sort(key=lambda item: item[0])
+        return [key for _, key in found]
+
+    def is_free(self, position: Sequence[float], radius: float) -> bool:
+        position = tuple(float(coord) for coord in position)
+        for key in self._candidates(position, radius):
+            if math.dist(position, self._points[key][0]) <= radius:
+                return False
+        return True
+
+    def _candidates(self, position: Tuple[float, ...], radius: float) -> Iterator:
+        low = self._cell(tuple(coord - radius for coord in position))
+        high = self._cell(tuple(coord + radius for coord in position))
+        cells = [()]
+        for start, stop in zip(low, high):
+            cells = [cell + (i,) for cell in cells for i in range(start, stop + 1)]
+
+        for cell in cells:
+            yield from self._cells.get(cell, ())
+
+    def _cell(self, position: Tuple[float, ...]) -> Cell:
+        return tuple(math.floor(coord / self.cell_size) for coord in position)
+
+    def _discard(self, key: Hashable, cell: Cell) -> None:
+        keys = self._cells.get(cell)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._cells[cell]
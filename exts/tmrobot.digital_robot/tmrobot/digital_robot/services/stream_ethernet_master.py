@@ -0,0 +1,193 @@
+import base64
+import logging
+import socket
+import time
+import uuid
+from datetime import datetime, timezone
+
+from tmrobot.digital_robot.services.tmsvr_parser import MODE_STRING  # type: ignore
+from tmrobot.digital_robot.services.tmsvr_parser import TMSVRFrameParser  # type: ignore
+from tmrobot.digital_robot.services.tmsvr_parser import build_packet  # type: ignore
+from tmrobot.digital_robot.services.transmit_table import TransmitTable  # type: ignore
+from tmrobot.digital_robot.ui import constants as const  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+ROBOT_MODEL_ID = "S0"
+
+
+class StreamEthernetMaster:
+    """Ethernet Slave client with the EthernetMaster surface, parsing frames in place.
+
+    ``receive_data`` receives into a reusable buffer and decodes Joint_Angle, Ctrl_DI/DO
+    and End_DI/DO straight from the bytes, without decoding or splitting the packet.
+    STRING and BINARY transmit tables are supported, BINARY frames are unpacked with
+    the struct precompiled from ``transmit_table``. Samples are also written to
+    ``recorder`` when it is set, see ``motion_log.MotionRecorder``, and their parse and
+    enqueue latencies to ``latency``, see ``motion_latency.MotionLatency``.
+    """
+
+    def __init__(
+        self,
+        robot_name: str,
+        tmflow_ip: str,
+        port: int = const.PORT_ETHERNET,
+        timeout: float = 3.0,
+        transmit_table: TransmitTable = None,
+        recorder=None,
+        latency=None,
+    ):
+        self.robot_name = robot_name
+        self.tmflow_ip = tmflow_ip
+        self.port = port
+        self.timeout = timeout
+        self.running = False
+        self.receive_count = 0
+        self.receive_start_time = 0.0
+        self.current_fps = 0.0
+        self.parser = TMSVRFrameParser()
+        self.transmit_table = transmit_table or TransmitTable.default()
+        self._decoders = {}
+        self.recorder = recorder
+        self.latency = latency
+        self.client: socket.socket = None
+        self.start()
+
+    def start(self) -> None:
+        if self.client is not None:
+            return
+
+        self.client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.client.settimeout(self.timeout)
+        self.client.connect((self.tmflow_ip, self.port))
+        self.parser.reset()
+
+        # Pick the frame decoder from the transmit table
+        self._decoders = self.transmit_table.decoders()
+        self._console(
+            f"Connected to {self.tmflow_ip}:{self.port} ({self.transmit_table.comm_mode})"
+        )
+
+    def stop(self) -> None:
+        self.running = False
+
+        if self.recorder is not None:
+            self.recorder.close()
+
+        if self.client is None:
+            return
+
+        try:
+            self.client.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+        self.client.close()
+        self.client = None
+
+    def get_robot_model(self) -> str:
+        try:
+            self.client.sendall(build_packet(ROBOT_MODEL_ID, 12, "Robot_Model"))
+
+            deadline = time.monotonic() + self.timeout
+            while time.monotonic() < deadline:
+                if self.parser.recv_into(self.client) == 0:
+                    break
+
+                frame = self.parser.next_frame()
+                while frame is not None:
+                    if frame.id_equals(ROBOT_MODEL_ID.encode()):
+                        return self._parse_robot_model(frame)
+                    frame = self.parser.next_frame()
+
+        except Exception as e:
+            logger.error(f"Get wrong robot model with exception: {e}")
+
+        return "Unknown"
+
+    def receive_data(self, motion_queue) -> None:
+        self.running = True
+        self.receive_count = 0
+        self.receive_start_time = time.time()
+        self.client.settimeout(None)
+
+        client = self.client
+        parser = self.parser
+        decoders = self._decoders
+        robot_name = self.robot_name
+
+        while self.running:
+            try:
+                if parser.recv_into(client) == 0:
+                    if self.running:
+                        self._console("Ethernet Slave closed the connection")
+                    break
+            except (ConnectionAbortedError, OSError) as e:
+                if self.running:
+                    logger.error(f"{robot_name}: failed to receive data: {e}")
+                break
+
+            timestamp = time.perf_counter()
+            frame = parser.next_frame()
+            while frame is not None:
+                decode = decoders.get(frame.mode)
+                if decode is not None:
+                    sample = self._decode(decode, frame, timestamp)
+                    if sample is not None:
+                        self._put(motion_queue, sample)
+                frame = parser.next_frame()
+
+        self.running = False
+
+    def _decode(self, decode, frame, timestamp: float):
+        try:
+            return decode(frame, self.robot_name, timestamp)
+        except ValueError:
+            # Skip the frame, e.g. a Joint_Angle that isn't a number
+            self.parser.value_errors += 1
+            return None
+
+    def _put(self, motion_queue, sample) -> None:
+        parsed = time.perf_counter()
+        sample.queued = parsed
+        motion_queue.put(sample)
+        self._count_received()
+
+        if self.latency is not None:
+            self.latency.record_received(sample, parsed, time.perf_counter())
+        if self.recorder is not None:
+            self.recorder.write(sample)
+
+    def set_end_di(self, index: int, value: int) -> None:
+        self._send(f"End_DI[{index}]={value}")
+
+    def set_ctrl_di(self, index: int, value: int) -> None:
+        self._send(f"Ctrl_DI[{index}]={value}")
+        self._console(f"Set Ctrl_DI: {index}={value}")
+
+    def _send(self, content: str) -> None:
+        packet = build_packet(self._generate_short_uuid(), MODE_STRING, content)
+        self.client.sendall(packet)
+
+    def _parse_robot_model(self, frame) -> str:
+        # Robot_Model=TM12S
+        return frame.content().decode("utf-8").split("=")[-1].strip()
+
+    def _count_received(self) -> None:
+        self.receive_count += 1
+        elapsed = time.time() - self.receive_start_time
+        if elapsed > 0:
+            self.current_fps = self.receive_count / elapsed
+
+    def _generate_short_uuid(self) -> str:
+        uuid_bytes = uuid.uuid4().bytes
+        return base64.urlsafe_b64encode(uuid_bytes).decode("utf-8").rstrip("=")[:8]
+
+    def _console(self, message: str):
+        current_time = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+        print(
+            f"{current_time} [Info] [tmrobot.digital_robot] {self.robot_name}: {message}"
+        )
+        logger.info(message)
@@ -0,0 +1,308 @@
+import math
+import re
+import time
+from typing import List, Optional
+
+import numpy as np
+
+# $TMSVR,<length>,<id>,<mode>,<content>,*<checksum>\r\n
+TMSVR_HEADER = b"$TMSVR,"
+TMSVR_TRAILER_SIZE = 6  # ,*XX\r\n
+TMSVR_MAX_LENGTH_DIGITS = 8
+
+MODE_RESPONSE = 0
+MODE_BINARY = 1
+MODE_STRING = 2
+MODE_JSON = 3
+
+ITEM_JOINT_ANGLE = b"Joint_Angle"
+ITEM_CTRL_DI = b"Ctrl_DI"
+ITEM_CTRL_DO = b"Ctrl_DO"
+ITEM_END_DI = b"End_DI"
+ITEM_END_DO = b"End_DO"
+
+_COMMA = 0x2C
+_ASTERISK = 0x2A
+_ZERO = 0x30
+_HEX = {c: int(chr(c), 16) for c in b"0123456789ABCDEFabcdef"}
+_BITS = bytes.maketrans(b"01", b"\x00\x01")
+_BIT_CHARS = bytes.maketrans(b"\x00\x01", b"01")
+_STRING_ITEM = re.compile(rb"(\w+)=\{?([^}\r\n]*)")
+
+
+def get_checksum(data) -> int:
+    # XOR of every byte between "$" and "*"
+    array = data if isinstance(data, np.ndarray) else np.frombuffer(data, np.uint8)
+    if array.size == 0:
+        return 0
+    return int(np.bitwise_xor.reduce(array))
+
+
+def pack_bits(bits: bytes) -> int:
+    """b"\\x01\\x00\\x01" -> 0b101, index 0 is the lowest bit."""
+    return int(bits[::-1].translate(_BIT_CHARS), 2) if bits else 0
+
+
+def unpack_bits(mask: int, size: int) -> bytes:
+    return bytes((mask >> i) & 1 for i in range(size))
+
+
+def build_packet(transaction_id: str, mode: int, content) -> bytes:
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    data = f"{transaction_id},{mode},".encode("utf-8") + content
+    body = b"TMSVR,%d,%s," % (len(data), data)
+    return b"$%s*%02X\r\n" % (body, get_checksum(body))
+
+
+class MotionSample:
+    """One Ethernet Slave transmit sample, attribute compatible with EthernetData.
+
+    Digital I/O are ``bytes`` of 0/1, indexing them gives an ``int`` like the lists did.
+    """
+
+    __slots__ = (
+        "robot_name",
+        "joint_radian",
+        "ctrl_di",
+        "ctrl_do",
+        "end_di",
+        "end_do",
+        "timestamp",
+        "queued",
+        "do_rises",
+        "do_falls",
+    )
+
+    def __init__(self, robot_name: str, timestamp: float = 0.0):
+        self.robot_name = robot_name
+        self.joint_radian: List[float] = []
+        self.ctrl_di = b""
+        self.ctrl_do = b""
+        self.end_di = b""
+        self.end_do = b""
+        self.timestamp = timestamp  # perf_counter of the socket receive
+        self.queued = 0.0  # perf_counter of the put in the motion queue
+        # DO bits, see io_rules.do_mask, that rose and fell in the samples it replaced
+        self.do_rises = 0
+        self.do_falls = 0
+
+
+class TMSVRFrame:
+    """A view on one validated frame inside the parser buffer.
+
+    The same instance is reused for every frame, it is only valid until the next call
+    to ``TMSVRFrameParser.next_frame`` or ``recv_into``.
+    """
+
+    __slots__ = ("buffer", "id_start", "id_end", "mode", "start", "end")
+
+    def __init__(self):
+        self.buffer: bytearray = None
+        self.id_start = 0
+        self.id_end = 0
+        self.mode = -1
+        self.start = 0
+        self.end = 0
+
+    def id_equals(self, transaction_id: bytes) -> bool:
+        return self.id_end - self.id_start == len(
+            transaction_id
+        ) and self.buffer.startswith(transaction_id, self.id_start)
+
+    def content(self) -> bytes:
+        return bytes(self.buffer[self.start : self.end])
+
+
+class TMSVRFrameParser:
+    """Incremental $TMSVR frame parser working in place on a reusable receive buffer."""
+
+    def __init__(self, capacity: int = 65536):
+        self._buffer = bytearray(capacity)
+        self._view = memoryview(self._buffer)
+        self._array = np.frombuffer(self._buffer, np.uint8)
+        self._start = 0
+        self._end = 0
+        self._frame = TMSVRFrame()
+        self.frame_count = 0
+        self.checksum_errors = 0
+        self.format_errors = 0
+        self.value_errors = 0  # frames with a valid checksum but a malformed item value
+
+    def recv_into(self, sock) -> int:
+        """Receive straight into the free tail of the buffer, returns 0 when the peer closed."""
+        received = sock.recv_into(self.get_buffer())
+        self._end += received
+        return received
+
+    def get_buffer(self, size: int = 4096) -> memoryview:
+        """Free tail of the buffer to receive into, see ``buffer_updated``."""
+        self._reserve(max(size, 1))
+        return self._view[self._end :]
+
+    def buffer_updated(self, nbytes: int) -> None:
+        self._end += nbytes
+
+    def feed(self, data) -> None:
+        size = len(data)
+        self._reserve(size)
+        self._view[self._end : self._end + size] = data
+        self._end += size
+
+    def pending(self) -> int:
+        return self._end - self._start
+
+    def reset(self) -> None:
+        self._start = 0
+        self._end = 0
+
+    def next_frame(self) -> Optional[TMSVRFrame]:
+        buf = self._buffer
+
+        while True:
+            start = buf.find(TMSVR_HEADER, self._start, self._end)
+            if start < 0:
+                # Keep a possibly split header for the next receive
+                self._start = max(self._start, self._end - len(TMSVR_HEADER) + 1)
+                return None
+
+            length_start = start + len(TMSVR_HEADER)
+            length_end = buf.find(b",", length_start, self._end)
+            if length_end < 0:
+                if self._end - length_start > TMSVR_MAX_LENGTH_DIGITS:
+                    self._skip_malformed(start)
+                    continue
+                self._start = start
+                return None
+
+            length = self._parse_int(length_start, length_end)
+            if length < 0:
+                self._skip_malformed(start)
+                continue
+
+            data_start = length_end + 1
+            data_end = data_start + length
+            frame_end = data_end + TMSVR_TRAILER_SIZE
+            if frame_end > self._end:
+                self._start = start
+                return None
+
+            if buf[data_end] != _COMMA or buf[data_end + 1] != _ASTERISK:
+                self._skip_malformed(start)
+                continue
+
+            expected = self._parse_hex(data_end + 2)
+            checksum = get_checksum(self._array[start + 1 : data_end + 1])
+            if expected != checksum:
+                self.checksum_errors += 1
+                self._start = frame_end
+                continue
+
+            id_end = buf.find(b",", data_start, data_end)
+            mode_end = buf.find(b",", id_end + 1, data_end) if id_end >= 0 else -1
+            if mode_end < 0:
+                self._skip_malformed(start)
+                continue
+
+            frame = self._frame
+            frame.buffer = buf
+            frame.id_start = data_start
+            frame.id_end = id_end
+            frame.mode = self._parse_int(id_end + 1, mode_end)
+            frame.start = mode_end + 1
+            frame.end = data_end
+
+            self._start = frame_end
+            self.frame_count += 1
+            return frame
+
+    def _reserve(self, size: int = 4096) -> None:
+        if self._start == self._end:
+            self._start = self._end = 0
+
+        if len(self._buffer) - self._end >= size:
+            return
+
+        # Move the partial frame to the front, grow only if a single frame doesn't fit
+        pending = self._end - self._start
+        capacity = len(self._buffer)
+        while capacity - pending < size:
+            capacity *= 2
+
+        if capacity != len(self._buffer):
+            buffer = bytearray(capacity)
+            buffer[:pending] = self._view[self._start : self._end]
+            self._view.release()
+            self._buffer = buffer
+            self._view = memoryview(buffer)
+            self._array = np.frombuffer(buffer, np.uint8)
+        elif pending > 0:
+            self._buffer[:pending] = self._buffer[self._start : self._end]
+
+        self._start = 0
+        self._end = pending
+
+    def _skip_malformed(self, start: int) -> None:
+        self.format_errors += 1
+        self._start = start + 1
+
+    def _parse_int(self, start: int, end: int) -> int:
+        if start >= end or end - start > TMSVR_MAX_LENGTH_DIGITS:
+            return -1
+
+        value = 0
+        for c in self._view[start:end]:
+            digit = c - _ZERO
+            if digit < 0 or digit > 9:
+                return -1
+            value = value * 10 + digit
+        return value
+
+    def _parse_hex(self, start: int) -> int:
+        high = _HEX.get(self._buffer[start], -1)
+        low = _HEX.get(self._buffer[start + 1], -1)
+        if high < 0 or low < 0:
+            return -1
+        return high << 4 | low
+
+
+def _decode_radians(value: bytes) -> List[float]:
+    radians = math.radians
+    return [radians(float(angle)) for angle in value.split(b",")] if value else []
+
+
+def _decode_bits(value: bytes) -> bytes:
+    # "0,1,0,..." -> b"\x00\x01\x00..."
+    return value.translate(_BITS, b",")
+
+
+_DECODERS = {
+    ITEM_JOINT_ANGLE: ("joint_radian", _decode_radians),
+    ITEM_CTRL_DI: ("ctrl_di", _decode_bits),
+    ITEM_CTRL_DO: ("ctrl_do", _decode_bits),
+    ITEM_END_DI: ("end_di", _decode_bits),
+    ITEM_END_DO: ("end_do", _decode_bits),
+}
+
+
+def decode_string_motion(
+    frame: TMSVRFrame, robot_name: str, timestamp: float = None
+) -> Optional[MotionSample]:
+    """Decode Joint_Angle, Ctrl_DI/DO and End_DI/DO of a STRING mode transmit frame.
+
+    Item boundaries are found by one regex scan over the receive buffer, only the item
+    names and values are sliced out of it.
+    """
+    sample = MotionSample(
+        robot_name, time.perf_counter() if timestamp is None else timestamp
+    )
+
+    for name, value in _STRING_ITEM.findall(frame.buffer, frame.start, frame.end):
+        decoder = _DECODERS.get(name)
+        if decoder is not None:
+            setattr(sample, decoder[0], decoder[1](value))
+
+    if not sample.joint_radian:
+        return None
+
+    return sample
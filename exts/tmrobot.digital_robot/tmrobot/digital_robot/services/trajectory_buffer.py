@@ -0,0 +1,103 @@
+from typing import Optional, Sequence
+
+import numpy as np
+
+
+class TrajectoryBuffer:
+    """Timestamped joint samples of one robot, resampled at the physics step time.
+
+    Samples are stamped with ``time.perf_counter()`` when they are received. The target
+    of a step at ``now`` is the trajectory at ``now - latency_budget``: it is
+    interpolated with a cubic Hermite spline between the surrounding samples, or
+    linearly extrapolated for at most ``max_extrapolation`` seconds when the next
+    sample is late, then the last sample is held.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 16,
+        latency_budget: float = 0.05,
+        max_extrapolation: float = 0.05,
+    ):
+        self.capacity = capacity
+        self.latency_budget = latency_budget
+        self.max_extrapolation = max_extrapolation
+        self._times = np.zeros(capacity, dtype=np.float64)
+        self._positions: np.ndarray = None
+        self._count = 0
+        self._head = 0  # index of the next write
+        self.interpolated = 0
+        self.extrapolated = 0
+        self.held = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def clear(self) -> None:
+        self._count = 0
+        self._head = 0
+
+    def push(self, timestamp: float, joint_positions: Sequence[float]) -> None:
+        if self._positions is None or self._positions.shape[1] != len(joint_positions):
+            self._positions = np.zeros((self.capacity, len(joint_positions)))
+            self.clear()
+
+        if self._count > 0:
+            last = (self._head - 1) % self.capacity
+            # Frames received in the same chunk share a timestamp, keep the newest
+            if timestamp <= self._times[last]:
+                self._positions[last] = joint_positions
+                return
+
+        self._times[self._head] = timestamp
+        self._positions[self._head] = joint_positions
+        self._head = (self._head + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def sample(self, now: float) -> Optional[np.ndarray]:
+        if self._count == 0:
+            return None
+
+        order = (np.arange(self._head - self._count, self._head)) % self.capacity
+        times = self._times[order]
+        positions = self._positions[order]
+        t = now - self.latency_budget
+
+        if t <= times[0] or self._count == 1:
+            self.held += 1
+            return (positions[0] if t <= times[0] else positions[-1]).copy()
+
+        if t >= times[-1]:
+            # The next sample is late, continue along the last segment for a while,
+            # then hold the last sample rather than the extrapolated overshoot
+            dt = t - times[-1]
+            if dt <= 0 or dt > self.max_extrapolation:
+                self.held += 1
+                return positions[-1].copy()
+
+            velocity = (positions[-1] - positions[-2]) / (times[-1] - times[-2])
+            self.extrapolated += 1
+            return positions[-1] + velocity * dt
+
+        i = int(np.searchsorted(times, t, side="right")) - 1
+        t1, t2 = times[i], times[i + 1]
+        p1, p2 = positions[i], positions[i + 1]
+        h = t2 - t1
+
+        # Non uniform Catmull-Rom tangents, one sided at the ends of the buffer
+        m1 = (p2 - positions[i - 1]) / (t2 - times[i - 1]) if i > 0 else (p2 - p1) / h
+        if i + 2 < self._count:
+            m2 = (positions[i + 2] - p1) / (times[i + 2] - t1)
+        else:
+            m2 = (p2 - p1) / h
+
+        s = (t - t1) / h
+        s2 = s * s
+        s3 = s2 * s
+        self.interpolated += 1
+        return (
+            (2 * s3 - 3 * s2 + 1) * p1
+            + (s3 - 2 * s2 + s) * h * m1
+            + (-2 * s3 + 3 * s2) * p2
+            + (s3 - s2) * h * m2
+        )
@@ -0,0 +1,218 @@
+import logging
+import math
+import struct
+import time
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+from tmrobot.digital_robot.services.tmsvr_parser import MODE_BINARY  # type: ignore
+from tmrobot.digital_robot.services.tmsvr_parser import MODE_JSON  # type: ignore
+from tmrobot.digital_robot.services.tmsvr_parser import MODE_STRING  # type: ignore
+from tmrobot.digital_robot.services.tmsvr_parser import MotionSample  # type: ignore
+from tmrobot.digital_robot.services.tmsvr_parser import TMSVRFrame  # type: ignore
+from tmrobot.digital_robot.services.tmsvr_parser import decode_string_motion  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+COMM_MODES = {"BINARY": MODE_BINARY, "STRING": MODE_STRING, "JSON": MODE_JSON}
+
+# Little endian struct codes of the Ethernet Slave item types
+STRUCT_CODES = {
+    "byte": "B",
+    "bool": "?",
+    "int16": "h",
+    "uint16": "H",
+    "int": "i",
+    "int32": "i",
+    "uint32": "I",
+    "float": "f",
+    "double": "d",
+}
+
+ITEM_LENGTH = struct.Struct("<H")  # of an item name and of an item value
+
+MISMATCH_LOG_INTERVAL = 10.0  # seconds between the warnings of mismatched frames
+
+MOTION_ITEMS = {
+    "Joint_Angle": "joint_radian",
+    "Ctrl_DI": "ctrl_di",
+    "Ctrl_DO": "ctrl_do",
+    "End_DI": "end_di",
+    "End_DO": "end_do",
+}
+
+
+@dataclass
+class TransmitItem:
+    name: str
+    type: str
+    size: int = 1
+
+
+class BinaryLayout:
+    """Precompiled structs of a BINARY transmit table.
+
+    TMflow sends the items of the table in order, each one as the length of its name
+    (uint16), the name, the length of its value (uint16) and the little endian value.
+    A frame with the size and the item names of the table is unpacked by one struct,
+    any other is counted in ``mismatched`` and its items are read one by one by name.
+    A frame without Joint_Angle gives no sample.
+    """
+
+    def __init__(self, items: List[TransmitItem]):
+        frame_codes = []
+        header_codes = []
+        self.items = {}  # [item name] struct code
+        self.headers = []  # name length, name, value length of every item
+        self.sizes = []  # values of every item
+        self.fields = []
+        offset = 0
+
+        for item in items:
+            code = STRUCT_CODES.get(item.type.lower())
+            if code is None:
+                raise ValueError(f"Unsupported Ethernet Slave type {item.type}")
+
+            name = item.name.encode("utf-8")
+            value_size = struct.calcsize(f"<{item.size}{code}")
+            frame_codes.append(f"H{len(name)}sH{item.size}{code}")
+            header_codes.append(f"H{len(name)}sH{value_size}x")
+            self.headers.extend((len(name), name, value_size))
+            self.items[item.name] = code
+            self.sizes.append(item.size)
+
+            # Offsets in the unpacked frame, after the 3 header fields of the item
+            offset += 3
+            attribute = MOTION_ITEMS.get(item.name)
+            if attribute is not None:
+                self.fields.append((attribute, offset, offset + item.size))
+            offset += item.size
+
+        self.struct = struct.Struct("<" + "".join(frame_codes))
+        self.header_struct = struct.Struct("<" + "".join(header_codes))
+        self.headers = tuple(self.headers)
+        self.size = self.struct.size
+        self.mismatched = 0
+        self._logged = 0.0
+
+    def pack(self, values: Sequence) -> bytes:
+        """Frame content of the item values, flattened in table order."""
+        fields = []
+        offset = 0
+        for index, size in enumerate(self.sizes):
+            fields.extend(self.headers[index * 3 : index * 3 + 3])
+            fields.extend(values[offset : offset + size])
+            offset += size
+        return self.struct.pack(*fields)
+
+    def decode(
+        self, frame: TMSVRFrame, robot_name: str, timestamp: float
+    ) -> Optional[MotionSample]:
+        if (
+            frame.end - frame.start == self.size
+            and self.header_struct.unpack_from(frame.buffer, frame.start)
+            == self.headers
+        ):
+            values = self.struct.unpack_from(frame.buffer, frame.start)
+            sample = MotionSample(robot_name, timestamp)
+            for attribute, start, end in self.fields:
+                _set_motion(sample, attribute, values[start:end])
+            return sample if sample.joint_radian else None
+
+        self.mismatched += 1
+        sample = self._decode_items(frame, robot_name, timestamp)
+        now = time.monotonic()
+        if now - self._logged > MISMATCH_LOG_INTERVAL:
+            self._logged = now
+            logger.warning(
+                f"{robot_name}: {self.mismatched} BINARY frames didn't match the "
+                f"transmit table{'' if sample is not None else ', motion is lost'}"
+            )
+        return sample
+
+    def _decode_items(
+        self, frame: TMSVRFrame, robot_name: str, timestamp: float
+    ) -> Optional[MotionSample]:
+        # TMflow sends another table, or the items in another order
+        buffer, offset, end = frame.buffer, frame.start, frame.end
+        sample = MotionSample(robot_name, timestamp)
+        try:
+            while offset < end:
+                (name_size,) = ITEM_LENGTH.unpack_from(buffer, offset)
+                offset += ITEM_LENGTH.size
+                name = bytes(buffer[offset : offset + name_size]).decode("utf-8")
+                offset += name_size
+                (value_size,) = ITEM_LENGTH.unpack_from(buffer, offset)
+                offset += ITEM_LENGTH.size
+                if offset + value_size > end:
+                    return None
+
+                code = self.items.get(name)
+                attribute = MOTION_ITEMS.get(name)
+                if code is not None and attribute is not None:
+                    count = value_size // struct.calcsize(code)
+                    values = struct.unpack_from(f"<{count}{code}", buffer, offset)
+                    _set_motion(sample, attribute, values)
+                offset += value_size
+        except (struct.error, UnicodeDecodeError):
+            return None
+        return sample if sample.joint_radian else None
+
+
+def _set_motion(sample: MotionSample, attribute: str, values) -> None:
+    if attribute == "joint_radian":
+        radians = math.radians
+        sample.joint_radian = [radians(angle) for angle in values]
+    else:
+        setattr(sample, attribute, bytes(values))
+
+
+class TransmitTable:
+    """Items and communication mode of an Ethernet Slave transmit table (EthSlave/Transmit/*.xml)."""
+
+    def __init__(self, items: List[TransmitItem], comm_mode: str = "STRING"):
+        comm_mode = comm_mode.upper()
+        if comm_mode not in COMM_MODES:
+            raise ValueError(f"Unsupported Ethernet Slave CommMode {comm_mode}")
+
+        self.items = items
+        self.comm_mode = comm_mode
+        self.mode = COMM_MODES[comm_mode]
+        self.binary_layout = BinaryLayout(items) if self.mode == MODE_BINARY else None
+
+    def decoders(self) -> dict:
+        """Frame decoders by $TMSVR mode, ``decode(frame, robot_name, timestamp)``."""
+        if self.mode == MODE_BINARY:
+            return {MODE_BINARY: self.binary_layout.decode}
+        if self.mode == MODE_STRING:
+            return {MODE_STRING: decode_string_motion}
+        raise ValueError(f"{self.comm_mode} transmit table is not supported")
+
+    @classmethod
+    def from_xml(cls, path: str) -> "TransmitTable":
+        root = ET.parse(path).getroot()
+        comm_mode = (root.findtext("CommMode") or "STRING").strip()
+        items = [
+            TransmitItem(
+                setting.get("Item"),
+                setting.get("Type", "float"),
+                int(setting.get("Size") or 1),
+            )
+            for setting in root.iter("Setting")
+        ]
+        if not any(item.name == "Joint_Angle" for item in items):
+            raise ValueError(f"{path} doesn't transmit Joint_Angle")
+        return cls(items, comm_mode)
+
+    @classmethod
+    def default(cls, comm_mode: str = "STRING") -> "TransmitTable":
+        # Same items as tmflow_sample_project/.../EthSlave/Transmit/digital_robot_motion.xml
+        items = [
+            TransmitItem("Joint_Angle", "float", 6),
+            TransmitItem("Ctrl_DI", "byte", 16),
+            TransmitItem("Ctrl_DO", "byte", 16),
+            TransmitItem("End_DI", "byte", 4),
+            TransmitItem("End_DO", "byte", 4),
+        ]
+        return cls(items, comm_mode)
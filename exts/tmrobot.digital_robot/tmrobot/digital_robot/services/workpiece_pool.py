@@ -0,0 +1,186 @@
+import logging
+import math
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Iterable, List, Sequence, Set
+
+import omni.kit.commands
+from isaacsim.core.utils.stage import add_reference_to_stage
+from pxr import Gf, Sdf, Usd, UsdGeom
+
+from tmrobot.digital_robot.services.spatial_hash import SpatialHash  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WorkpiecePoolStats:
+    created: int = 0
+    spawned: int = 0
+    recycled: int = 0  # spawned by taking back the oldest workpiece in the scene
+    released: int = 0
+
+
+class WorkpiecePool:
+    """Pre-created rigid body workpieces, spawned by activating a deactivated one.
+
+    ``fill`` adds the references, xform ops and ``SetRigidBody`` of all the workpieces
+    up front, outside of the physics callback, and deactivates them. ``spawn`` only
+    activates a free workpiece and writes its pose. PhysX cooks the convex hull of the
+    asset once and reuses it for the identical meshes of the other workpieces.
+
+    The pool bounds the workpieces in the scene: when none is free, ``spawn`` takes
+    back the oldest spawned one that no gripper holds, see ``attach_near``. The spawned
+    positions are kept in a ``SpatialHash`` of the x and y coordinates, refreshed from
+    the poses physics gave them before every query. ``index`` may be shared with
+    ``InstancedWorkpieces``, ``is_free`` then accounts for their parts too.
+    """
+
+    def __init__(
+        self,
+        stage: Usd.Stage,
+        root_path: str,
+        usd_path: str,
+        size: int = 8,
+        scale: Gf.Vec3f = Gf.Vec3f(0.5, 0.5, 0.5),
+        prefix: str = "workpiece",
+        cell_size: float = 0.05,
+        index: SpatialHash = None,
+    ):
+        if size < 1:
+            raise ValueError("The workpiece pool needs at least one workpiece")
+
+        self.stage = stage
+        self.root_path = root_path
+        self.usd_path = usd_path
+        self.size = size
+        self.scale = scale
+        self.prefix = prefix
+        self.stats = WorkpiecePoolStats()
+        self._free: Deque[str] = deque()
+        self._spawned: Deque[str] = deque()  # oldest first
+        self._attached: Set[str] = set()  # held by a gripper, never recycled
+        # [prim path] x, y, and the keys of the other users of a shared index
+        self.index = index if index is not None else SpatialHash(cell_size)
+
+    def fill(self) -> int:
+        """Create the missing workpieces, returns how many were created."""
+        created = 0
+        while self.stats.created < self.size:
+            self._free.append(self._create())
+            created += 1
+        return created
+
+    def refresh(self) -> None:
+        """Index the spawned workpieces where physics moved them since they were placed."""
+        for prim_path in self._spawned:
+            translation = self._translation(prim_path)
+            self.index.insert(prim_path, (translation[0], translation[1]))
+
+    def is_free(
+        self, position: Sequence[float], radius: float, ignore: Iterable = ()
+    ) -> bool:
+        """False if something is within ``radius`` of ``position`` in x and y.
+
+        Spawned workpieces and the parts of a shared index count, but the keys in
+        ``ignore``, e.g. the bulk parts around one being replaced by a workpiece.
+        """
+        self.refresh()
+        xy = (position[0], position[1])
+        return all(key in ignore for key in self.index.query(xy, radius))
+
+    def attach_near(self, position: Sequence[float], radius: float) -> List[str]:
+        """Mark the spawned workpieces within ``radius`` of a gripper as held by it.
+
+        ``position`` is in world coordinates, e.g. between the fingers. Returns the
+        workpieces attached, ``spawn`` doesn't recycle them until they are detached.
+        """
+        attached = []
+        for prim_path in self._spawned:
+            world = UsdGeom.Xformable(self.stage.GetPrimAtPath(prim_path))
+            world = world.ComputeLocalToWorldTransform(Usd.TimeCode.Default())
+            if math.dist(position, world.ExtractTranslation()) <= radius:
+                self._attached.add(prim_path)
+                attached.append(prim_path)
+        return attached
+
+    def detach(self, prim_paths: Iterable[str]) -> None:
+        self._attached.difference_update(prim_paths)
+
+    def spawn(self, translate: Gf.Vec3d, rotate_xyz: Gf.Vec3f = None) -> str:
+        """Place a workpiece at ``translate``, returns its prim path."""
+        if self._free:
+            prim_path = self._free.popleft()
+        elif self.stats.created < self.size:
+            prim_path = self._create()
+        else:
+            prim_path = self._take_oldest()
+            self.stats.recycled += 1
+
+        prim = self.stage.GetPrimAtPath(prim_path)
+        prim.SetActive(True)
+
+        # The rigid body is created again from these values
+        prim.GetAttribute("xformOp:translate").Set(Gf.Vec3d(translate))
+        if rotate_xyz is not None:
+            prim.GetAttribute("xformOp:rotateXYZ").Set(Gf.Vec3f(rotate_xyz))
+        for name in ("physics:velocity", "physics:angularVelocity"):
+            velocity = prim.GetAttribute(name)
+            if velocity and velocity.HasAuthoredValue():
+                velocity.Set(Gf.Vec3f(0, 0, 0))
+
+        self._spawned.append(prim_path)
+        self.index.insert(prim_path, (translate[0], translate[1]))
+        self.stats.spawned += 1
+        return prim_path
+
+    def release(self, prim_path: str) -> bool:
+        """Deactivate a spawned workpiece, False if it isn't one."""
+        try:
+            self._spawned.remove(prim_path)
+        except ValueError:
+            return False
+
+        self.stage.GetPrimAtPath(prim_path).SetActive(False)
+        self.index.remove(prim_path)
+        self._attached.discard(prim_path)
+        self._free.append(prim_path)
+        self.stats.released += 1
+        return True
+
+    def release_all(self) -> None:
+        for prim_path in list(self._spawned):
+            self.release(prim_path)
+
+    def get_spawned(self) -> List[str]:
+        return list(self._spawned)
+
+    def _take_oldest(self) -> str:
+        for prim_path in self._spawned:
+            if prim_path not in self._attached:
+                self._spawned.remove(prim_path)
+                return prim_path
+        raise RuntimeError("Every workpiece of the pool is held by a gripper")
+
+    def _translation(self, prim_path: str) -> Gf.Vec3d:
+        transform = UsdGeom.Xformable(self.stage.GetPrimAtPath(prim_path))
+        return transform.GetLocalTransformation().ExtractTranslation()
+
+    def _create(self) -> str:
+        prim_path = f"{self.root_path}/{self.prefix}_{self.stats.created + 1}"
+        prim = add_reference_to_stage(
+            usd_path=self.usd_path, prim_path=prim_path
+        ).GetPrim()
+        prim.GetAttribute("xformOp:scale").Set(self.scale)
+
+        omni.kit.commands.execute(
+            "SetRigidBody",
+            path=Sdf.Path(prim_path),
+            approximationShape="convexHull",
+            kinematic=False,
+        )
+
+        prim.SetActive(False)
+        self.stats.created += 1
+        logger.info(f"{prim_path} is added to the workpiece pool")
+        return prim_path
@@ -0,0 +1,2 @@
+from .test_tmsvr_parser import *
+from .test_trajectory_buffer import *
@@ -0,0 +1,107 @@
+import math
+import queue
+
+import omni.kit.test
+
+from tmrobot.digital_robot.services.ethernet_hub import AsyncEthernetMaster  # type: ignore
+from tmrobot.digital_robot.services.tmsvr_parser import MODE_STRING  # type: ignore
+from tmrobot.digital_robot.services.tmsvr_parser import TMSVRFrameParser  # type: ignore
+from tmrobot.digital_robot.services.tmsvr_parser import build_packet  # type: ignore
+from tmrobot.digital_robot.services.tmsvr_parser import decode_string_motion  # type: ignore
+
+MOTION = "Joint_Angle={0,90,-45,0,30,180}\r\nCtrl_DO={0,1,0,1}\r\nEnd_DO={1,0,0,0}"
+
+
+def motion_packet(transaction_id: str = "DR", content: str = MOTION) -> bytes:
+    return build_packet(transaction_id, MODE_STRING, content)
+
+
+class TestTMSVRFrameParser(omni.kit.test.AsyncTestCase):
+    async def test_parses_a_frame_fed_byte_by_byte(self):
+        parser = TMSVRFrameParser()
+        packet = motion_packet()
+        for i in range(len(packet) - 1):
+            parser.feed(packet[i : i + 1])
+            self.assertIsNone(parser.next_frame())
+
+        parser.feed(packet[-1:])
+        frame = parser.next_frame()
+        self.assertIsNotNone(frame)
+        self.assertTrue(frame.id_equals(b"DR"))
+        self.assertEqual(frame.mode, MODE_STRING)
+        self.assertEqual(frame.content(), MOTION.encode())
+        self.assertEqual(parser.pending(), 0)
+
+    async def test_parses_frames_split_across_feeds(self):
+        parser = TMSVRFrameParser()
+        data = motion_packet("A") + motion_packet("B") + motion_packet("C")
+        frames = []
+        for start in range(0, len(data), 7):
+            parser.feed(data[start : start + 7])
+            frame = parser.next_frame()
+            while frame is not None:
+                frames.append(bytes(frame.buffer[frame.id_start : frame.id_end]))
+                frame = parser.next_frame()
+
+        self.assertEqual(frames, [b"A", b"B", b"C"])
+        self.assertEqual(parser.frame_count, 3)
+
+    async def test_skips_a_frame_with_a_wrong_checksum(self):
+        parser = TMSVRFrameParser()
+        corrupted = bytearray(motion_packet("A"))
+        corrupted[-4:-2] = b"%02X" % (int(corrupted[-4:-2], 16) ^ 0xFF)
+        parser.feed(bytes(corrupted) + motion_packet("B"))
+
+        frame = parser.next_frame()
+        self.assertTrue(frame.id_equals(b"B"))
+        self.assertIsNone(parser.next_frame())
+        self.assertEqual(parser.checksum_errors, 1)
+
+    async def test_resynchronizes_after_garbage(self):
+        parser = TMSVRFrameParser()
+        parser.feed(b"$TMSVR,x9,garbage" + motion_packet("B"))
+
+        frame = parser.next_frame()
+        self.assertTrue(frame.id_equals(b"B"))
+        self.assertEqual(parser.format_errors, 1)
+
+
+class TestDecodeStringMotion(omni.kit.test.AsyncTestCase):
+    def _frame(self, content: str):
+        parser = TMSVRFrameParser()
+        parser.feed(motion_packet(content=content))
+        return parser.next_frame()
+
+    async def test_decodes_joints_and_outputs(self):
+        sample = decode_string_motion(self._frame(MOTION), "Robot01", 1.5)
+        self.assertEqual(sample.robot_name, "Robot01")
+        self.assertEqual(sample.timestamp, 1.5)
+        expected = [math.radians(angle) for angle in (0, 90, -45, 0, 30, 180)]
+        self.assertEqual(sample.joint_radian, expected)
+        self.assertEqual(sample.ctrl_do, b"\x00\x01\x00\x01")
+        self.assertEqual(sample.end_do, b"\x01\x00\x00\x00")
+
+    async def test_skips_a_frame_without_joints(self):
+        self.assertIsNone(decode_string_motion(self._frame("Ctrl_DO={0,1}"), "R", 0.0))
+
+    async def test_raises_on_a_malformed_joint_angle(self):
+        frame = self._frame("Joint_Angle={0,9x,0,0,0,0}")
+        with self.assertRaises(ValueError):
+            decode_string_motion(frame, "Robot01", 0.0)
+
+
+class TestMalformedFrames(omni.kit.test.AsyncTestCase):
+    async def test_counts_and_skips_a_malformed_value(self):
+        # Not connected, frames are fed to the parser as the hub protocol would
+        master = AsyncEthernetMaster(None, "Robot01", "127.0.0.1", connect=False)
+        master._decoders = master.transmit_table.decoders()
+        motion_queue = queue.SimpleQueue()
+        master.receive_data(motion_queue)
+
+        malformed = "Joint_Angle={0,9x,0,0,0,0}"
+        master.parser.feed(motion_packet("A", malformed) + motion_packet("B"))
+        master._on_frames(0.0)
+
+        self.assertEqual(master.parser.value_errors, 1)
+        self.assertEqual(motion_queue.qsize(), 1)
+        self.assertEqual(motion_queue.get().joint_radian[1], math.radians(90))
@@ -0,0 +1,29 @@
+import numpy as np
+import omni.kit.test
+
+from tmrobot.digital_robot.services.trajectory_buffer import TrajectoryBuffer  # type: ignore
+
+
+class TestTrajectoryBuffer(omni.kit.test.AsyncTestCase):
+    def _buffer(self) -> TrajectoryBuffer:
+        # One joint moving at 1 rad/s, last sample 0.18 rad at 0.18 s
+        buffer = TrajectoryBuffer(latency_budget=0.0, max_extrapolation=0.05)
+        for timestamp in (0.12, 0.15, 0.18):
+            buffer.push(timestamp, [timestamp])
+        return buffer
+
+    async def test_interpolates_between_samples(self):
+        buffer = self._buffer()
+        np.testing.assert_allclose(buffer.sample(0.165), [0.165])
+        self.assertEqual(buffer.interpolated, 1)
+
+    async def test_extrapolates_a_late_sample(self):
+        buffer = self._buffer()
+        np.testing.assert_allclose(buffer.sample(0.2), [0.2])
+        self.assertEqual(buffer.extrapolated, 1)
+
+    async def test_holds_the_last_sample_after_max_extrapolation(self):
+        buffer = self._buffer()
+        np.testing.assert_allclose(buffer.sample(0.3), [0.18])
+        self.assertEqual(buffer.held, 1)
+        self.assertEqual(buffer.extrapolated, 0)
@@ -0,0 +1,81 @@
+from typing import Callable, Dict
+
+import omni.ui as ui
+from tmrobot.digital_robot.services.motion_latency import PERCENTILES  # type: ignore
+from tmrobot.digital_robot.services.motion_latency import STAGES  # type: ignore
+from tmrobot.digital_robot.services.motion_latency import MotionLatency  # type: ignore
+
+
+class MotionLatencyWindow:
+    """Table of the motion latency percentiles, one row per robot and stage."""
+
+    def __init__(
+        self,
+        latency: MotionLatency,
+        on_dump: Callable[[], None] = None,
+        title: str = "TM Digital Robot Motion Latency",
+    ):
+        self.latency = latency
+        self._on_dump = on_dump
+        self._window = ui.Window(title, width=560, height=320, visible=False)
+        self._frame: ui.Frame = None
+        self._status: ui.Label = None
+        self._build()
+
+    def show(self) -> None:
+        self._window.visible = True
+        self.refresh()
+
+    def hide(self) -> None:
+        self._window.visible = False
+
+    def refresh(self) -> None:
+        if not self._window.visible:
+            return
+        self._frame.rebuild()
+
+    def destroy(self) -> None:
+        if self._window is not None:
+            self._window.destroy()
+            self._window = None
+
+    def set_status(self, message: str) -> None:
+        if self._status is not None:
+            self._status.text = message
+
+    def _build(self) -> None:
+        with self._window.frame:
+            with ui.VStack(spacing=4):
+                with ui.HStack(height=24, spacing=4):
+                    ui.Button("Dump JSON", width=100, clicked_fn=self._dump)
+                    ui.Button("Reset", width=100, clicked_fn=self._reset)
+                    self._status = ui.Label("")
+                with ui.ScrollingFrame():
+                    self._frame = ui.Frame(build_fn=self._build_table)
+
+    def _build_table(self) -> None:
+        columns = ["Robot", "Stage", "Count"]
+        columns += [f"p{percent} ms" for percent in PERCENTILES] + ["max ms"]
+        snapshot: Dict = self.latency.snapshot()
+
+        with ui.VGrid(column_count=len(columns), row_height=20):
+            for column in columns:
+                ui.Label(column)
+
+            for robot_name, stages in snapshot.items():
+                for stage in STAGES:
+                    summary = stages[stage]
+                    ui.Label(robot_name)
+                    ui.Label(stage)
+                    ui.Label(str(summary["count"]))
+                    for percent in PERCENTILES:
+                        ui.Label(f"{summary[f'p{percent}_ms']:.2f}")
+                    ui.Label(f"{summary['max_ms']:.2f}")
+
+    def _dump(self) -> None:
+        if self._on_dump is not None:
+            self._on_dump()
+
+    def _reset(self) -> None:
+        self.latency.reset()
+        self.refresh()
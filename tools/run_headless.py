@@ -0,0 +1,142 @@
+"""Run the TM Digital Robot services headless, without the extension UI.
+
+Loads the scene and the robot settings of an extension settings JSON saved by the
+extension UI, starts the Ethernet masters and the Virtual Camera server, runs for a
+duration, a number of physics steps or until a stop file exists, then writes the
+metrics of the run to JSON. SIGTERM and SIGINT stop the run the same way.
+
+With ``--lockstep <dir>`` the recorded motion logs of the directory are simulated as
+fast as possible instead: physics is stepped ``--steps-per-sample`` times per sample
+and ``--duration`` is in simulated seconds.
+
+Needs the Isaac Sim python:
+Usage: <isaac-sim>/python.sh tools/run_headless.py --settings extension_setting.json \\
+           --duration 3600 --metrics metrics.json [--option motion_replay_dir="/logs"]
+"""
+
+import argparse
+import json
+import logging
+import os
+import signal
+import sys
+
+from isaacsim import SimulationApp
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--settings", required=True, help="extension settings JSON")
+parser.add_argument("--scene", help="USD scene instead of the one of the settings")
+parser.add_argument("--duration", type=float, help="seconds to run after starting")
+parser.add_argument("--steps", type=int, help="physics steps to run")
+parser.add_argument("--stop-file", help="stop when this file exists")
+parser.add_argument("--metrics", help="write the metrics of the run to this JSON")
+parser.add_argument(
+    "--option",
+    action="append",
+    default=[],
+    help="extension option name=value, the value is JSON or a string, "
+    'e.g. motion_latency_budget=0.08 or motion_record_dir="/logs"',
+)
+parser.add_argument(
+    "--no-camera-server",
+    action="store_true",
+    help="don't start the Virtual Camera gRPC server, its port can't be shared",
+)
+parser.add_argument("--start-timeout", type=float, default=60.0)
+parser.add_argument(
+    "--lockstep",
+    metavar="DIR",
+    help="step physics by the timestamps of the .tmlog of this directory",
+)
+parser.add_argument(
+    "--steps-per-sample", type=int, default=4, help="lockstep physics steps per sample"
+)
+parser.add_argument(
+    "--render-interval", type=int, default=10, help="lockstep samples per rendering"
+)
+args = parser.parse_args()
+
+simulation_app = SimulationApp({"headless": True})
+
+from isaacsim.core.utils.extensions import enable_extension  # noqa: E402
+
+enable_extension("isaacsim.robot.surface_gripper")
+enable_extension("omni.kit.viewport.utility")
+simulation_app.update()
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        "..",
+        "exts",
+        "tmrobot.digital_robot",
+    ),
+)
+
+from tmrobot.digital_robot.headless import HeadlessRunner  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+logger = logging.getLogger("run_headless")
+
+
+def parse_options(options) -> dict:
+    parsed = {}
+    for option in options:
+        name, separator, value = option.partition("=")
+        if not separator:
+            parser.error(f"--option {option} isn't name=value")
+        try:
+            parsed[name.strip()] = json.loads(value)
+        except json.JSONDecodeError:
+            parsed[name.strip()] = value
+    return parsed
+
+
+def main() -> int:
+    options = parse_options(args.option)
+    if args.no_camera_server:
+        options["virtual_camera_enabled"] = False
+    if args.lockstep:
+        options.update(
+            motion_replay_dir=args.lockstep,
+            motion_replay_lockstep=True,
+            lockstep_steps_per_sample=args.steps_per_sample,
+            lockstep_render_interval=args.render_interval,
+        )
+
+    try:
+        runner = HeadlessRunner(simulation_app, args.settings, args.scene, options)
+    except (OSError, ValueError) as e:
+        logger.error(f"Can't run {args.settings}: {e}")
+        return 1
+
+    for signal_number in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signal_number, lambda *_: runner.request_stop("signal"))
+
+    if not runner.start(args.start_timeout):
+        logger.error("The services didn't start")
+        if args.metrics and runner.extension is not None:
+            runner.write_metrics(args.metrics)
+        return 1
+
+    def stop_file_exists(runner: HeadlessRunner) -> bool:
+        return os.path.exists(args.stop_file)
+
+    until = stop_file_exists if args.stop_file else None
+    if args.lockstep:
+        reason = runner.run_lockstep(args.duration, until)
+    else:
+        reason = runner.run(args.duration, args.steps, until)
+    logger.info(f"Stopped by {reason} after {runner.extension._simulation_count} steps")
+
+    if args.metrics:
+        runner.write_metrics(args.metrics)
+    runner.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    exit_code = main()
+    simulation_app.close()
+    sys.exit(exit_code)